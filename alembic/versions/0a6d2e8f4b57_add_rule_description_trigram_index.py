@@ -0,0 +1,29 @@
+"""add rule description trigram index
+
+Revision ID: 0a6d2e8f4b57
+Revises: f81b3d5c7e26
+Create Date: 2026-10-19 18:34:17.250619
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6d2e8f4b57'
+down_revision: Union[str, None] = 'f81b3d5c7e26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index('ix_policy_rules_description_trgm', 'policy_rules', ['description'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_policy_rules_description_trgm', table_name='policy_rules', postgresql_using='gin')
@@ -0,0 +1,30 @@
+"""add embedding text hash
+
+Revision ID: 1b7e4f9a2c83
+Revises: 0a6d2e8f4b57
+Create Date: 2026-10-19 19:02:41.583206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b7e4f9a2c83'
+down_revision: Union[str, None] = '0a6d2e8f4b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('embeddings', sa.Column('text_hash', sa.String(length=64), nullable=True))
+    op.add_column('embeddings', sa.Column('model', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('embeddings', 'model')
+    op.drop_column('embeddings', 'text_hash')
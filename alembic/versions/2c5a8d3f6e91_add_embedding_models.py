@@ -0,0 +1,68 @@
+"""add embedding models and shadow embeddings
+
+Revision ID: 2c5a8d3f6e91
+Revises: 1b7e4f9a2c83
+Create Date: 2026-10-19 19:47:12.904158
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from pgvector.sqlalchemy import Vector
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c5a8d3f6e91'
+down_revision: Union[str, None] = '1b7e4f9a2c83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('embeddings', sa.Column('dimensions', sa.Integer(), nullable=True))
+    op.execute("UPDATE embeddings SET dimensions = vector_dims(embedding)")
+
+    op.create_table('embedding_models',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('provider', sa.String(), nullable=False),
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('dimensions', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('activated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_embedding_models_id'), 'embedding_models', ['id'], unique=False)
+    op.create_index('uq_embedding_models_status', 'embedding_models', ['status'], unique=True,
+                    postgresql_where=sa.text("status <> 'retired'"))
+
+    op.create_table('shadow_embeddings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_type', sa.String(), nullable=False),
+    sa.Column('content_id', sa.Integer(), nullable=False),
+    sa.Column('embedding', Vector(dim=3072), nullable=False),
+    sa.Column('text_hash', sa.String(length=64), nullable=True),
+    sa.Column('model', sa.String(), nullable=True),
+    sa.Column('dimensions', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('is_deleted', sa.Boolean(), server_default=sa.text('FALSE'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_type', 'content_id', name='uq_shadow_content_type_id')
+    )
+    op.create_index(op.f('ix_shadow_embeddings_id'), 'shadow_embeddings', ['id'], unique=False)
+    op.create_index(op.f('ix_shadow_embeddings_is_deleted'), 'shadow_embeddings', ['is_deleted'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_shadow_embeddings_is_deleted'), table_name='shadow_embeddings')
+    op.drop_index(op.f('ix_shadow_embeddings_id'), table_name='shadow_embeddings')
+    op.drop_table('shadow_embeddings')
+    op.drop_index('uq_embedding_models_status', table_name='embedding_models',
+                  postgresql_where=sa.text("status <> 'retired'"))
+    op.drop_index(op.f('ix_embedding_models_id'), table_name='embedding_models')
+    op.drop_table('embedding_models')
+    op.drop_column('embeddings', 'dimensions')
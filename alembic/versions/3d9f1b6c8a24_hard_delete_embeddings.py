@@ -0,0 +1,67 @@
+"""hard delete embeddings
+
+Revision ID: 3d9f1b6c8a24
+Revises: 2c5a8d3f6e91
+Create Date: 2026-10-19 20:31:05.716342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d9f1b6c8a24'
+down_revision: Union[str, None] = '2c5a8d3f6e91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Embeddings are deleted with their content from now on
+    op.execute("DELETE FROM embeddings WHERE is_deleted")
+    op.execute("DELETE FROM shadow_embeddings WHERE is_deleted")
+
+    op.execute("DROP INDEX IF EXISTS ix_embeddings_company_id_company")
+    op.execute("DROP INDEX IF EXISTS ix_embeddings_embedding_short_shared_hnsw")
+    op.drop_index(op.f('ix_embeddings_is_deleted'), table_name='embeddings')
+    op.drop_column('embeddings', 'is_deleted')
+    op.drop_index(op.f('ix_shadow_embeddings_is_deleted'), table_name='shadow_embeddings')
+    op.drop_column('shadow_embeddings', 'is_deleted')
+
+    op.execute(
+        "CREATE INDEX ix_embeddings_embedding_short_shared_hnsw ON embeddings "
+        "USING hnsw (embedding_short vector_cosine_ops) "
+        "WITH (m = 16, ef_construction = 64) "
+        "WHERE is_active = true AND policy_type IN ('industry', 'standard')"
+    )
+    op.execute(
+        "CREATE INDEX ix_embeddings_company_id_company ON embeddings (company_id) "
+        "WHERE is_active = true AND policy_type = 'company'"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_embeddings_company_id_company")
+    op.execute("DROP INDEX IF EXISTS ix_embeddings_embedding_short_shared_hnsw")
+
+    op.add_column('shadow_embeddings', sa.Column('is_deleted', sa.Boolean(), server_default=sa.text('FALSE'),
+                                                 nullable=False))
+    op.create_index(op.f('ix_shadow_embeddings_is_deleted'), 'shadow_embeddings', ['is_deleted'], unique=False)
+    op.add_column('embeddings', sa.Column('is_deleted', sa.Boolean(), server_default=sa.text('FALSE'),
+                                          nullable=False))
+    op.create_index(op.f('ix_embeddings_is_deleted'), 'embeddings', ['is_deleted'], unique=False)
+
+    op.execute(
+        "CREATE INDEX ix_embeddings_embedding_short_shared_hnsw ON embeddings "
+        "USING hnsw (embedding_short vector_cosine_ops) "
+        "WITH (m = 16, ef_construction = 64) "
+        "WHERE is_deleted = false AND is_active = true AND policy_type IN ('industry', 'standard')"
+    )
+    op.execute(
+        "CREATE INDEX ix_embeddings_company_id_company ON embeddings (company_id) "
+        "WHERE is_deleted = false AND is_active = true AND policy_type = 'company'"
+    )
@@ -0,0 +1,46 @@
+"""add document chunks table
+
+Revision ID: 4e2a7c9d5b18
+Revises: 3d9f1b6c8a24
+Create Date: 2026-10-19 21:14:38.209517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from pgvector.sqlalchemy import Vector
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e2a7c9d5b18'
+down_revision: Union[str, None] = '3d9f1b6c8a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('document_chunks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=False),
+    sa.Column('chunk_index', sa.Integer(), nullable=False),
+    sa.Column('start_offset', sa.Integer(), nullable=False),
+    sa.Column('end_offset', sa.Integer(), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('embedding', Vector(dim=3072), nullable=False),
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_document_chunks_id'), 'document_chunks', ['id'], unique=False)
+    op.create_index(op.f('ix_document_chunks_document_id'), 'document_chunks', ['document_id'], unique=False)
+    # No vector index: passages are only ranked within one document, found through document_id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_document_chunks_document_id'), table_name='document_chunks')
+    op.drop_index(op.f('ix_document_chunks_id'), table_name='document_chunks')
+    op.drop_table('document_chunks')
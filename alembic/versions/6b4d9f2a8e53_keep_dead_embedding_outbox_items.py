@@ -0,0 +1,30 @@
+"""keep dead embedding outbox items
+
+Revision ID: 6b4d9f2a8e53
+Revises: 4e2a7c9d5b18
+Create Date: 2026-10-19 23:26:14.582907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b4d9f2a8e53'
+down_revision: Union[str, None] = '4e2a7c9d5b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('embedding_outbox', sa.Column('is_dead', sa.Boolean(), server_default=sa.text('FALSE'),
+                                                nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM embedding_outbox WHERE is_dead")
+    op.drop_column('embedding_outbox', 'is_dead')
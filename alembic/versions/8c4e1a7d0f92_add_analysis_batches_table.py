@@ -0,0 +1,55 @@
+"""add analysis batches table
+
+Revision ID: 8c4e1a7d0f92
+Revises: 3b9d2f6a1c47
+Create Date: 2026-10-19 11:03:17.540921
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4e1a7d0f92'
+down_revision: Union[str, None] = '3b9d2f6a1c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('analysis_batches',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('checklist_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('is_deleted', sa.Boolean(), server_default=sa.text('FALSE'), nullable=False),
+    sa.ForeignKeyConstraint(['checklist_id'], ['checklists.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_analysis_batches_id'), 'analysis_batches', ['id'], unique=False)
+    op.create_index(op.f('ix_analysis_batches_status'), 'analysis_batches', ['status'], unique=False)
+    op.create_index(op.f('ix_analysis_batches_is_deleted'), 'analysis_batches', ['is_deleted'], unique=False)
+    op.add_column('analysis_jobs', sa.Column('batch_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_analysis_jobs_batch_id'), 'analysis_jobs', ['batch_id'], unique=False)
+    op.create_foreign_key('analysis_jobs_batch_id_fkey', 'analysis_jobs', 'analysis_batches', ['batch_id'], ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('analysis_jobs_batch_id_fkey', 'analysis_jobs', type_='foreignkey')
+    op.drop_index(op.f('ix_analysis_jobs_batch_id'), table_name='analysis_jobs')
+    op.drop_column('analysis_jobs', 'batch_id')
+    op.drop_index(op.f('ix_analysis_batches_is_deleted'), table_name='analysis_batches')
+    op.drop_index(op.f('ix_analysis_batches_status'), table_name='analysis_batches')
+    op.drop_index(op.f('ix_analysis_batches_id'), table_name='analysis_batches')
+    op.drop_table('analysis_batches')
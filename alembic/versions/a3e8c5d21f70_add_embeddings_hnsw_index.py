@@ -0,0 +1,33 @@
+"""add embeddings hnsw index
+
+Revision ID: a3e8c5d21f70
+Revises: f2c7a9e4b613
+Create Date: 2026-10-19 15:03:12.584113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e8c5d21f70'
+down_revision: Union[str, None] = 'f2c7a9e4b613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pgvector can't index 3072-dim vectors, so the index is built on a half-precision cast
+    # which semantic_search repeats in its candidate query
+    op.execute(
+        "CREATE INDEX ix_embeddings_embedding_hnsw ON embeddings "
+        "USING hnsw ((embedding::halfvec(3072)) halfvec_cosine_ops) "
+        "WITH (m = 16, ef_construction = 64)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_embeddings_embedding_hnsw")
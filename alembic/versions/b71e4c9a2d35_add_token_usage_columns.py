@@ -0,0 +1,34 @@
+"""add token usage columns
+
+Revision ID: b71e4c9a2d35
+Revises: 8c4e1a7d0f92
+Create Date: 2026-10-19 12:24:51.307465
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71e4c9a2d35'
+down_revision: Union[str, None] = '8c4e1a7d0f92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('analysis_results', sa.Column('input_tokens', sa.Integer(), nullable=True))
+    op.add_column('analysis_results', sa.Column('output_tokens', sa.Integer(), nullable=True))
+    op.add_column('messages', sa.Column('input_tokens', sa.Integer(), nullable=True))
+    op.add_column('messages', sa.Column('output_tokens', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('messages', 'output_tokens')
+    op.drop_column('messages', 'input_tokens')
+    op.drop_column('analysis_results', 'output_tokens')
+    op.drop_column('analysis_results', 'input_tokens')
@@ -0,0 +1,36 @@
+"""add short embedding column
+
+Revision ID: c58d0b7e3a19
+Revises: a3e8c5d21f70
+Create Date: 2026-10-19 15:47:36.207841
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from pgvector.sqlalchemy import Vector
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c58d0b7e3a19'
+down_revision: Union[str, None] = 'a3e8c5d21f70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('embeddings', sa.Column('embedding_short', Vector(dim=256), nullable=True))
+    op.execute("UPDATE embeddings SET embedding_short = l2_normalize(subvector(embedding, 1, 256))::vector(256)")
+    op.execute(
+        "CREATE INDEX ix_embeddings_embedding_short_hnsw ON embeddings "
+        "USING hnsw (embedding_short vector_cosine_ops) "
+        "WITH (m = 16, ef_construction = 64)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_embeddings_embedding_short_hnsw")
+    op.drop_column('embeddings', 'embedding_short')
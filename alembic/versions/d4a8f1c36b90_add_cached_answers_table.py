@@ -0,0 +1,46 @@
+"""add cached answers table
+
+Revision ID: d4a8f1c36b90
+Revises: b71e4c9a2d35
+Create Date: 2026-10-19 13:02:38.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from pgvector.sqlalchemy import Vector
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a8f1c36b90'
+down_revision: Union[str, None] = 'b71e4c9a2d35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('cached_answers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=False),
+    sa.Column('question', sa.String(), nullable=False),
+    sa.Column('question_embedding', Vector(dim=3072), nullable=False),
+    sa.Column('answer', sa.String(), nullable=False),
+    sa.Column('hits', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('last_hit_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_cached_answers_id'), 'cached_answers', ['id'], unique=False)
+    op.create_index(op.f('ix_cached_answers_document_id'), 'cached_answers', ['document_id'], unique=False)
+    op.add_column('messages', sa.Column('is_cached', sa.Boolean(), server_default=sa.text('FALSE'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('messages', 'is_cached')
+    op.drop_index(op.f('ix_cached_answers_document_id'), table_name='cached_answers')
+    op.drop_index(op.f('ix_cached_answers_id'), table_name='cached_answers')
+    op.drop_table('cached_answers')
@@ -0,0 +1,65 @@
+"""add policy scope to embeddings
+
+Revision ID: d7b1f4a09c62
+Revises: c58d0b7e3a19
+Create Date: 2026-10-19 16:28:54.731906
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7b1f4a09c62'
+down_revision: Union[str, None] = 'c58d0b7e3a19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('embeddings', sa.Column('company_id', sa.Integer(), nullable=True))
+    op.add_column('embeddings', sa.Column('policy_type', sa.String(), nullable=True))
+    op.add_column('embeddings', sa.Column('is_active', sa.Boolean(), server_default=sa.text('TRUE'), nullable=False))
+
+    op.execute(
+        "UPDATE embeddings SET company_id = policies.company_id, policy_type = policies.policy_type, "
+        "is_active = policies.is_active FROM policies "
+        "WHERE embeddings.content_type = 'policy' AND embeddings.content_id = policies.id"
+    )
+    op.execute(
+        "UPDATE embeddings SET company_id = policies.company_id, policy_type = policies.policy_type, "
+        "is_active = policies.is_active FROM policy_rules, policies "
+        "WHERE embeddings.content_type = 'rule' AND embeddings.content_id = policy_rules.id "
+        "AND policy_rules.policy_id = policies.id"
+    )
+
+    # Shared (industry and standard) policies are searched through the HNSW index, a company's
+    # own policies are few enough to be ranked exactly after a lookup by company
+    op.execute("DROP INDEX IF EXISTS ix_embeddings_embedding_short_hnsw")
+    op.execute(
+        "CREATE INDEX ix_embeddings_embedding_short_shared_hnsw ON embeddings "
+        "USING hnsw (embedding_short vector_cosine_ops) "
+        "WITH (m = 16, ef_construction = 64) "
+        "WHERE is_deleted = false AND is_active = true AND policy_type IN ('industry', 'standard')"
+    )
+    op.execute(
+        "CREATE INDEX ix_embeddings_company_id_company ON embeddings (company_id) "
+        "WHERE is_deleted = false AND is_active = true AND policy_type = 'company'"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_embeddings_company_id_company")
+    op.execute("DROP INDEX IF EXISTS ix_embeddings_embedding_short_shared_hnsw")
+    op.execute(
+        "CREATE INDEX ix_embeddings_embedding_short_hnsw ON embeddings "
+        "USING hnsw (embedding_short vector_cosine_ops) "
+        "WITH (m = 16, ef_construction = 64)"
+    )
+    op.drop_column('embeddings', 'is_active')
+    op.drop_column('embeddings', 'policy_type')
+    op.drop_column('embeddings', 'company_id')
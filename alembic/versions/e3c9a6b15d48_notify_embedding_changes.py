@@ -0,0 +1,44 @@
+"""notify embedding changes
+
+Revision ID: e3c9a6b15d48
+Revises: d7b1f4a09c62
+Create Date: 2026-10-19 17:12:05.468391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3c9a6b15d48'
+down_revision: Union[str, None] = 'd7b1f4a09c62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keeps the in-process vector index in sync, notifications are delivered on commit
+    op.execute("""
+        CREATE FUNCTION notify_embedding_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('embeddings_changed', OLD.id::text);
+            ELSE
+                PERFORM pg_notify('embeddings_changed', NEW.id::text);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(
+        "CREATE TRIGGER embeddings_notify_change AFTER INSERT OR UPDATE OR DELETE ON embeddings "
+        "FOR EACH ROW EXECUTE FUNCTION notify_embedding_change()"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS embeddings_notify_change ON embeddings")
+    op.execute("DROP FUNCTION IF EXISTS notify_embedding_change()")
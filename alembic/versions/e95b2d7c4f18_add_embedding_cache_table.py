@@ -0,0 +1,41 @@
+"""add embedding cache table
+
+Revision ID: e95b2d7c4f18
+Revises: d4a8f1c36b90
+Create Date: 2026-10-19 13:41:09.662017
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from pgvector.sqlalchemy import Vector
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e95b2d7c4f18'
+down_revision: Union[str, None] = 'd4a8f1c36b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('embedding_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('text_hash', sa.String(length=64), nullable=False),
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('embedding', Vector(dim=3072), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('text_hash', 'model', name='uq_embedding_cache_text_hash_model')
+    )
+    op.create_index(op.f('ix_embedding_cache_id'), 'embedding_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_embedding_cache_created_at'), 'embedding_cache', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_embedding_cache_created_at'), table_name='embedding_cache')
+    op.drop_index(op.f('ix_embedding_cache_id'), table_name='embedding_cache')
+    op.drop_table('embedding_cache')
@@ -0,0 +1,42 @@
+"""add embedding outbox table
+
+Revision ID: f2c7a9e4b613
+Revises: e95b2d7c4f18
+Create Date: 2026-10-19 14:22:47.318250
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c7a9e4b613'
+down_revision: Union[str, None] = 'e95b2d7c4f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('embedding_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_type', sa.String(), nullable=False),
+    sa.Column('content_id', sa.Integer(), nullable=False),
+    sa.Column('available_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_type', 'content_id', name='uq_embedding_outbox_content')
+    )
+    op.create_index(op.f('ix_embedding_outbox_id'), 'embedding_outbox', ['id'], unique=False)
+    op.create_index(op.f('ix_embedding_outbox_available_at'), 'embedding_outbox', ['available_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_embedding_outbox_available_at'), table_name='embedding_outbox')
+    op.drop_index(op.f('ix_embedding_outbox_id'), table_name='embedding_outbox')
+    op.drop_table('embedding_outbox')
@@ -0,0 +1,46 @@
+"""add full text search vectors
+
+Revision ID: f81b3d5c7e26
+Revises: e3c9a6b15d48
+Create Date: 2026-10-19 17:56:41.902734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f81b3d5c7e26'
+down_revision: Union[str, None] = 'e3c9a6b15d48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('policies', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed("setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+                    "setweight(to_tsvector('english', coalesce(description, '')), 'B')", persisted=True),
+        nullable=True
+    ))
+    op.add_column('policy_rules', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed("setweight(jsonb_to_tsvector('english', coalesce(keywords::jsonb, '[]'), '[\"string\"]'), 'A') || "
+                    "setweight(to_tsvector('english', coalesce(description, '')), 'B')", persisted=True),
+        nullable=True
+    ))
+    op.create_index('ix_policies_search_vector', 'policies', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_policy_rules_search_vector', 'policy_rules', ['search_vector'], unique=False,
+                    postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_policy_rules_search_vector', table_name='policy_rules', postgresql_using='gin')
+    op.drop_index('ix_policies_search_vector', table_name='policies', postgresql_using='gin')
+    op.drop_column('policy_rules', 'search_vector')
+    op.drop_column('policies', 'search_vector')
@@ -0,0 +1,94 @@
+import re
+from dataclasses import dataclass
+
+from app.core.ai.tokens import estimate_tokens, CHARS_PER_TOKEN
+
+SECTION_HEADING = re.compile(
+    r"^\s*("
+    r"(ARTICLE|Article|SECTION|Section|CLAUSE|Clause|SCHEDULE|Schedule|ANNEX|Annex|APPENDIX|Appendix|EXHIBIT|Exhibit)\b"
+    r"|\d{1,3}(\.\d{1,3})*\.?\s+\S"
+    r"|[A-Z][A-Z0-9 ,&()'-]{3,80}$"
+    r")"
+)
+
+
+@dataclass
+class DocumentChunk:
+    index: int
+    text: str
+    start_offset: int
+    end_offset: int
+
+
+def split_into_sections(text: str) -> list[tuple[int, int]]:
+    """
+    Split a document into sections on headings (articles, numbered clauses, schedules, all-caps titles).
+
+    Returns (start, end) character offsets covering the whole text.
+    """
+    boundaries = [0]
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        if offset and SECTION_HEADING.match(line):
+            boundaries.append(offset)
+        offset += len(line)
+    boundaries.append(len(text))
+
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+
+def split_oversized_section(text: str, start: int, end: int, max_tokens: int) -> list[tuple[int, int]]:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    parts = []
+    while end - start > max_chars:
+        # Prefer to cut at a paragraph, then a line, then a sentence break inside the window
+        window_end = start + max_chars
+        cut = max(text.rfind("\n\n", start, window_end), text.rfind("\n", start, window_end),
+                  text.rfind(". ", start, window_end))
+        cut = cut + 1 if cut > start else window_end
+        parts.append((start, cut))
+        start = cut
+    parts.append((start, end))
+    return parts
+
+
+def chunk_by_sections(text: str, max_tokens: int) -> list[DocumentChunk]:
+    """Pack consecutive sections into chunks of at most `max_tokens`, never splitting a section unless it's too big."""
+    spans = []
+    for start, end in split_into_sections(text):
+        if estimate_tokens(text[start:end]) > max_tokens:
+            spans.extend(split_oversized_section(text, start, end, max_tokens))
+        else:
+            spans.append((start, end))
+
+    chunks = []
+    chunk_start, chunk_end = None, None
+    for start, end in spans:
+        if chunk_start is not None and estimate_tokens(text[chunk_start:end]) > max_tokens:
+            chunks.append((chunk_start, chunk_end))
+            chunk_start = None
+        if chunk_start is None:
+            chunk_start = start
+        chunk_end = end
+    if chunk_start is not None:
+        chunks.append((chunk_start, chunk_end))
+
+    return [DocumentChunk(index=i, text=text[start:end], start_offset=start, end_offset=end)
+            for i, (start, end) in enumerate(chunks)]
+
+
+def chunk_with_overlap(text: str, max_tokens: int, overlap_tokens: int) -> list[DocumentChunk]:
+    """
+    `chunk_by_sections` where each chunk also repeats about `overlap_tokens` of the previous one,
+    starting at a line (or word) break, so a passage cut by a chunk boundary is whole in one chunk.
+    """
+    overlap_chars = overlap_tokens * CHARS_PER_TOKEN
+    chunks = chunk_by_sections(text, max(max_tokens - overlap_tokens, 1))
+    for chunk in chunks[1:]:
+        start = max(chunk.start_offset - overlap_chars, 0)
+        cut = text.find("\n", start, chunk.start_offset)
+        if cut == -1:
+            cut = text.find(" ", start, chunk.start_offset)
+        chunk.start_offset = cut + 1 if cut != -1 else start
+        chunk.text = text[chunk.start_offset:chunk.end_offset]
+    return chunks
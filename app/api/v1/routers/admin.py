@@ -0,0 +1,85 @@
+from http import HTTPStatus
+
+from fastapi import APIRouter
+from fastapi.params import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.schemas.embedding import ReembedRequest, ReembedReport, EmbeddingWriteStats, EmbeddingModelRead, \
+    ShadowEmbeddingRequest, EmbeddingModelComparison, EmbeddingCompactionReport
+from app.api.v1.schemas.model_stats import ModelRoutingStats, EmbeddingCacheStats
+from app.api.v1.services.admin_service import get_model_stats, get_embedding_cache_stats, start_reembed, \
+    get_reembed_report, get_embedding_write_stats, start_shadow_embedding, get_shadow_embedding_report
+from app.api.v1.services.embedding_compaction_service import start_compaction, get_compaction_report
+from app.api.v1.services.embedding_model_service import list_embedding_models, cancel_shadow_model, \
+    compare_embedding_models, cutover_embedding_model
+from app.core.config import settings
+from app.core.user_manager import get_current_user
+from app.db.session import get_async_session
+
+router = APIRouter(prefix=f"{settings.API_V1_STR}/admin", tags=["admin"],
+                   dependencies=[Depends(get_current_user(superuser=True))])
+
+
+@router.get("/model_stats", response_model=ModelRoutingStats)
+async def get_model_stats_api():
+    return get_model_stats()
+
+
+@router.get("/embedding_cache_stats", response_model=EmbeddingCacheStats)
+async def get_embedding_cache_stats_api():
+    return get_embedding_cache_stats()
+
+
+@router.get("/embedding_write_stats", response_model=EmbeddingWriteStats)
+async def get_embedding_write_stats_api():
+    return get_embedding_write_stats()
+
+
+@router.post("/reembed", response_model=ReembedReport, status_code=HTTPStatus.ACCEPTED)
+async def start_reembed_api(request: ReembedRequest):
+    return start_reembed(request)
+
+
+@router.get("/reembed", response_model=ReembedReport)
+async def get_reembed_report_api():
+    return get_reembed_report()
+
+
+@router.get("/embedding_models", response_model=list[EmbeddingModelRead])
+async def list_embedding_models_api(db: AsyncSession = Depends(get_async_session)):
+    return await list_embedding_models(db)
+
+
+@router.post("/embedding_models/shadow", response_model=ReembedReport, status_code=HTTPStatus.ACCEPTED)
+async def start_shadow_embedding_api(request: ShadowEmbeddingRequest, db: AsyncSession = Depends(get_async_session)):
+    return await start_shadow_embedding(db, request)
+
+
+@router.get("/embedding_models/shadow", response_model=ReembedReport)
+async def get_shadow_embedding_report_api():
+    return get_shadow_embedding_report()
+
+
+@router.delete("/embedding_models/shadow", status_code=HTTPStatus.NO_CONTENT)
+async def cancel_shadow_model_api(db: AsyncSession = Depends(get_async_session)):
+    await cancel_shadow_model(db)
+
+
+@router.get("/embedding_models/comparison", response_model=EmbeddingModelComparison)
+async def compare_embedding_models_api(db: AsyncSession = Depends(get_async_session)):
+    return await compare_embedding_models(db)
+
+
+@router.post("/embedding_models/cutover", response_model=EmbeddingModelRead)
+async def cutover_embedding_model_api(db: AsyncSession = Depends(get_async_session)):
+    return await cutover_embedding_model(db)
+
+
+@router.post("/embedding_compaction", response_model=EmbeddingCompactionReport)
+async def start_compaction_api(full: bool = False):
+    return await start_compaction(full)
+
+
+@router.get("/embedding_compaction", response_model=EmbeddingCompactionReport)
+async def get_compaction_report_api():
+    return get_compaction_report()
@@ -3,7 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.schemas.analysis import AnalysisResult, AnalysisResultInDb, AnalysisRequest
 from app.api.v1.schemas.conversation import ConversationWithMessages, MessageInDB
-from app.api.v1.services.analysis_service import analyze_document, upload_document_to_gemini, \
+from app.api.v1.services.analysis_service import analyze_document_by_id, \
     chat_with_document, get_document_analysis_results, \
     get_all_analysis_results
 from app.api.v1.services.conversation_service import get_conversation
@@ -32,12 +32,10 @@ async def get_document_analysis_results_api(document_id: int, user: User = Depen
 
 
 @router.post("/{document_id}/analyze", response_model=AnalysisResultInDb)
-async def analyze_uploaded_document(document_id: int, request_data: AnalysisRequest,
-                                    db: AsyncSession = Depends(get_async_session)):
+async def analyze_uploaded_document(document_id: int, request_data: AnalysisRequest):
     try:
-        document = await upload_document_to_gemini(db, document_id)
         checklist_id = request_data.checklist_id or None
-        analysis_data = await analyze_document(db, document, checklist_id)
+        analysis_data = await analyze_document_by_id(document_id, checklist_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
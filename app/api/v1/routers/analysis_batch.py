@@ -0,0 +1,33 @@
+from http import HTTPStatus
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.schemas.analysis_job import AnalysisBatchInDB, AnalysisBatchCreate, AnalysisJobInDB
+from app.api.v1.services.analysis_batch_service import create_analysis_batch, get_analysis_batch, \
+    get_analysis_batch_jobs
+from app.core.config import settings
+from app.core.user_manager import get_current_user
+from app.db.models import User
+from app.db.session import get_async_session
+
+router = APIRouter(prefix=f"{settings.API_V1_STR}/analysis_batches", tags=["analysis"],
+                   dependencies=[Depends(get_current_user())])
+
+
+@router.post("/", response_model=AnalysisBatchInDB, status_code=HTTPStatus.ACCEPTED)
+async def create_analysis_batch_api(batch: AnalysisBatchCreate, user: User = Depends(get_current_user()),
+                                    db: AsyncSession = Depends(get_async_session)):
+    return await create_analysis_batch(db, user, batch)
+
+
+@router.get("/{batch_id}", response_model=AnalysisBatchInDB)
+async def read_analysis_batch(batch_id: int, user: User = Depends(get_current_user()),
+                              db: AsyncSession = Depends(get_async_session)):
+    return await get_analysis_batch(db, user, batch_id)
+
+
+@router.get("/{batch_id}/jobs", response_model=list[AnalysisJobInDB])
+async def read_analysis_batch_jobs(batch_id: int, user: User = Depends(get_current_user()),
+                                   db: AsyncSession = Depends(get_async_session)):
+    return await get_analysis_batch_jobs(db, user, batch_id)
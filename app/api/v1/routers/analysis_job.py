@@ -0,0 +1,26 @@
+from http import HTTPStatus
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.schemas.analysis_job import AnalysisJobInDB, AnalysisJobCreate
+from app.api.v1.services.analysis_job_service import create_analysis_job, get_analysis_job
+from app.core.config import settings
+from app.core.user_manager import get_current_user
+from app.db.models import User
+from app.db.session import get_async_session
+
+router = APIRouter(prefix=f"{settings.API_V1_STR}/analysis_jobs", tags=["analysis"],
+                   dependencies=[Depends(get_current_user())])
+
+
+@router.post("/", response_model=AnalysisJobInDB, status_code=HTTPStatus.ACCEPTED)
+async def create_analysis_job_api(job: AnalysisJobCreate, user: User = Depends(get_current_user()),
+                                  db: AsyncSession = Depends(get_async_session)):
+    return await create_analysis_job(db, user, job)
+
+
+@router.get("/{job_id}", response_model=AnalysisJobInDB)
+async def read_analysis_job(job_id: int, user: User = Depends(get_current_user()),
+                            db: AsyncSession = Depends(get_async_session)):
+    return await get_analysis_job(db, user, job_id)
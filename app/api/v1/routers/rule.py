@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Response
 from fastapi.params import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.v1.schemas.rule import RuleInDB, RuleCreate, RuleUpdate
+from app.api.v1.schemas.rule import RuleInDB, RuleCreate, RuleUpdate, RuleSearchResult
 from app.api.v1.services.rule_service import get_rules, get_rule, create_rule as create_rule_service, \
     update_rule as update_rule_service, delete_rule as delete_rule_service, find_rules
 from app.core.config import settings
@@ -18,14 +20,20 @@ async def read_rules(policy_id: int, db: AsyncSession = Depends(get_async_sessio
     return await get_rules(db, policy_id)
 
 
-@router.get("/search", response_model=list[RuleInDB])
-async def search_rule(query: str, user: User = Depends(get_current_user()), db: AsyncSession = Depends(get_async_session)):
-    return await find_rules(db, query=query, user=user)
+@router.get("/search", response_model=list[RuleSearchResult])
+async def search_rule(response: Response, query: str = Query(min_length=1),
+                      limit: int = Query(settings.RULE_SEARCH_PAGE_SIZE, ge=1, le=settings.RULE_SEARCH_MAX_PAGE_SIZE),
+                      cursor: Optional[str] = None,
+                      user: User = Depends(get_current_user()), db: AsyncSession = Depends(get_async_session)):
+    rules, next_cursor = await find_rules(db, query=query, user=user, limit=limit, cursor=cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rules
 
 
 @router.post("/", response_model=RuleInDB)
-async def create_rule(background_tasks: BackgroundTasks, rule: RuleCreate, db: AsyncSession = Depends(get_async_session)):
-    return await create_rule_service(background_tasks, db, rule)
+async def create_rule(rule: RuleCreate, db: AsyncSession = Depends(get_async_session)):
+    return await create_rule_service(db, rule)
 
 
 @router.get("/{rule_id}", response_model=RuleInDB)
@@ -37,8 +45,8 @@ async def read_rule(rule_id: int, db: AsyncSession = Depends(get_async_session))
 
 
 @router.patch("/{rule_id}", response_model=RuleInDB)
-async def update_rule(background_tasks: BackgroundTasks, rule_id: int, rule: RuleUpdate, db: AsyncSession = Depends(get_async_session)):
-    updated_rule = await update_rule_service(background_tasks, db, rule_id, rule_data=rule)
+async def update_rule(rule_id: int, rule: RuleUpdate, db: AsyncSession = Depends(get_async_session)):
+    updated_rule = await update_rule_service(db, rule_id, rule_data=rule)
     if updated_rule is None:
         raise HTTPException(status_code=404, detail="Rule not found")
     return updated_rule
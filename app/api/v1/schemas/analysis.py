@@ -60,5 +60,7 @@ class AnalysisResultInDb(AnalysisResult):
     missing_clauses: Optional[List[MissingClause]] = None
     suggestions: Optional[List[Suggestion]] = None
     payment_terms: Optional[List[PaymentTerm]] = None
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
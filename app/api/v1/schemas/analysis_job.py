@@ -0,0 +1,68 @@
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel, computed_field, field_validator
+
+
+class AnalysisJobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+
+class AnalysisJobCreate(BaseModel):
+    document_id: int
+    checklist_id: Optional[int] = None
+
+
+class AnalysisJobInDB(BaseModel, from_attributes=True):
+    id: int
+    document_id: int
+    checklist_id: Optional[int] = None
+    user_id: Optional[int] = None
+    batch_id: Optional[int] = None
+    status: AnalysisJobStatus
+    analysis_result_id: Optional[int] = None
+    error: Optional[str] = None
+    stage_timings: Optional[dict[str, float]] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class AnalysisBatchCreate(BaseModel):
+    document_ids: list[int]
+    checklist_id: int
+
+    @field_validator('document_ids', mode='after')
+    @classmethod
+    def ensure_unique(cls, v: list[int]) -> list[int]:
+        if not v:
+            raise ValueError("At least one document is required")
+        return list(dict.fromkeys(v))
+
+
+class AnalysisBatchInDB(BaseModel, from_attributes=True):
+    id: int
+    checklist_id: int
+    user_id: Optional[int] = None
+    status: AnalysisJobStatus
+    total: int
+    completed: int
+    failed: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @computed_field
+    def progress(self) -> float:
+        return round((self.completed + self.failed) / self.total, 4) if self.total else 1.0
+
+    @computed_field
+    def documents_per_minute(self) -> Optional[float]:
+        if not self.started_at:
+            return None
+        elapsed = ((self.finished_at or datetime.now(timezone.utc)) - self.started_at).total_seconds()
+        return round((self.completed + self.failed) * 60 / elapsed, 2) if elapsed > 0 else None
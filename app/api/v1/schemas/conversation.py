@@ -22,6 +22,9 @@ class MessageCreate(MessageBase):
 
 class MessageInDB(MessageBase):
     id: int
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    is_cached: bool = False
     created_at: datetime
 
 
@@ -0,0 +1,96 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class ReembedStatus(str, Enum):
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+
+class EmbeddingModelStatus(str, Enum):
+    serving = "serving"
+    shadow = "shadow"
+    retired = "retired"
+
+
+class ReembedRequest(BaseModel):
+    # Also re-embed rows embedded before this moment, e.g. when the embedding model changed
+    older_than: Optional[datetime] = None
+    page_size: int = Field(default=500, gt=0, le=5000)
+
+
+class ReembedReport(BaseModel):
+    status: ReembedStatus = ReembedStatus.running
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    embedded: dict[str, int] = {}
+    # Rows whose text and model were unchanged, so they were not sent to the provider again
+    unchanged: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    items_per_second: float = 0.0
+    error: Optional[str] = None
+
+
+class EmbeddingWriteStats(BaseModel):
+    embedded: int
+    unchanged: int
+    api_calls: int
+
+
+class EmbeddingModelRead(BaseModel, from_attributes=True):
+    id: int
+    provider: str
+    model: str
+    dimensions: int
+    status: EmbeddingModelStatus
+    created_at: datetime
+    activated_at: Optional[datetime] = None
+
+
+class ShadowEmbeddingRequest(BaseModel):
+    provider: str
+    # None means the provider's default model
+    model: Optional[str] = None
+    page_size: int = Field(default=500, gt=0, le=5000)
+
+
+class SearchLatency(BaseModel):
+    p50_seconds: float
+    p95_seconds: float
+
+
+class EmbeddingModelComparison(BaseModel):
+    serving_model: str
+    shadow_model: Optional[str] = None
+    # Rows with a shadow embedding, cutover needs all of them
+    embedded: int = 0
+    missing: int = 0
+    # Shadow reads made by this process
+    queries: int = 0
+    top_k: int = 0
+    # Mean share of the serving top-k also found by the shadow model
+    recall_overlap: float = 0.0
+    serving_latency: Optional[SearchLatency] = None
+    shadow_latency: Optional[SearchLatency] = None
+
+
+class EmbeddingCompactionReport(BaseModel):
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    full: bool = False
+    # Embeddings of deleted or missing policies and rules
+    orphans_deleted: int = 0
+    size_before_bytes: int = 0
+    size_after_bytes: int = 0
+    reclaimed_bytes: int = 0
+    dead_rows_before: int = 0
+    dead_rows_after: int = 0
+    queries: int = 0
+    # Mean `semantic_search` time over the same probe queries
+    scan_seconds_before: float = 0.0
+    scan_seconds_after: float = 0.0
@@ -0,0 +1,40 @@
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ModelOperation(str, Enum):
+    analysis = "analysis"
+    chat = "chat"
+    query_rewrite = "query_rewrite"
+
+
+class ModelStats(BaseModel):
+    model: str
+    samples: int
+    p50_seconds: Optional[float] = None
+    p95_seconds: Optional[float] = None
+    error_rate: float
+
+
+class ModelRouteStats(BaseModel):
+    operation: ModelOperation
+    primary: str
+    fallback: Optional[str] = None
+    max_p95_seconds: float
+    active: str
+
+
+class ModelRoutingStats(BaseModel):
+    routes: list[ModelRouteStats]
+    models: list[ModelStats]
+
+
+class EmbeddingCacheStats(BaseModel):
+    memory_hits: int
+    db_hits: int
+    misses: int
+    evictions: int
+    memory_entries: int
+    hit_rate: float
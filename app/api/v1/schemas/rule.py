@@ -60,3 +60,8 @@ class RuleWithSimilarity(RuleInDB):
     similarity: float
 
 
+class RuleSearchResult(RuleInDB):
+    rank: float
+    highlight: Optional[str] = None
+
+
@@ -3,6 +3,7 @@ from typing import Optional, Any, List
 from pydantic import BaseModel
 from datetime import datetime, timezone
 
+from app.api.v1.schemas.analysis_job import AnalysisJobInDB, AnalysisBatchInDB
 from app.api.v1.schemas.conversation import MessageInDB, ConversationWithMessages
 
 
@@ -15,6 +16,8 @@ class WebSocketMessageType(str, Enum):
     ERROR = "error"
     PING = "ping"
     PONG = "pong"
+    ANALYSIS_JOB_FINISHED = "analysis_job_finished"
+    ANALYSIS_BATCH_FINISHED = "analysis_batch_finished"
 
 
 class WebSocketMessage(BaseModel):
@@ -45,4 +48,16 @@ class TypingIndicator(WebSocketMessage):
 
 class ErrorMessage(WebSocketMessage):
     type: WebSocketMessageType = WebSocketMessageType.ERROR
-    payload: dict = {"message": "An error occurred"}
\ No newline at end of file
+    payload: dict = {"message": "An error occurred"}
+
+
+class AnalysisJobFinished(WebSocketMessage):
+    type: WebSocketMessageType = WebSocketMessageType.ANALYSIS_JOB_FINISHED
+    conversation_id: Optional[int] = None
+    payload: AnalysisJobInDB
+
+
+class AnalysisBatchFinished(WebSocketMessage):
+    type: WebSocketMessageType = WebSocketMessageType.ANALYSIS_BATCH_FINISHED
+    conversation_id: Optional[int] = None
+    payload: AnalysisBatchInDB
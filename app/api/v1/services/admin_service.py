@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.schemas.embedding import ReembedRequest, ReembedReport, ReembedStatus, EmbeddingWriteStats, \
+    ShadowEmbeddingRequest
+from app.api.v1.schemas.model_stats import ModelRoutingStats, EmbeddingCacheStats
+from app.api.v1.services.embedding_model_service import start_shadow_model
+from app.api.v1.services.embedding_service import reembed_all, embedding_write_summary
+from app.core.ai.embedding_cache import embedding_cache
+from app.core.ai.model_router import model_router
+
+
+def get_model_stats() -> ModelRoutingStats:
+    return ModelRoutingStats(routes=model_router.routes_summary(), models=model_router.models_summary())
+
+
+def get_embedding_cache_stats() -> EmbeddingCacheStats:
+    return embedding_cache.summary()
+
+
+def get_embedding_write_stats() -> EmbeddingWriteStats:
+    return embedding_write_summary()
+
+
+reembed_report: Optional[ReembedReport] = None
+reembed_task: Optional[asyncio.Task] = None
+
+
+def start_reembed(request: ReembedRequest) -> ReembedReport:
+    global reembed_report, reembed_task
+
+    if reembed_report and reembed_report.status == ReembedStatus.running:
+        return reembed_report
+
+    reembed_report = ReembedReport(started_at=datetime.now(timezone.utc))
+    reembed_task = asyncio.create_task(reembed_all(request.older_than, request.page_size, reembed_report))
+    return reembed_report
+
+
+def get_reembed_report() -> ReembedReport:
+    if not reembed_report:
+        raise HTTPException(status_code=404, detail="No re-embedding has been started")
+    return reembed_report
+
+
+shadow_report: Optional[ReembedReport] = None
+shadow_task: Optional[asyncio.Task] = None
+
+
+async def start_shadow_embedding(db: AsyncSession, request: ShadowEmbeddingRequest) -> ReembedReport:
+    global shadow_report, shadow_task
+
+    await start_shadow_model(db, request)
+    shadow_report = ReembedReport(started_at=datetime.now(timezone.utc))
+    shadow_task = asyncio.create_task(reembed_all(page_size=request.page_size, report=shadow_report, shadow=True))
+    return shadow_report
+
+
+def get_shadow_embedding_report() -> ReembedReport:
+    if not shadow_report:
+        raise HTTPException(status_code=404, detail="No shadow embedding has been started")
+    return shadow_report
@@ -0,0 +1,288 @@
+import asyncio
+import time
+from datetime import datetime, timezone, timedelta
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from loguru import logger
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.schemas.analysis_job import AnalysisBatchCreate, AnalysisJobStatus, AnalysisBatchInDB
+from app.api.v1.schemas.websocket import AnalysisBatchFinished
+from app.api.v1.services.analysis_service import upload_document_to_gemini, get_policies_and_rules_from_checklist, \
+    build_analysis_result
+from app.api.v1.services.checklist_service import get_checklist
+from app.api.v1.services.websocket_service import manager
+from app.core.ai.document_analysis import run_analysis
+from app.core.ai.rule_sharding import render_rule_shards
+from app.core.ai.tokens import TokenUsage
+from app.core.config import settings
+from app.core.worker_pool import WorkerPool
+from app.db.advisory_lock import advisory_lock, try_advisory_lock
+from app.db.models import AnalysisBatch, AnalysisJob, Document, User
+from app.db.session import async_session_maker
+from app.db.soft_delete import filtered_select
+from app.utils.timing import timed_stage
+
+
+async def create_analysis_batch(db: AsyncSession, user: User, batch_data: AnalysisBatchCreate) -> AnalysisBatch:
+    if len(batch_data.document_ids) > settings.ANALYSIS_BATCH_MAX_DOCUMENTS:
+        raise HTTPException(HTTPStatus.BAD_REQUEST,
+                            f"A batch can contain at most {settings.ANALYSIS_BATCH_MAX_DOCUMENTS} documents")
+
+    checklist = await get_checklist(db, batch_data.checklist_id)
+    if not checklist:
+        raise HTTPException(HTTPStatus.NOT_FOUND, "Checklist not found")
+
+    query = filtered_select(Document.id).filter(Document.id.in_(batch_data.document_ids))
+    if not user.is_superuser:
+        query = query.filter(Document.company_id == user.company_id)
+    result = await db.execute(query)
+    found_ids = set(result.scalars().all())
+
+    missing_ids = [document_id for document_id in batch_data.document_ids if document_id not in found_ids]
+    if missing_ids:
+        raise HTTPException(HTTPStatus.NOT_FOUND, f"Documents {missing_ids} not found")
+
+    batch = AnalysisBatch(
+        checklist_id=batch_data.checklist_id,
+        user_id=user.id,
+        status=AnalysisJobStatus.queued,
+        total=len(batch_data.document_ids),
+        completed=0,
+        failed=0,
+        jobs=[
+            AnalysisJob(
+                document_id=document_id,
+                checklist_id=batch_data.checklist_id,
+                user_id=user.id,
+                status=AnalysisJobStatus.queued,
+            )
+            for document_id in batch_data.document_ids
+        ],
+    )
+    db.add(batch)
+    await db.commit()
+    await db.refresh(batch)
+
+    analysis_batch_workers.wake()
+    return batch
+
+
+async def get_analysis_batch(db: AsyncSession, user: User, batch_id: int) -> AnalysisBatch:
+    result = await db.execute(filtered_select(AnalysisBatch).filter(AnalysisBatch.id == batch_id))
+    batch = result.scalar_one_or_none()
+
+    if not batch or (batch.user_id != user.id and not user.is_superuser):
+        raise HTTPException(HTTPStatus.NOT_FOUND, "Analysis batch not found")
+    return batch
+
+
+async def get_analysis_batch_jobs(db: AsyncSession, user: User, batch_id: int) -> list[AnalysisJob]:
+    batch = await get_analysis_batch(db, user, batch_id)
+    result = await db.execute(
+        filtered_select(AnalysisJob).filter(AnalysisJob.batch_id == batch.id).order_by(AnalysisJob.id)
+    )
+    return result.scalars().all()
+
+
+async def claim_next_analysis_batch(db: AsyncSession) -> AnalysisBatch | None:
+    result = await db.execute(
+        filtered_select(AnalysisBatch)
+        .filter(AnalysisBatch.status == AnalysisJobStatus.queued)
+        .order_by(AnalysisBatch.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    batch = result.scalar_one_or_none()
+    if not batch:
+        return None
+
+    batch.status = AnalysisJobStatus.running
+    batch.started_at = datetime.now(timezone.utc)
+    await db.commit()
+    return batch
+
+
+async def run_next_analysis_batch() -> bool:
+    async with async_session_maker() as db:
+        batch = await claim_next_analysis_batch(db)
+        if not batch:
+            return False
+
+        batch_id = batch.id
+        # Held for the whole run, so requeue_stale_analysis_batches can tell a live batch from an orphaned one
+        async with advisory_lock(analysis_batch_lock_key(batch_id)):
+            try:
+                await run_analysis_batch(db, batch)
+            except Exception as e:
+                logger.error(f"Analysis batch {batch_id} failed: {str(e)}")
+                await db.rollback()
+                await fail_analysis_batch(db, batch_id, e)
+        await db.refresh(batch)
+
+    if batch.user_id:
+        message = AnalysisBatchFinished(payload=AnalysisBatchInDB.model_validate(batch))
+        await manager.send_to_user(batch.user_id, message.model_dump(mode="json"))
+    return True
+
+
+async def run_analysis_batch(db: AsyncSession, batch: AnalysisBatch):
+    started = time.perf_counter()
+
+    # The ruleset is the same for every document, so it's rendered (and sharded) once for the whole batch
+    policies_and_rules = await get_policies_and_rules_from_checklist(db, batch.checklist_id)
+    rule_shards = render_rule_shards(policies_and_rules)
+
+    result = await db.execute(
+        filtered_select(AnalysisJob)
+        .filter(AnalysisJob.batch_id == batch.id,
+                AnalysisJob.status.in_([AnalysisJobStatus.queued, AnalysisJobStatus.running]))
+        .order_by(AnalysisJob.id)
+    )
+    jobs = result.scalars().all()
+
+    upload_slots = asyncio.Semaphore(settings.ANALYSIS_BATCH_UPLOAD_CONCURRENCY)
+    analysis_slots = asyncio.Semaphore(settings.ANALYSIS_BATCH_LLM_CONCURRENCY)
+
+    async def analyze(job: AnalysisJob):
+        timings: dict[str, float] = {}
+        usage = TokenUsage()
+        try:
+            # Uploads and LLM calls are throttled separately, so uploads for the next
+            # documents overlap with the analysis of the previous ones
+            async with upload_slots:
+                async with async_session_maker() as upload_db:
+                    document = await upload_document_to_gemini(upload_db, job.document_id, timings)
+            async with analysis_slots:
+                with timed_stage(timings, "llm"):
+                    analysis_data = await run_analysis(document.gemini_name, document.text_content, rule_shards,
+                                                       usage)
+            return job, analysis_data, timings, usage, None
+        except Exception as e:
+            return job, None, timings, usage, e
+
+    finished = []
+    for next_finished in asyncio.as_completed([analyze(job) for job in jobs]):
+        finished.append(await next_finished)
+        if len(finished) >= settings.ANALYSIS_BATCH_PERSIST_SIZE:
+            await persist_analysis_batch_results(db, batch, finished)
+            finished = []
+    await persist_analysis_batch_results(db, batch, finished)
+
+    batch.status = AnalysisJobStatus.completed if batch.completed or not batch.total else AnalysisJobStatus.failed
+    batch.finished_at = datetime.now(timezone.utc)
+    await db.commit()
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Analysis batch {batch.id} finished: {batch.completed} completed, {batch.failed} failed "
+                f"in {elapsed:.1f}s ({len(jobs) * 60 / elapsed if elapsed else 0:.1f} documents/minute)")
+
+
+async def fail_analysis_batch(db: AsyncSession, batch_id: int, error: Exception):
+    """Fail the batch and its unfinished jobs, keeping the results persisted before the error."""
+    finished_at = datetime.now(timezone.utc)
+    result = await db.execute(
+        update(AnalysisJob)
+        .where(AnalysisJob.batch_id == batch_id,
+               AnalysisJob.status.in_([AnalysisJobStatus.queued, AnalysisJobStatus.running]))
+        .values(status=AnalysisJobStatus.failed, error=getattr(error, "detail", None) or str(error),
+                finished_at=finished_at)
+    )
+    await db.execute(
+        update(AnalysisBatch)
+        .where(AnalysisBatch.id == batch_id)
+        .values(status=AnalysisJobStatus.failed, failed=AnalysisBatch.failed + result.rowcount,
+                finished_at=finished_at)
+    )
+    await db.commit()
+
+
+async def persist_analysis_batch_results(db: AsyncSession, batch: AnalysisBatch, finished: list):
+    if not finished:
+        return
+
+    persist_started = time.perf_counter()
+    finished_at = datetime.now(timezone.utc)
+    succeeded = [(job, analysis_data, timings, usage)
+                 for job, analysis_data, timings, usage, error in finished if error is None]
+
+    analysis_results = [build_analysis_result(job.document_id, batch.checklist_id, analysis_data, usage)
+                        for job, analysis_data, _, usage in succeeded]
+    db.add_all(analysis_results)
+    await db.flush()
+
+    persist_seconds = round(time.perf_counter() - persist_started, 3)
+    for (job, _, timings, _), analysis_result in zip(succeeded, analysis_results):
+        job.analysis_result_id = analysis_result.id
+        job.status = AnalysisJobStatus.completed
+        job.stage_timings = {**timings, "persist": persist_seconds}
+        job.finished_at = finished_at
+
+    for job, _, timings, _, error in finished:
+        if error is not None:
+            logger.error(f"Analysis job {job.id} in batch {batch.id} failed: {str(error)}")
+            job.error = getattr(error, "detail", None) or str(error)
+            job.status = AnalysisJobStatus.failed
+            job.stage_timings = timings
+            job.finished_at = finished_at
+
+    if succeeded:
+        await db.execute(
+            update(Document)
+            .where(Document.id.in_([job.document_id for job, *_ in succeeded]))
+            .values(is_processed=True)
+        )
+
+    batch.completed += len(succeeded)
+    batch.failed += len(finished) - len(succeeded)
+    await db.commit()
+
+
+def analysis_batch_lock_key(batch_id: int) -> str:
+    return f"analysis_batch:{batch_id}"
+
+
+async def requeue_stale_analysis_batches() -> bool:
+    """
+    Requeue running batches whose worker is gone: their lock is free. Batches claimed less than
+    ANALYSIS_JOB_STALE_AFTER_SECONDS ago are left alone, their worker may not have taken the lock yet.
+    """
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.ANALYSIS_JOB_STALE_AFTER_SECONDS)
+
+    async with async_session_maker() as db:
+        stale = await db.execute(
+            select(AnalysisBatch.id)
+            .filter(AnalysisBatch.status == AnalysisJobStatus.running, AnalysisBatch.started_at < stale_before)
+        )
+        batch_ids = []
+        for batch_id in stale.scalars().all():
+            async with try_advisory_lock(analysis_batch_lock_key(batch_id)) as locked:
+                if not locked:
+                    continue
+                result = await db.execute(
+                    update(AnalysisBatch)
+                    .where(AnalysisBatch.id == batch_id, AnalysisBatch.status == AnalysisJobStatus.running)
+                    .values(status=AnalysisJobStatus.queued, started_at=None)
+                )
+                await db.commit()
+                if result.rowcount:
+                    batch_ids.append(batch_id)
+
+    if batch_ids:
+        logger.warning(f"Requeued stale analysis batches {batch_ids}")
+        analysis_batch_workers.wake()
+    return False
+
+
+analysis_batch_workers = WorkerPool(
+    "analysis batch",
+    concurrency=settings.ANALYSIS_BATCH_WORKERS,
+    run_once=run_next_analysis_batch,
+    poll_interval=settings.ANALYSIS_JOB_POLL_INTERVAL_SECONDS,
+)
+
+# Polls for batches orphaned by a worker that crashed, so they don't wait for the next restart
+analysis_batch_requeue_watcher = WorkerPool("analysis batch requeue", 1, requeue_stale_analysis_batches,
+                                            poll_interval=settings.ANALYSIS_JOB_STALE_AFTER_SECONDS)
@@ -0,0 +1,153 @@
+from datetime import datetime, timezone, timedelta
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from loguru import logger
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.schemas.analysis_job import AnalysisJobCreate, AnalysisJobStatus, AnalysisJobInDB
+from app.api.v1.schemas.websocket import AnalysisJobFinished
+from app.api.v1.services.analysis_service import analyze_document_by_id
+from app.api.v1.services.document_service import get_document
+from app.api.v1.services.websocket_service import manager
+from app.core.config import settings
+from app.core.worker_pool import WorkerPool
+from app.db.advisory_lock import advisory_lock, try_advisory_lock
+from app.db.models import AnalysisJob, User
+from app.db.session import async_session_maker
+from app.db.soft_delete import filtered_select
+
+
+async def create_analysis_job(db: AsyncSession, user: User, job_data: AnalysisJobCreate) -> AnalysisJob:
+    document = await get_document(db, job_data.document_id)
+    if not document:
+        raise HTTPException(HTTPStatus.NOT_FOUND, "Document not found")
+    if not user.is_superuser and document.company_id != user.company_id:
+        raise HTTPException(HTTPStatus.FORBIDDEN, "You are not allowed to analyze this document")
+
+    job = AnalysisJob(
+        document_id=job_data.document_id,
+        checklist_id=job_data.checklist_id or None,
+        user_id=user.id,
+        status=AnalysisJobStatus.queued,
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+
+    analysis_workers.wake()
+    return job
+
+
+async def get_analysis_job(db: AsyncSession, user: User, job_id: int) -> AnalysisJob:
+    result = await db.execute(filtered_select(AnalysisJob).filter(AnalysisJob.id == job_id))
+    job = result.scalar_one_or_none()
+
+    if not job or (job.user_id != user.id and not user.is_superuser):
+        raise HTTPException(HTTPStatus.NOT_FOUND, "Analysis job not found")
+    return job
+
+
+async def claim_next_analysis_job(db: AsyncSession) -> AnalysisJob | None:
+    # SKIP LOCKED lets workers in every API process share the queue without handing out a job twice
+    result = await db.execute(
+        filtered_select(AnalysisJob)
+        .filter(AnalysisJob.status == AnalysisJobStatus.queued, AnalysisJob.batch_id.is_(None))
+        .order_by(AnalysisJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = result.scalar_one_or_none()
+    if not job:
+        return None
+
+    job.status = AnalysisJobStatus.running
+    job.started_at = datetime.now(timezone.utc)
+    await db.commit()
+    return job
+
+
+async def run_next_analysis_job() -> bool:
+    async with async_session_maker() as db:
+        job = await claim_next_analysis_job(db)
+        if not job:
+            return False
+
+        timings: dict[str, float] = {}
+        # Held for the whole run, so requeue_stale_analysis_jobs can tell a live job from an orphaned one
+        async with advisory_lock(analysis_job_lock_key(job.id)):
+            try:
+                analysis_result = await analyze_document_by_id(job.document_id, job.checklist_id, timings)
+                job.analysis_result_id = analysis_result.id
+                job.status = AnalysisJobStatus.completed
+            except Exception as e:
+                logger.error(f"Analysis job {job.id} failed: {str(e)}")
+                job.error = getattr(e, "detail", None) or str(e)
+                job.status = AnalysisJobStatus.failed
+
+            job.stage_timings = timings
+            job.finished_at = datetime.now(timezone.utc)
+            await db.commit()
+        await db.refresh(job)
+
+    logger.info(f"Analysis job {job.id} finished as {job.status}, stage timings: {timings}")
+    await notify_analysis_job_finished(job)
+    return True
+
+
+async def notify_analysis_job_finished(job: AnalysisJob):
+    if not job.user_id:
+        return
+
+    message = AnalysisJobFinished(payload=AnalysisJobInDB.model_validate(job))
+    await manager.send_to_user(job.user_id, message.model_dump(mode="json"))
+
+
+def analysis_job_lock_key(job_id: int) -> str:
+    return f"analysis_job:{job_id}"
+
+
+async def requeue_stale_analysis_jobs() -> bool:
+    """
+    Requeue running jobs whose worker is gone: their lock is free. Jobs claimed less than
+    ANALYSIS_JOB_STALE_AFTER_SECONDS ago are left alone, their worker may not have taken the lock yet.
+    """
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.ANALYSIS_JOB_STALE_AFTER_SECONDS)
+
+    async with async_session_maker() as db:
+        stale = await db.execute(
+            select(AnalysisJob.id)
+            .filter(AnalysisJob.status == AnalysisJobStatus.running, AnalysisJob.batch_id.is_(None),
+                    AnalysisJob.started_at < stale_before)
+        )
+        job_ids = []
+        for job_id in stale.scalars().all():
+            async with try_advisory_lock(analysis_job_lock_key(job_id)) as locked:
+                if not locked:
+                    continue
+                result = await db.execute(
+                    update(AnalysisJob)
+                    .where(AnalysisJob.id == job_id, AnalysisJob.status == AnalysisJobStatus.running)
+                    .values(status=AnalysisJobStatus.queued, started_at=None)
+                )
+                await db.commit()
+                if result.rowcount:
+                    job_ids.append(job_id)
+
+    if job_ids:
+        logger.warning(f"Requeued stale analysis jobs {job_ids}")
+        analysis_workers.wake()
+    return False
+
+
+analysis_workers = WorkerPool(
+    "analysis",
+    concurrency=settings.ANALYSIS_WORKERS,
+    run_once=run_next_analysis_job,
+    poll_interval=settings.ANALYSIS_JOB_POLL_INTERVAL_SECONDS,
+)
+
+# Polls for jobs orphaned by a worker that crashed, so they don't wait for the next restart
+analysis_job_requeue_watcher = WorkerPool("analysis job requeue", 1, requeue_stale_analysis_jobs,
+                                          poll_interval=settings.ANALYSIS_JOB_STALE_AFTER_SECONDS)
@@ -1,9 +1,10 @@
+import asyncio
 import os
+from datetime import datetime, timezone
 from http import HTTPStatus
 from typing import Optional
 
 from fastapi import HTTPException
-from google.genai.errors import APIError
 from loguru import logger
 from sqlalchemy import and_
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -19,11 +20,18 @@ from app.api.v1.services.checklist_service import get_checklist
 from app.api.v1.services.conversation_service import get_conversation, create_conversation, add_message, \
     get_recent_messages
 from app.api.v1.services.policy_service import get_active_policies_by_company
-from app.core.ai.ai_client import gemini_client
-from app.core.ai.document_analysis import upload_file, initial_analysis, chat_with_document as ask_the_document
+from app.core.ai.document_analysis import upload_file, run_analysis, chat_with_document as ask_the_document
+from app.core.ai.providers import get_llm_provider, ProviderError
+from app.core.ai.rule_sharding import render_rule_shards
+from app.core.ai.tokens import TokenUsage
+from app.core.single_flight import SingleFlight
+from app.db.advisory_lock import advisory_lock
 from app.db.models import Document, AnalysisResult, User, Policy, PolicyRule, Checklist
+from app.db.session import async_session_maker
 from app.db.soft_delete import filtered_select, filtered_load
-from app.utils.formatters import format_policies_and_rules_into_text
+from app.utils.timing import timed_stage
+
+analysis_flight = SingleFlight()
 
 
 async def get_all_analysis_results(db: AsyncSession, user: User):
@@ -65,7 +73,8 @@ async def get_document_analysis_results(db: AsyncSession, user: User, document_i
     ]
 
 
-async def upload_document_to_gemini(db: AsyncSession, document_id: int) -> Document:
+async def upload_document_to_gemini(db: AsyncSession, document_id: int,
+                                    timings: Optional[dict[str, float]] = None) -> Document:
     result = await db.execute(filtered_select(Document).filter(Document.id == document_id))
     document = result.scalar_one_or_none()
 
@@ -80,16 +89,19 @@ async def upload_document_to_gemini(db: AsyncSession, document_id: int) -> Docum
 
     if document.content_type != "text/plain":
         try:
-            document_text = document.text_content or DocumentProcessor().process_document(document.file_path)
-
-            file_path = f"/tmp/{document.filename}.txt"
-            with open(file_path, "w", encoding="utf-8") as temp_file:
-                temp_file.write(document_text)
-            temp_file_created = True
+            with timed_stage(timings, "extract"):
+                document_text = document.text_content or await asyncio.to_thread(
+                    DocumentProcessor().process_document, document.file_path)
+
+                file_path = f"/tmp/{document.filename}.txt"
+                with open(file_path, "w", encoding="utf-8") as temp_file:
+                    temp_file.write(document_text)
+                temp_file_created = True
         except ValueError as e:
             print(f"Error processing {document_id}: {e}")
 
-    response = upload_file(file_path)
+    with timed_stage(timings, "upload"):
+        response = await asyncio.to_thread(upload_file, file_path)
 
     document.gemini_name = response.name
 
@@ -144,18 +156,37 @@ async def get_policies_and_rules_from_checklist(db: AsyncSession, checklist_id:
     return policies_and_rules
 
 
-async def analyze_document(db: AsyncSession, document: Document, checklist_id: Optional[int] = None):
-    if checklist_id:
-        policies_and_rules = await get_policies_and_rules_from_checklist(db, checklist_id)
-    else:
-        policies_and_rules = await get_active_policies_by_company(db, company_id=document.company_id)
+async def analyze_document(db: AsyncSession, document: Document, checklist_id: Optional[int] = None,
+                           timings: Optional[dict[str, float]] = None):
+    with timed_stage(timings, "rules"):
+        if checklist_id:
+            policies_and_rules = await get_policies_and_rules_from_checklist(db, checklist_id)
+        else:
+            policies_and_rules = await get_active_policies_by_company(db, company_id=document.company_id)
 
-    pr_text = format_policies_and_rules_into_text(policies_and_rules)
-    analysis_data = initial_analysis(document.gemini_name, pr_text)
+        rule_shards = render_rule_shards(policies_and_rules)
 
-    analysis_result_db = AnalysisResult(
-        document_id=document.id,
+    usage = TokenUsage()
+    with timed_stage(timings, "llm"):
+        analysis_data = await run_analysis(document.gemini_name, document.text_content, rule_shards, usage)
+
+    analysis_result_db = build_analysis_result(document.id, checklist_id, analysis_data, usage)
+
+    with timed_stage(timings, "persist"):
+        db.add(analysis_result_db)
+        document.is_processed = True
+        await db.commit()
+        await db.refresh(analysis_result_db)
+    return analysis_result_db
+
+
+def build_analysis_result(document_id: int, checklist_id: Optional[int], analysis_data,
+                          usage: Optional[TokenUsage] = None) -> AnalysisResult:
+    return AnalysisResult(
+        document_id=document_id,
         checklist_id=checklist_id,
+        input_tokens=usage.input_tokens if usage else None,
+        output_tokens=usage.output_tokens if usage else None,
         title=analysis_data.title,
         company_name=analysis_data.company_name,
         conflicts=[conflict.model_dump() for conflict in analysis_data.conflicts] if analysis_data.conflicts else [],
@@ -168,11 +199,46 @@ async def analyze_document(db: AsyncSession, document: Document, checklist_id: O
                        analysis_data.payment_terms] if analysis_data.payment_terms else [],
     )
 
-    db.add(analysis_result_db)
-    document.is_processed = True
-    await db.commit()
-    await db.refresh(analysis_result_db)
-    return analysis_result_db
+
+async def analyze_document_by_id(document_id: int, checklist_id: Optional[int] = None,
+                                 timings: Optional[dict[str, float]] = None) -> AnalysisResult:
+    # Concurrent requests for the same (document, checklist) share one upload + analysis run.
+    # Stage timings are only recorded by the caller that started the run.
+    return await analysis_flight.do(
+        (document_id, checklist_id),
+        lambda: run_exclusive_analysis(document_id, checklist_id, timings)
+    )
+
+
+async def run_exclusive_analysis(document_id: int, checklist_id: Optional[int] = None,
+                                 timings: Optional[dict[str, float]] = None) -> AnalysisResult:
+    requested_at = datetime.now(timezone.utc)
+
+    # Other API workers may be analyzing the same pair - wait for them and reuse their result
+    async with advisory_lock(f"analysis:{document_id}:{checklist_id or 0}"):
+        async with async_session_maker() as db:
+            existing_result = await get_analysis_result_created_since(db, document_id, checklist_id, requested_at)
+            if existing_result:
+                logger.info(f"Reusing analysis result {existing_result.id} for document {document_id}")
+                return existing_result
+
+            document = await upload_document_to_gemini(db, document_id, timings)
+            return await analyze_document(db, document, checklist_id, timings)
+
+
+async def get_analysis_result_created_since(db: AsyncSession, document_id: int, checklist_id: Optional[int],
+                                            created_since: datetime) -> Optional[AnalysisResult]:
+    checklist_filter = AnalysisResult.checklist_id == checklist_id if checklist_id \
+        else AnalysisResult.checklist_id.is_(None)
+
+    result = await db.execute(
+        filtered_select(AnalysisResult)
+        .filter(AnalysisResult.document_id == document_id, checklist_filter,
+                AnalysisResult.created_at >= created_since)
+        .order_by(AnalysisResult.id.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
 
 
 async def chat_with_document(db: AsyncSession, document_id: int, user: User, message: str):
@@ -192,17 +258,19 @@ async def chat_with_document(db: AsyncSession, document_id: int, user: User, mes
 
     await add_message(db, conversation.id, message, MessageAuthor.user)
 
-    response = await ask_the_document(text=message, gemini_file_name=document.gemini_name, db=db)
+    usage = TokenUsage()
+    response = await ask_the_document(text=message, document=document, db=db, usage=usage)
 
-    answer = await add_message(db, conversation.id, response, MessageAuthor.legalcheck)
+    answer = await add_message(db, conversation.id, response.text, MessageAuthor.legalcheck, usage,
+                               is_cached=response.is_cached)
 
     return answer
 
 
 def check_document_availability(document: Document):
     try:
-        gemini_client.files.get(name=document.gemini_name)
+        get_llm_provider().get_file(document.gemini_name)
         return True
-    except APIError as e:
-        logger.error(f"Error getting document {document.id} from Gemini: {e.code} - {e.message}")
+    except ProviderError as e:
+        logger.error(f"Error getting document {document.id} from {get_llm_provider().name}: {e.code} - {e.message}")
         return False
@@ -5,6 +5,7 @@ from sqlalchemy.future import select
 
 from app.api.v1.schemas.company import CompanyCreate, CompanyUpdate
 from app.api.v1.schemas.policy import PolicyCreate, PolicyUpdate, PolicyType
+from app.api.v1.services.embedding_service import delete_policy_embeddings
 from app.db.models import Policy, User, Company
 from app.db.soft_delete import filtered_select
 
@@ -48,4 +49,6 @@ async def delete_company(db: AsyncSession, company_id: int):
     if not db_company:
         return None
     await db_company.soft_delete(db=db, cascade=True)
+    result = await db.execute(select(Policy.id).filter(Policy.company_id == company_id))
+    await delete_policy_embeddings(db, result.scalars().all())
     await db.commit()
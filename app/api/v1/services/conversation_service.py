@@ -1,3 +1,5 @@
+from typing import Optional
+
 from fastapi import HTTPException
 from loguru import logger
 from sqlalchemy import select
@@ -6,6 +8,7 @@ from sqlalchemy.orm import joinedload
 
 from app.api.v1.schemas.conversation import ConversationCreate, MessageAuthor, ConversationWithMessages, \
     ConversationUpdate
+from app.core.ai.tokens import TokenUsage
 from app.db.models import Conversation, Message, User
 
 
@@ -71,12 +74,16 @@ async def update_conversation(db: AsyncSession, user: User, conversation_id: int
     return await get_conversation(db, conversation_id)
 
 
-async def add_message(db: AsyncSession, conversation_id: int, message: str, author: MessageAuthor):
+async def add_message(db: AsyncSession, conversation_id: int, message: str, author: MessageAuthor,
+                      usage: Optional[TokenUsage] = None, is_cached: bool = False):
     conversation = await get_conversation(db, conversation_id)
     if not conversation:
         raise ValueError("Conversation not found")
 
-    message = Message(conversation_id=conversation_id, content=message, author=author)
+    message = Message(conversation_id=conversation_id, content=message, author=author, is_cached=is_cached)
+    if usage is not None:
+        message.input_tokens = usage.input_tokens
+        message.output_tokens = usage.output_tokens
     db.add(message)
     await db.commit()
     await db.refresh(message)
@@ -4,12 +4,15 @@ from http import HTTPStatus
 
 from fastapi import BackgroundTasks, UploadFile, HTTPException
 from loguru import logger
+from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.analysers.document_processor import DocumentProcessor
 from app.api.v1.schemas.document import DocumentCreate
+from app.core.ai.answer_cache import invalidate_document_answers
+from app.core.ai.document_retrieval import index_document_chunks
 from app.core.config import settings
-from app.db.models import Document, User
+from app.db.models import Document, DocumentChunk, User
 from app.db.soft_delete import filtered_select
 
 DOCUMENT_STORAGE = os.path.join(settings.BASE_DIR, "storage/documents")
@@ -80,9 +83,18 @@ async def ocr_document(document_id: int, db: AsyncSession) -> None:
             return
 
         document.text_content = DocumentProcessor().process_document(document.file_path)
+        await invalidate_document_answers(db, document.id)
         await db.commit()
     except ValueError as e:
         logger.error(f"Error processing document {document_id}. {e}")
+        return
+
+    try:
+        await index_document_chunks(db, document)
+        await db.commit()
+    except Exception as e:
+        # Chat falls back to sending the whole document
+        logger.error(f"Error indexing document {document_id} chunks. {e}")
 
 
 async def delete_document(db: AsyncSession, user: User, document_id: int):
@@ -101,5 +113,7 @@ async def delete_document(db: AsyncSession, user: User, document_id: int):
             logger.warning(f"Document {document_id} file was missing during removal")
 
     await document.soft_delete(db=db, cascade=True)
+    await invalidate_document_answers(db, document_id)
+    await db.execute(delete(DocumentChunk).where(DocumentChunk.document_id == document_id))
 
     await db.commit()
@@ -0,0 +1,141 @@
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from loguru import logger
+from sqlalchemy import select, delete, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.schemas.embedding import EmbeddingCompactionReport
+from app.api.v1.services.embedding_service import EMBEDDABLE_CONTENT
+from app.core.ai.embedding_cache import to_list
+from app.core.ai.embedding_search import semantic_search
+from app.core.config import settings
+from app.core.worker_pool import WorkerPool
+from app.db.advisory_lock import try_advisory_lock
+from app.db.models import Embedding, ShadowEmbedding
+from app.db.session import async_session_maker, engine
+
+COMPACTED_TABLES = (Embedding, ShadowEmbedding)
+
+compaction_report: Optional[EmbeddingCompactionReport] = None
+
+
+async def table_stats(db: AsyncSession) -> tuple[int, int]:
+    """Total size (with indexes and TOAST) and dead rows of the compacted tables."""
+    size, dead_rows = 0, 0
+    for table in COMPACTED_TABLES:
+        result = await db.execute(
+            text("SELECT pg_total_relation_size(relid), n_dead_tup FROM pg_stat_user_tables WHERE relname = :table"),
+            {"table": table.__tablename__},
+        )
+        row = result.one_or_none()
+        if row:
+            size += row[0]
+            dead_rows += row[1]
+    return size, dead_rows
+
+
+async def delete_orphan_embeddings(db: AsyncSession) -> int:
+    """Embeddings whose policy or rule is gone - left behind by soft-deletes that didn't delete them."""
+    deleted = 0
+    for content_type, (model, _) in EMBEDDABLE_CONTENT.items():
+        for table in COMPACTED_TABLES:
+            live = select(model.id).filter(model.id == table.content_id, model.is_deleted == False)
+            result = await db.execute(delete(table).where(table.content_type == content_type, ~live.exists()))
+            deleted += result.rowcount
+    return deleted
+
+
+async def vacuum_embeddings(full: bool):
+    # VACUUM can't run in a transaction
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table in COMPACTED_TABLES:
+            await conn.execute(text(f"VACUUM ({'FULL, ' if full else ''}ANALYZE) {table.__tablename__}"))
+
+
+async def probe_queries(db: AsyncSession) -> list[tuple[list[float], Optional[int]]]:
+    result = await db.execute(
+        select(Embedding.embedding, Embedding.company_id)
+        .order_by(func.random())
+        .limit(settings.EMBEDDING_COMPACTION_PROBE_QUERIES)
+    )
+    return [(to_list(vector), company_id) for vector, company_id in result.all()]
+
+
+async def time_semantic_search(probes: list[tuple[list[float], Optional[int]]]) -> float:
+    if not probes:
+        return 0.0
+    async with async_session_maker() as db:
+        started = time.perf_counter()
+        for vector, company_id in probes:
+            await semantic_search(db, embedding=vector, company_id=company_id)
+        return round((time.perf_counter() - started) / len(probes), 4)
+
+
+async def compact_embeddings(full: bool = False) -> EmbeddingCompactionReport:
+    """
+    Delete orphaned embeddings and VACUUM the embedding tables, measuring `semantic_search` before
+    and after. A plain VACUUM makes dead rows reusable without blocking searches; `full` rewrites
+    the tables to return the space to the OS, but locks them while it runs.
+    """
+    global compaction_report
+    report = EmbeddingCompactionReport(started_at=datetime.now(timezone.utc), full=full)
+
+    async with async_session_maker() as db:
+        probes = await probe_queries(db)
+        report.queries = len(probes)
+        report.scan_seconds_before = await time_semantic_search(probes)
+        report.size_before_bytes, report.dead_rows_before = await table_stats(db)
+
+        report.orphans_deleted = await delete_orphan_embeddings(db)
+        await db.commit()
+
+    await vacuum_embeddings(full)
+
+    async with async_session_maker() as db:
+        report.size_after_bytes, report.dead_rows_after = await table_stats(db)
+    report.reclaimed_bytes = max(report.size_before_bytes - report.size_after_bytes, 0)
+    report.scan_seconds_after = await time_semantic_search(probes)
+    report.finished_at = datetime.now(timezone.utc)
+
+    logger.info(f"Compacted embeddings: {report.orphans_deleted} orphans deleted, {report.reclaimed_bytes} bytes "
+                f"reclaimed, search {report.scan_seconds_before}s -> {report.scan_seconds_after}s")
+    compaction_report = report
+    return report
+
+
+async def start_compaction(full: bool = False) -> EmbeddingCompactionReport:
+    async with try_advisory_lock("embedding_compaction") as locked:
+        if not locked:
+            raise HTTPException(status_code=409, detail="A compaction is already running")
+        return await compact_embeddings(full)
+
+
+def get_compaction_report() -> EmbeddingCompactionReport:
+    if not compaction_report:
+        raise HTTPException(status_code=404, detail="No compaction has run in this process")
+    return compaction_report
+
+
+async def run_scheduled_compaction() -> bool:
+    # Every process checks; the last manual VACUUM of `embeddings` tells whether any of them is due
+    async with try_advisory_lock("embedding_compaction") as locked:
+        if not locked:
+            return False
+        async with async_session_maker() as db:
+            result = await db.execute(
+                text("SELECT last_vacuum FROM pg_stat_user_tables WHERE relname = :table"),
+                {"table": Embedding.__tablename__},
+            )
+            last_vacuum = result.scalar_one_or_none()
+        due = datetime.now(timezone.utc) - timedelta(seconds=settings.EMBEDDING_COMPACTION_INTERVAL_SECONDS)
+        if last_vacuum is None or last_vacuum < due:
+            await compact_embeddings()
+    return False
+
+
+embedding_compaction_workers = WorkerPool("embedding compaction", 1, run_scheduled_compaction,
+                                          poll_interval=settings.EMBEDDING_COMPACTION_INTERVAL_SECONDS / 12)
@@ -0,0 +1,198 @@
+import asyncio
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+from loguru import logger
+from sqlalchemy import select, update, delete, func, and_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.schemas.embedding import EmbeddingModelStatus, ShadowEmbeddingRequest, EmbeddingModelComparison, \
+    SearchLatency
+from app.core.ai.embedding_search import shadow_reads
+from app.core.ai.model_router import percentile
+from app.core.ai.providers import EMBEDDING_PROVIDERS, EMBEDDING_DIMENSIONS, build_embedding_provider, \
+    embedding_models, get_embedding_provider, get_shadow_embedding_provider, EmbeddingProvider
+from app.core.config import settings
+from app.core.worker_pool import WorkerPool
+from app.db.models import EmbeddingModel, Embedding, ShadowEmbedding, CachedAnswer
+from app.db.session import async_session_maker
+
+
+async def current_embedding_models(db: AsyncSession, for_update: bool = False) -> dict[str, EmbeddingModel]:
+    query = select(EmbeddingModel).filter(EmbeddingModel.status != EmbeddingModelStatus.retired)
+    result = await db.execute(query.with_for_update() if for_update else query)
+    return {row.status: row for row in result.scalars().all()}
+
+
+async def load_embedding_models(db: AsyncSession):
+    """Point `embedding_models` at the serving and shadow rows, registering the configured model on first run."""
+    rows = await current_embedding_models(db)
+    serving = rows.get(EmbeddingModelStatus.serving)
+    if not serving:
+        provider = build_embedding_provider(settings.EMBEDDING_PROVIDER, settings.EMBEDDING_MODEL)
+        now = datetime.now(timezone.utc)
+        await db.execute(insert(EmbeddingModel).values(
+            provider=provider.name, model=provider.model, dimensions=EMBEDDING_DIMENSIONS,
+            status=EmbeddingModelStatus.serving, created_at=now, activated_at=now,
+        ).on_conflict_do_nothing())
+        await db.commit()
+        rows = await current_embedding_models(db)
+        serving = rows[EmbeddingModelStatus.serving]
+
+    if embedding_models.serving != (serving.provider, serving.model):
+        logger.info(f"Embedding with {serving.provider}:{serving.model}")
+    embedding_models.serving = (serving.provider, serving.model)
+    shadow = rows.get(EmbeddingModelStatus.shadow)
+    embedding_models.shadow = (shadow.provider, shadow.model) if shadow else None
+
+
+async def refresh_embedding_models() -> bool:
+    async with async_session_maker() as db:
+        await load_embedding_models(db)
+    return False
+
+
+# Polls the table, so every process follows a cutover within EMBEDDING_MODEL_REFRESH_SECONDS
+embedding_model_watcher = WorkerPool("embedding model", 1, refresh_embedding_models,
+                                     poll_interval=settings.EMBEDDING_MODEL_REFRESH_SECONDS)
+
+
+async def list_embedding_models(db: AsyncSession) -> list[EmbeddingModel]:
+    result = await db.execute(select(EmbeddingModel).order_by(EmbeddingModel.created_at.desc()))
+    return result.scalars().all()
+
+
+async def embedding_dimensions(provider: EmbeddingProvider) -> int:
+    try:
+        vector = await asyncio.to_thread(provider.embed, "Embedding model dimension check")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Can't embed with {provider.key}: {str(e)}")
+    return len(vector)
+
+
+async def start_shadow_model(db: AsyncSession, request: ShadowEmbeddingRequest) -> EmbeddingModel:
+    if request.provider not in EMBEDDING_PROVIDERS:
+        raise HTTPException(status_code=400, detail=f"Unknown embedding provider {request.provider}")
+    provider = build_embedding_provider(request.provider, request.model)
+    if provider.key == get_embedding_provider().key:
+        raise HTTPException(status_code=400, detail=f"{provider.key} is already serving")
+    if EmbeddingModelStatus.shadow in await current_embedding_models(db):
+        raise HTTPException(status_code=409, detail="A shadow model is already being built")
+
+    dimensions = await embedding_dimensions(provider)
+    if dimensions != EMBEDDING_DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"{provider.key} produces {dimensions} dimensions, embeddings "
+                                                    f"store {EMBEDDING_DIMENSIONS} - that needs a migration")
+
+    # Leftovers of a cancelled shadow model
+    await db.execute(delete(ShadowEmbedding))
+    shadow = EmbeddingModel(provider=provider.name, model=provider.model, dimensions=dimensions,
+                            status=EmbeddingModelStatus.shadow)
+    db.add(shadow)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="A shadow model is already being built")
+
+    embedding_models.shadow = (shadow.provider, shadow.model)
+    logger.info(f"Building shadow embeddings with {provider.key}")
+    return shadow
+
+
+async def cancel_shadow_model(db: AsyncSession):
+    shadow = (await current_embedding_models(db, for_update=True)).get(EmbeddingModelStatus.shadow)
+    if not shadow:
+        raise HTTPException(status_code=404, detail="No shadow model")
+
+    shadow.status = EmbeddingModelStatus.retired
+    await db.execute(delete(ShadowEmbedding))
+    await db.commit()
+    embedding_models.shadow = None
+
+
+async def count_shadow_embeddings(db: AsyncSession, model: str) -> tuple[int, int]:
+    """Embeddings with and without a shadow embedding by `model`."""
+    has_shadow = ShadowEmbedding.id.is_not(None)
+    result = await db.execute(
+        select(func.count().filter(has_shadow), func.count().filter(~has_shadow))
+        .select_from(Embedding)
+        .outerjoin(ShadowEmbedding, and_(ShadowEmbedding.content_type == Embedding.content_type,
+                                         ShadowEmbedding.content_id == Embedding.content_id,
+                                         ShadowEmbedding.model == model))
+    )
+    embedded, missing = result.one()
+    return embedded, missing
+
+
+def search_latency(seconds: list[float]) -> SearchLatency:
+    seconds = sorted(seconds)
+    return SearchLatency(p50_seconds=percentile(seconds, 0.5), p95_seconds=percentile(seconds, 0.95))
+
+
+async def compare_embedding_models(db: AsyncSession) -> EmbeddingModelComparison:
+    comparison = EmbeddingModelComparison(serving_model=get_embedding_provider().key)
+    provider = get_shadow_embedding_provider()
+    if not provider:
+        return comparison
+
+    comparison.shadow_model = provider.key
+    comparison.embedded, comparison.missing = await count_shadow_embeddings(db, provider.key)
+    samples = list(shadow_reads.samples) if shadow_reads.model == provider.key else []
+    if samples:
+        comparison.queries = len(samples)
+        comparison.top_k = shadow_reads.top_k
+        comparison.recall_overlap = round(sum(sample.overlap for sample in samples) / len(samples), 3)
+        comparison.serving_latency = search_latency([sample.serving_seconds for sample in samples])
+        comparison.shadow_latency = search_latency([sample.shadow_seconds for sample in samples])
+    return comparison
+
+
+async def cutover_embedding_model(db: AsyncSession) -> EmbeddingModel:
+    """
+    Make the shadow model the serving one: its vectors replace the serving ones in the same
+    transaction that flips the `embedding_models` rows, so stored vectors never mix the two models.
+
+    Embedding writes read the serving model from its (locked) row, so they follow the cutover right
+    away. Searches don't: other processes embed queries with the retired model until their
+    `embedding_model_watcher` refreshes, up to EMBEDDING_MODEL_REFRESH_SECONDS later, and those
+    searches rank poorly meanwhile.
+    """
+    rows = await current_embedding_models(db, for_update=True)
+    shadow = rows.get(EmbeddingModelStatus.shadow)
+    if not shadow:
+        raise HTTPException(status_code=409, detail="No shadow model to cut over to")
+    model = f"{shadow.provider}:{shadow.model}"
+    _, missing = await count_shadow_embeddings(db, model)
+    if missing:
+        raise HTTPException(status_code=409, detail=f"{missing} embeddings have no shadow embedding yet")
+
+    now = datetime.now(timezone.utc)
+    await db.execute(
+        update(Embedding)
+        .where(ShadowEmbedding.content_type == Embedding.content_type,
+               ShadowEmbedding.content_id == Embedding.content_id,
+               ShadowEmbedding.model == model)
+        .values(embedding=ShadowEmbedding.embedding,
+                embedding_short=func.l2_normalize(
+                    func.subvector(ShadowEmbedding.embedding, 1, settings.EMBEDDING_SHORT_DIMENSIONS)),
+                text_hash=ShadowEmbedding.text_hash, model=ShadowEmbedding.model,
+                dimensions=ShadowEmbedding.dimensions, updated_at=now)
+    )
+    # One statement each, in this order, for the unique index on the non-retired statuses
+    await db.execute(update(EmbeddingModel).where(EmbeddingModel.status == EmbeddingModelStatus.serving)
+                     .values(status=EmbeddingModelStatus.retired))
+    await db.execute(update(EmbeddingModel).where(EmbeddingModel.id == shadow.id)
+                     .values(status=EmbeddingModelStatus.serving, activated_at=now))
+    await db.execute(delete(ShadowEmbedding))
+    # Their question embeddings are by the retired model
+    await db.execute(delete(CachedAnswer))
+    await db.commit()
+
+    embedding_models.serving = (shadow.provider, shadow.model)
+    embedding_models.shadow = None
+    logger.info(f"Cut over embeddings to {model}")
+    await db.refresh(shadow)
+    return shadow
@@ -0,0 +1,123 @@
+from datetime import datetime, timezone, timedelta
+
+from loguru import logger
+from sqlalchemy import select, delete, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.services.embedding_service import EMBEDDABLE_CONTENT, embed_content
+from app.core.config import settings
+from app.core.worker_pool import WorkerPool
+from app.db.models import EmbeddingOutbox, ShadowEmbedding
+from app.db.session import async_session_maker
+from app.db.soft_delete import filtered_select
+
+
+async def enqueue_embedding(db: AsyncSession, content_type: str, content_id: int):
+    """
+    Queue (re-)embedding of a policy or rule in the caller's transaction.
+
+    Every enqueue pushes the item's `available_at` EMBEDDING_DEBOUNCE_SECONDS into the future,
+    so a burst of edits to the same row results in a single embedding call.
+    """
+    stmt = insert(EmbeddingOutbox).values(
+        content_type=content_type,
+        content_id=content_id,
+        available_at=datetime.now(timezone.utc) + timedelta(seconds=settings.EMBEDDING_DEBOUNCE_SECONDS),
+        attempts=0,
+        is_dead=False,
+        created_at=datetime.now(timezone.utc),
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        constraint="uq_embedding_outbox_content",
+        # An edit revives a dead item
+        set_={"available_at": stmt.excluded.available_at, "attempts": 0, "error": None, "is_dead": False}
+    ))
+
+
+async def claim_embedding_batch(db: AsyncSession) -> tuple[list[EmbeddingOutbox], datetime]:
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        select(EmbeddingOutbox)
+        .filter(EmbeddingOutbox.available_at <= now, EmbeddingOutbox.is_dead == False)
+        .order_by(EmbeddingOutbox.available_at)
+        .limit(settings.EMBEDDING_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    )
+    items = result.scalars().all()
+
+    # Claimed items are leased rather than locked for the duration of the embedding call,
+    # so edits saved meanwhile aren't blocked - they move available_at and keep the item queued
+    lease_until = now + timedelta(seconds=settings.EMBEDDING_OUTBOX_LEASE_SECONDS)
+    for item in items:
+        item.available_at = lease_until
+        item.attempts += 1
+    await db.commit()
+    return items, lease_until
+
+
+async def embed_outbox_items(db: AsyncSession, items: list[EmbeddingOutbox]):
+    for content_type, (model, _) in EMBEDDABLE_CONTENT.items():
+        content_ids = [item.content_id for item in items if item.content_type == content_type]
+        if not content_ids:
+            continue
+
+        # Rows deleted since they were queued are skipped, their items are simply dropped
+        result = await db.execute(filtered_select(model).filter(model.id.in_(content_ids)))
+        rows = result.scalars().all()
+        if not rows:
+            continue
+
+        await embed_content(db, content_type, rows)
+        await embed_shadow_content(db, content_type, rows)
+
+
+async def embed_shadow_content(db: AsyncSession, content_type: str, rows: list):
+    """
+    Keep a shadow model being built in sync with edits made meanwhile. It runs in a savepoint, so a
+    failing shadow provider doesn't roll back (and eventually drop) the serving embeddings.
+    """
+    try:
+        async with db.begin_nested():
+            await embed_content(db, content_type, rows, shadow=True)
+    except Exception as e:
+        logger.error(f"Shadow embedding of {len(rows)} {content_type} rows failed: {e}")
+        # Stale shadow embeddings would pass the cutover's completeness check, missing ones are
+        # re-embedded by the shadow re-embed
+        await db.execute(delete(ShadowEmbedding).where(ShadowEmbedding.content_type == content_type,
+                                                       ShadowEmbedding.content_id.in_([row.id for row in rows])))
+
+
+async def run_next_embedding_batch() -> bool:
+    async with async_session_maker() as db:
+        items, lease_until = await claim_embedding_batch(db)
+        if not items:
+            return False
+
+        item_ids = [item.id for item in items]
+        leased = EmbeddingOutbox.id.in_(item_ids) & (EmbeddingOutbox.available_at == lease_until)
+        try:
+            await embed_outbox_items(db, items)
+            await db.execute(delete(EmbeddingOutbox).where(leased))
+            await db.commit()
+            logger.info(f"Embedded {len(items)} outbox items")
+        except Exception as e:
+            logger.error(f"Embedding {len(items)} outbox items failed: {e}")
+            await db.rollback()
+            # Failed items are retried once their lease expires, until they run out of attempts.
+            # Dead items stay in the outbox as the record of content whose embedding is stale.
+            await db.execute(update(EmbeddingOutbox).where(leased).values(error=str(e)))
+            result = await db.execute(
+                update(EmbeddingOutbox)
+                .where(leased, EmbeddingOutbox.attempts >= settings.EMBEDDING_OUTBOX_MAX_ATTEMPTS)
+                .values(is_dead=True)
+            )
+            await db.commit()
+            if result.rowcount:
+                logger.warning(f"{result.rowcount} outbox items ran out of attempts and were marked dead")
+
+    return True
+
+
+embedding_workers = WorkerPool("embedding", settings.EMBEDDING_WORKERS, run_next_embedding_batch,
+                               poll_interval=settings.EMBEDDING_OUTBOX_POLL_INTERVAL_SECONDS)
@@ -1,63 +1,317 @@
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from typing import Optional
 
 from loguru import logger
+from sqlalchemy import and_, or_, update, select, delete
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.ai.embeddings import get_embedding_gemini
-from app.db.models import Embedding, Policy, PolicyRule
+from app.api.v1.schemas.embedding import ReembedReport, ReembedStatus, EmbeddingWriteStats, EmbeddingModelStatus
+from app.core.ai.document_retrieval import index_document_chunks
+from app.core.ai.embeddings import truncate_embedding
+from app.core.ai.providers import get_embedding_provider, get_shadow_embedding_provider, build_embedding_provider, \
+    embedding_models, EmbeddingProvider
+from app.core.config import settings
+from app.db.advisory_lock import advisory_lock
+from app.db.models import Embedding, ShadowEmbedding, EmbeddingModel, Policy, PolicyRule, Document, DocumentChunk
+from app.db.session import async_session_maker
 from app.db.soft_delete import filtered_select
 
 
 async def get_embedding(db: AsyncSession, content_type: str, content_id: int):
-    query = filtered_select(Embedding).filter(Embedding.content_type == content_type, Embedding.content_id == content_id)
+    query = select(Embedding).filter(Embedding.content_type == content_type, Embedding.content_id == content_id)
     result = await db.execute(query)
     return result.scalar_one_or_none()
 
-async def delete_embedding(db: AsyncSession, content_type: str, content_id: int):
-    embedding = await get_embedding(db, content_type, content_id)
-    if embedding:
-        await embedding.soft_delete(db=db)
-        await db.commit()
-        return True
-    return False
-
-async def create_embedding(db: AsyncSession, policy: Optional[Policy], rule: Optional[PolicyRule]):
-    if not policy and not rule:
-        raise ValueError("Either a policy or a rule must be provided to create an embedding.")
-    if policy and rule:
-        raise ValueError("Provide either a policy or a rule, not both.")
-
-    text_to_embed: str = ""
-    content_type: str = ""
-    content_id: int = 0
-
-    if policy:
-        text_to_embed = f"{policy.name} - {policy.description}"
-        content_type = 'policy'
-        content_id = policy.id
-    elif rule:
-        rule_text = rule.description or " ".join(rule.keywords)
-        text_to_embed = f"{rule.rule_type} \n\n {rule_text}"
-        content_type = 'rule'
-        content_id = rule.id
-
-    try:
-        embedding_vector = get_embedding_gemini(text_to_embed)
-
-        old_embedding = await get_embedding(db, content_type, content_id)
-        if old_embedding:
-            await old_embedding.soft_delete(db=db)
-
-        embedding = Embedding(
-            content_type=content_type,
-            content_id=content_id,
-            embedding=embedding_vector
+
+async def delete_embeddings(db: AsyncSession, content_type: str, content_ids: list[int]):
+    """Delete the (shadow) embeddings of deleted content, in the caller's transaction."""
+    for table in (Embedding, ShadowEmbedding):
+        await db.execute(delete(table).where(table.content_type == content_type, table.content_id.in_(content_ids)))
+
+
+async def delete_policy_embeddings(db: AsyncSession, policy_ids: list[int]):
+    """Delete the embeddings of deleted policies and of their rules."""
+    result = await db.execute(select(PolicyRule.id).filter(PolicyRule.policy_id.in_(policy_ids)))
+    await delete_embeddings(db, "policy", policy_ids)
+    await delete_embeddings(db, "rule", result.scalars().all())
+
+
+def policy_embedding_text(policy: Policy) -> str:
+    return f"{policy.name} - {policy.description}"
+
+
+def rule_embedding_text(rule: PolicyRule) -> str:
+    rule_text = rule.description or " ".join(rule.keywords)
+    rule_type = getattr(rule.rule_type, "value", rule.rule_type)
+    return f"{rule_type} \n\n {rule_text}"
+
+
+EMBEDDABLE_CONTENT = {
+    "policy": (Policy, policy_embedding_text),
+    "rule": (PolicyRule, rule_embedding_text),
+}
+
+
+async def refresh_embedding_scope(db: AsyncSession, policy_ids: Optional[list[int]] = None,
+                                  rule_ids: Optional[list[int]] = None):
+    """
+    Copy company, policy type and active flag of the owning policy onto the embeddings of
+    `policy_ids` (and their rules) and of `rule_ids`, in the caller's transaction.
+    """
+    scope = {
+        Embedding.company_id: Policy.company_id,
+        Embedding.policy_type: Policy.policy_type,
+        Embedding.is_active: Policy.is_active,
+        # Not a new embedding - keep updated_at, which staleness checks compare to the content's
+        Embedding.updated_at: Embedding.updated_at,
+    }
+    if policy_ids:
+        await db.execute(
+            update(Embedding)
+            .where(Embedding.content_type == "policy", Embedding.content_id == Policy.id, Policy.id.in_(policy_ids))
+            .values(scope)
+        )
+    rule_filters = []
+    if policy_ids:
+        rule_filters.append(PolicyRule.policy_id.in_(policy_ids))
+    if rule_ids:
+        rule_filters.append(PolicyRule.id.in_(rule_ids))
+    if rule_filters:
+        await db.execute(
+            update(Embedding)
+            .where(Embedding.content_type == "rule", Embedding.content_id == PolicyRule.id,
+                   PolicyRule.policy_id == Policy.id, or_(*rule_filters))
+            .values(scope)
         )
 
-        db.add(embedding)
+
+async def upsert_embeddings(db: AsyncSession, content_type: str, vectors: dict[int, list[float]],
+                            text_hashes: dict[int, str], model: str):
+    stmt = insert(Embedding).values([
+        {"content_type": content_type, "content_id": content_id, "embedding": vector,
+         "embedding_short": truncate_embedding(vector, settings.EMBEDDING_SHORT_DIMENSIONS),
+         "text_hash": text_hashes[content_id], "model": model, "dimensions": len(vector),
+         "created_at": datetime.now(timezone.utc), "updated_at": datetime.now(timezone.utc)}
+        for content_id, vector in vectors.items()
+    ])
+    await db.execute(stmt.on_conflict_do_update(
+        constraint="uq_content_type_id",
+        set_={"embedding": stmt.excluded.embedding, "embedding_short": stmt.excluded.embedding_short,
+              "text_hash": stmt.excluded.text_hash, "model": stmt.excluded.model,
+              "dimensions": stmt.excluded.dimensions, "updated_at": stmt.excluded.updated_at}
+    ))
+    if content_type == "policy":
+        await refresh_embedding_scope(db, policy_ids=list(vectors))
+    else:
+        await refresh_embedding_scope(db, rule_ids=list(vectors))
+
+
+async def upsert_shadow_embeddings(db: AsyncSession, content_type: str, vectors: dict[int, list[float]],
+                                   text_hashes: dict[int, str], model: str):
+    stmt = insert(ShadowEmbedding).values([
+        {"content_type": content_type, "content_id": content_id, "embedding": vector,
+         "text_hash": text_hashes[content_id], "model": model, "dimensions": len(vector),
+         "created_at": datetime.now(timezone.utc), "updated_at": datetime.now(timezone.utc)}
+        for content_id, vector in vectors.items()
+    ])
+    await db.execute(stmt.on_conflict_do_update(
+        constraint="uq_shadow_content_type_id",
+        set_={"embedding": stmt.excluded.embedding, "text_hash": stmt.excluded.text_hash,
+              "model": stmt.excluded.model, "dimensions": stmt.excluded.dimensions,
+              "updated_at": stmt.excluded.updated_at}
+    ))
+
+
+@dataclass
+class EmbeddingWriteCounters:
+    embedded: int = 0
+    unchanged: int = 0
+    api_calls: int = 0
+
+
+embedding_writes = EmbeddingWriteCounters()
+
+
+def embedding_write_summary() -> EmbeddingWriteStats:
+    return EmbeddingWriteStats(embedded=embedding_writes.embedded, unchanged=embedding_writes.unchanged,
+                               api_calls=embedding_writes.api_calls)
+
+
+def embedding_text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+async def current_embedding_provider(db: AsyncSession, shadow: bool = False) -> Optional[EmbeddingProvider]:
+    """
+    The serving (or shadow) provider as recorded in `embedding_models`, rather than as last seen by
+    this process. The serving row stays share-locked until the caller commits: a cutover locks it
+    too, so a write either commits before the cutover (whose UPDATE then replaces its vectors) or
+    waits for it and embeds with the new model.
+    """
+    status = EmbeddingModelStatus.shadow if shadow else EmbeddingModelStatus.serving
+    query = select(EmbeddingModel).filter(EmbeddingModel.status == status)
+    # Shadow writes don't lock, a cutover waiting on both rows could deadlock with them
+    result = await db.execute(query if shadow else query.with_for_update(read=True))
+    row = result.scalar_one_or_none()
+    if not row:
+        # No shadow model, or the configured serving model isn't registered yet
+        return None if shadow else get_embedding_provider()
+    provider = build_embedding_provider(row.provider, row.model)
+    if not shadow:
+        embedding_models.serving = (row.provider, row.model)
+    return provider
+
+
+async def embed_content(db: AsyncSession, content_type: str, rows: list,
+                        shadow: bool = False) -> EmbeddingWriteCounters:
+    """
+    Embed and upsert `rows` of one content type in EMBEDDING_BATCH_SIZE requests, with the serving
+    model into `embeddings` or with the `shadow` model into `shadow_embeddings`.
+
+    Rows whose embedding was built from the same text by the same model are skipped (e.g. when
+    only `is_active` or `severity` changed), their embedding is only marked as up to date.
+    """
+    provider = await current_embedding_provider(db, shadow)
+    if not provider:
+        return EmbeddingWriteCounters()
+    table, upsert = (ShadowEmbedding, upsert_shadow_embeddings) if shadow else (Embedding, upsert_embeddings)
+    model_name = provider.key
+    _, build_text = EMBEDDABLE_CONTENT[content_type]
+    texts = {row.id: build_text(row) for row in rows}
+    text_hashes = {content_id: embedding_text_hash(text) for content_id, text in texts.items()}
+
+    result = await db.execute(
+        select(table.content_id, table.text_hash, table.model)
+        .filter(table.content_type == content_type, table.content_id.in_(texts))
+    )
+    unchanged = [content_id for content_id, text_hash, model in result.all()
+                 if text_hash == text_hashes[content_id] and model == model_name]
+    if unchanged:
+        await db.execute(
+            update(table)
+            .where(table.content_type == content_type, table.content_id.in_(unchanged))
+            .values(updated_at=datetime.now(timezone.utc))
+        )
+
+    outcome = EmbeddingWriteCounters(unchanged=len(unchanged))
+    changed = [content_id for content_id in texts if content_id not in set(unchanged)]
+    vectors = []
+    for start in range(0, len(changed), settings.EMBEDDING_BATCH_SIZE):
+        batch = [texts[content_id] for content_id in changed[start:start + settings.EMBEDDING_BATCH_SIZE]]
+        vectors += await asyncio.to_thread(provider.embed_batch, batch)
+        outcome.api_calls += 1
+    if changed:
+        await upsert(db, content_type, dict(zip(changed, vectors)), text_hashes, model_name)
+    outcome.embedded = len(changed)
+
+    embedding_writes.embedded += outcome.embedded
+    embedding_writes.unchanged += outcome.unchanged
+    embedding_writes.api_calls += outcome.api_calls
+    return outcome
+
+
+def stale_embedding_filter(model, older_than: Optional[datetime], table=Embedding, model_name: Optional[str] = None):
+    conditions = [
+        table.id.is_(None),
+        table.updated_at < model.updated_at,
+    ]
+    if model_name:
+        # Untagged (NULL) rows predate model tracking and aren't re-embedded for it
+        conditions.append(table.model != model_name)
+    if older_than:
+        conditions.append(table.updated_at < older_than)
+    return or_(*conditions)
+
+
+async def reembed_content(db: AsyncSession, content_type: str, report: ReembedReport, page_size: int,
+                          older_than: Optional[datetime] = None, shadow: bool = False):
+    """
+    Re-embed the rows of one content type whose embedding is missing, stale or by another model.
+
+    Rows are read in id order one page at a time, embedded in EMBEDDING_BATCH_SIZE requests and
+    upserted and committed per page. Committed rows are no longer stale, so an interrupted run
+    simply continues where it stopped when started again with the same `older_than`.
+    """
+    model, _ = EMBEDDABLE_CONTENT[content_type]
+    table = ShadowEmbedding if shadow else Embedding
+    last_id = 0
+
+    while True:
+        provider = get_shadow_embedding_provider() if shadow else get_embedding_provider()
+        if not provider:
+            return
+        result = await db.execute(
+            filtered_select(model)
+            .outerjoin(table, and_(table.content_type == content_type, table.content_id == model.id))
+            .filter(model.id > last_id, stale_embedding_filter(model, older_than, table, provider.key))
+            .order_by(model.id)
+            .limit(page_size)
+        )
+        rows = result.scalars().all()
+        if not rows:
+            return
+
+        outcome = await embed_content(db, content_type, rows, shadow)
         await db.commit()
-        await db.refresh(embedding)
-        return embedding
-    except Exception as e:
-        logger.error(f"An error occurred during embedding creation: {e}")
-        raise
+
+        last_id = rows[-1].id
+        report.batches += outcome.api_calls
+        report.unchanged += outcome.unchanged
+        report.embedded[content_type] = report.embedded.get(content_type, 0) + outcome.embedded
+        report.seconds = round((datetime.now(timezone.utc) - report.started_at).total_seconds(), 3)
+        report.items_per_second = round(sum(report.embedded.values()) / report.seconds, 2) if report.seconds else 0.0
+        logger.info(f"Re-embedded {report.embedded[content_type]} {content_type} rows "
+                    f"({report.items_per_second} rows/s)")
+
+
+async def reindex_documents(db: AsyncSession, report: ReembedReport):
+    """Chunk and embed the documents without chunks by the serving model, e.g. after a cutover."""
+    model_name = get_embedding_provider().key
+    last_id = 0
+
+    while True:
+        indexed = select(DocumentChunk.id).filter(DocumentChunk.document_id == Document.id,
+                                                  DocumentChunk.model == model_name)
+        result = await db.execute(
+            filtered_select(Document)
+            .filter(Document.id > last_id, Document.text_content.is_not(None), ~indexed.exists())
+            .order_by(Document.id)
+            .limit(10)
+        )
+        documents = result.scalars().all()
+        if not documents:
+            return
+
+        for document in documents:
+            chunks = await index_document_chunks(db, document)
+            await db.commit()
+            report.embedded["document_chunk"] = report.embedded.get("document_chunk", 0) + chunks
+        last_id = documents[-1].id
+
+
+async def reembed_all(older_than: Optional[datetime] = None, page_size: int = 500,
+                      report: Optional[ReembedReport] = None, shadow: bool = False) -> ReembedReport:
+    report = report or ReembedReport(started_at=datetime.now(timezone.utc))
+
+    # Concurrent runs (e.g. two API workers) would embed the same pages twice
+    async with advisory_lock("shadow_embed" if shadow else "reembed"):
+        async with async_session_maker() as db:
+            try:
+                for content_type in EMBEDDABLE_CONTENT:
+                    await reembed_content(db, content_type, report, page_size, older_than, shadow)
+                if not shadow:
+                    await reindex_documents(db, report)
+                report.status = ReembedStatus.completed
+            except Exception as e:
+                logger.error(f"Re-embedding failed: {e}")
+                report.status = ReembedStatus.failed
+                report.error = str(e)
+
+    report.finished_at = datetime.now(timezone.utc)
+    logger.info(f"Re-embedding {report.status.value}: {report.embedded} in {report.seconds}s "
+                f"({report.items_per_second} rows/s)")
+    return report
@@ -1,13 +1,15 @@
 from http import HTTPStatus
 
-from fastapi import HTTPException, BackgroundTasks
+from fastapi import HTTPException
 from sqlalchemy import or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
 from app.api.v1.schemas.policy import PolicyCreate, PolicyUpdate, PolicyType, PolicyWithRules
 from app.api.v1.schemas.rule import RuleInDB
-from app.api.v1.services.embedding_service import create_embedding, delete_embedding
+from app.api.v1.services.embedding_outbox_service import enqueue_embedding
+from app.api.v1.services.embedding_service import delete_policy_embeddings, refresh_embedding_scope
+from app.core.ai.answer_cache import invalidate_policy_answers
 from app.db.models import Policy, User
 from app.db.soft_delete import filtered_select
 
@@ -57,30 +59,37 @@ async def get_policy(db: AsyncSession, policy_id: int):
     return result.scalar_one_or_none()
 
 
-async def create_policy(background_tasks: BackgroundTasks, db: AsyncSession, user: User, policy: PolicyCreate):
+async def create_policy(db: AsyncSession, user: User, policy: PolicyCreate):
     db_policy = Policy(**policy.model_dump())
     if policy.policy_type == PolicyType.company:
         db_policy.company_id = user.company_id
 
     db.add(db_policy)
+    await db.flush()
+    await invalidate_policy_answers(db, db_policy.id)
+    await enqueue_embedding(db, "policy", db_policy.id)
     await db.commit()
     await db.refresh(db_policy)
-    background_tasks.add_task(create_embedding, db, policy=db_policy, rule=None)
     return db_policy
 
 
-async def update_policy(background_tasks: BackgroundTasks, db: AsyncSession, policy_id: int, policy_data: PolicyUpdate):
+async def update_policy(db: AsyncSession, policy_id: int, policy_data: PolicyUpdate):
     db_policy = await get_policy(db, policy_id)
     if not db_policy:
         raise HTTPException(HTTPStatus.NOT_FOUND, detail="Policy not found")
     update_data = policy_data.model_dump(exclude_unset=True, exclude_none=True)
 
+    # Answers based on the policy are stale - drop them under its old and new ownership
+    await invalidate_policy_answers(db, policy_id)
     for field, value in update_data.items():
         setattr(db_policy, field, value)
+    await invalidate_policy_answers(db, policy_id)
+    # Activation and ownership changes apply to search right away, the text change waits for the re-embed
+    await refresh_embedding_scope(db, policy_ids=[policy_id])
+    await enqueue_embedding(db, "policy", policy_id)
 
     await db.commit()
     await db.refresh(db_policy)
-    background_tasks.add_task(create_embedding, db, policy=db_policy, rule=None)
     return db_policy
 
 
@@ -88,6 +97,7 @@ async def delete_policy(db: AsyncSession, policy_id: int):
     db_policy = await get_policy(db, policy_id)
     if not db_policy:
         raise HTTPException(HTTPStatus.NOT_FOUND, detail="Policy not found")
+    await invalidate_policy_answers(db, policy_id)
     await db_policy.soft_delete(db=db, cascade=True)
-    await delete_embedding(db, "policy", policy_id)
+    await delete_policy_embeddings(db, [policy_id])
     await db.commit()
@@ -1,12 +1,20 @@
-from fastapi import BackgroundTasks
+import base64
+import json
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import HTTPException
 from loguru import logger
+from sqlalchemy.dialects.postgresql import REGCONFIG
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import or_, String, func
+from sqlalchemy import or_, String, func, cast, tuple_
 
-from app.api.v1.schemas.policy import PolicyType
-from app.api.v1.schemas.rule import RuleCreate, RuleUpdate
-from app.api.v1.services.embedding_service import create_embedding, delete_embedding
+from app.api.v1.schemas.rule import RuleCreate, RuleUpdate, RuleInDB, RuleSearchResult
+from app.api.v1.services.embedding_outbox_service import enqueue_embedding
+from app.api.v1.services.embedding_service import delete_embeddings, refresh_embedding_scope
+from app.core.ai.answer_cache import invalidate_policy_answers
+from app.core.ai.embedding_search import visible_policies
 from app.db.models import PolicyRule, User, Policy
 from app.db.soft_delete import filtered_select
 
@@ -25,55 +33,91 @@ async def get_rule(db: AsyncSession, rule_id: int):
     return result.scalar_one_or_none()
 
 
-async def find_rules(db: AsyncSession, user: User, query: str):
-    company_id = user.company_id
-
-    policy_query = filtered_select(Policy.id).filter(
-        Policy.is_active == True,
-        or_(
-            (Policy.policy_type == PolicyType.company) & (Policy.company_id == company_id),
-            Policy.policy_type.in_([PolicyType.industry, PolicyType.standard])
+def encode_cursor(rank: float, rule_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([rank, rule_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        rank, rule_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(rule_id)
+    except (ValueError, TypeError):
+        raise HTTPException(HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
+
+
+async def find_rules(db: AsyncSession, user: User, query: str, limit: int = 20,
+                     cursor: Optional[str] = None) -> tuple[list[RuleSearchResult], Optional[str]]:
+    """
+    Rules of the policies visible to the user whose description contains `query` or matches it
+    in full-text search, best match first, with the match highlighted.
+
+    The substring match is served by the trigram index on `description`, the full-text match by
+    the `search_vector` GIN index. Pages are keyed on (rank, id), pass the returned cursor to get
+    the next one.
+    """
+    # Backslash is LIKE's default escape character
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    ts_query = func.websearch_to_tsquery(cast("english", REGCONFIG), query)
+    rank = func.greatest(
+        func.word_similarity(query, PolicyRule.description),
+        func.ts_rank_cd(PolicyRule.search_vector, ts_query),
+    ).label("rank")
+    highlight = func.ts_headline(
+        cast("english", REGCONFIG), PolicyRule.description, ts_query,
+        "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10",
+    ).label("highlight")
+
+    stmt = (
+        select(PolicyRule, rank, highlight)
+        .join(Policy, PolicyRule.policy_id == Policy.id)
+        .filter(
+            PolicyRule.is_deleted == False,
+            visible_policies(user.company_id, None),
+            or_(PolicyRule.description.ilike(f"%{escaped}%"),
+                PolicyRule.search_vector.op("@@")(ts_query)),
         )
+        .order_by(rank.desc(), PolicyRule.id.desc())
+        .limit(limit + 1)
     )
-    policy_result = await db.execute(policy_query)
-    accessible_policy_ids = policy_result.scalars().all()
-
-    if not accessible_policy_ids:
-        return []
-
-    search_query = f"%{query}%"
+    if cursor:
+        stmt = stmt.filter(tuple_(rank, PolicyRule.id) < tuple_(*decode_cursor(cursor)))
 
-    rule_query = filtered_select(PolicyRule).filter(
-        PolicyRule.policy_id.in_(accessible_policy_ids),
-        PolicyRule.description.ilike(search_query)
-    )
-
-    result = await db.execute(rule_query)
-    return result.scalars().all()
+    rows = (await db.execute(stmt)).all()
+    results = [
+        RuleSearchResult(**RuleInDB.model_validate(rule).model_dump(), rank=rule_rank, highlight=rule_highlight)
+        for rule, rule_rank, rule_highlight in rows[:limit]
+    ]
+    next_cursor = encode_cursor(results[-1].rank, results[-1].id) if len(rows) > limit else None
+    return results, next_cursor
 
 
-async def create_rule(background_tasks: BackgroundTasks, db: AsyncSession, rule: RuleCreate):
+async def create_rule(db: AsyncSession, rule: RuleCreate):
     db_rule = PolicyRule(**rule.model_dump())
     db.add(db_rule)
+    await db.flush()
+    await invalidate_policy_answers(db, db_rule.policy_id)
+    await enqueue_embedding(db, "rule", db_rule.id)
     await db.commit()
     await db.refresh(db_rule)
-    background_tasks.add_task(create_embedding, db, policy=None, rule=db_rule)
     return db_rule
 
 
-async def update_rule(background_tasks: BackgroundTasks, db: AsyncSession, rule_id: int, rule_data: RuleUpdate):
+async def update_rule(db: AsyncSession, rule_id: int, rule_data: RuleUpdate):
     db_rule = await get_rule(db, rule_id)
     if not db_rule:
         return None
 
     update_data = rule_data.model_dump(exclude_unset=True, exclude_none=True)
 
+    await invalidate_policy_answers(db, db_rule.policy_id)
     for field, value in update_data.items():
         setattr(db_rule, field, value)
+    await invalidate_policy_answers(db, db_rule.policy_id)
+    await refresh_embedding_scope(db, rule_ids=[rule_id])
+    await enqueue_embedding(db, "rule", rule_id)
 
     await db.commit()
     await db.refresh(db_rule)
-    background_tasks.add_task(create_embedding, db, policy=None, rule=db_rule)
     return db_rule
 
 
@@ -81,7 +125,8 @@ async def delete_rule(db: AsyncSession, rule_id: int):
     db_rule = await get_rule(db, rule_id)
     if db_rule:
         await db_rule.soft_delete(db=db, cascade=True)
+        await invalidate_policy_answers(db, db_rule.policy_id)
+        await delete_embeddings(db, "rule", [rule_id])
         await db.commit()
-        await delete_embedding(db, "rule", rule_id)
         return True
     return False
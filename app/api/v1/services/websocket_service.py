@@ -11,9 +11,9 @@ from app.api.v1.services.analysis_service import check_document_availability, up
 from app.api.v1.services.conversation_service import get_conversation, add_message, get_recent_messages
 from app.api.v1.services.document_service import get_document
 from app.core.ai.document_analysis import chat_with_document
+from app.core.ai.tokens import TokenUsage
 from app.core.websocket_manager import ConnectionManager
 from app.db.models import Document
-from app.utils.formatters import format_messages_history
 
 manager = ConnectionManager()
 
@@ -107,19 +107,20 @@ async def process_client_message(
         )
         await websocket.send_json(message_response.model_dump(mode="json"))
 
+        # The history is trimmed to CHAT_HISTORY_TOKEN_BUDGET by chat_with_document
         recent_messages = await get_recent_messages(db, conversation_id, 10)
-        if recent_messages:
-            history = format_messages_history(recent_messages)
-        else:
-            history = None
 
-        ai_response = await chat_with_document(text=content, gemini_file_name=document.gemini_name, db=db, history=history)
+        usage = TokenUsage()
+        ai_response = await chat_with_document(text=content, document=document, db=db,
+                                               history=recent_messages, usage=usage)
 
         ai_message = await add_message(
             db,
             conversation_id,
-            ai_response,
-            MessageAuthor.legalcheck
+            ai_response.text,
+            MessageAuthor.legalcheck,
+            usage,
+            is_cached=ai_response.is_cached
         )
 
         ai_message_response = NewMessageResponse(
@@ -0,0 +1,329 @@
+"""
+Measure retrieval quality and latency of every search strategy on a seeded synthetic corpus.
+
+    TESTING=true python -m app.commands.benchmark_corpus
+    TESTING=true python -m app.commands.benchmark_corpus --sizes 1000 10000 --queries 300 --top-k 5
+    TESTING=true python -m app.commands.benchmark_corpus --strategies exact short hybrid --keep
+    TESTING=true python -m app.commands.benchmark_corpus --sizes 1000 10000 --providers local gemini
+
+For each size, a corpus of that many rules (and a policy per RULES_PER_POLICY rules) is generated
+from a fixed seed. It's embedded with the stub provider's hashed bag of words by default, so runs
+are reproducible and make no embedding API calls; `--providers` embeds it with each of the given
+providers in turn, to compare their recall and query embedding latency on the same corpus.
+
+Every rule carries a made-up identifier; the labeled queries ask for a rule by its identifier and
+a few of its terms, and that rule is the one relevant result. The queries share their rule's
+wording, so this measures lookups rather than paraphrases. The corpus belongs to its own company
+and is deleted after each run, the last one unless `--keep` - until the next run.
+
+Run it against a migrated, otherwise empty database (TESTING=true uses test_<DB_NAME>): other
+policies would compete with the labeled ones. Seeding 100k rules takes several minutes, mostly
+maintaining the HNSW indexes.
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from statistics import quantiles
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import select, delete, func, cast, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.schemas.policy import PolicyType
+from app.api.v1.schemas.rule import RuleType, Severity
+from app.api.v1.services.embedding_service import policy_embedding_text, rule_embedding_text, embedding_text_hash
+from app.commands.benchmark_search import visible_to
+from app.core.ai.embedding_search import nearest_embeddings, hybrid_matches
+from app.core.ai.embeddings import truncate_embedding
+from app.core.ai.providers import EmbeddingProvider, EMBEDDING_PROVIDERS, EMBEDDING_DIMENSIONS, \
+    build_embedding_provider
+from app.core.ai.vector_index import MappedVectorIndex, rebuild_index, EmbeddingMatch
+from app.core.config import settings
+from app.db.models import Company, Policy, PolicyRule, Embedding
+from app.db.session import async_session_maker
+
+CORPUS_COMPANY = "Benchmark corpus"
+RULES_PER_POLICY = 20
+SEED_BATCH_ROWS = 2000
+STRATEGIES = ["exact", "short", "halfvec", "hybrid", "numpy"]
+
+TOPICS = {
+    "termination": ["terminate", "notice", "period", "written", "breach", "cure", "expiry", "renewal"],
+    "payment": ["invoice", "payment", "late", "interest", "fees", "currency", "instalment", "overdue"],
+    "confidentiality": ["confidential", "disclosure", "information", "recipient", "secrecy", "marked", "leak", "trade"],
+    "liability": ["liability", "cap", "indemnify", "damages", "indirect", "consequential", "losses", "exclusion"],
+    "data protection": ["personal", "data", "processing", "controller", "processor", "gdpr", "subject", "transfer"],
+    "governing law": ["governing", "law", "jurisdiction", "courts", "arbitration", "venue", "dispute", "seat"],
+    "intellectual property": ["intellectual", "property", "license", "ownership", "royalty", "patent", "copyright",
+                              "assignment"],
+    "force majeure": ["force", "majeure", "event", "beyond", "control", "suspension", "pandemic", "strike"],
+    "warranty": ["warranty", "defects", "repair", "replace", "fitness", "merchantable", "remedy", "acceptance"],
+    "non-compete": ["compete", "solicit", "employees", "customers", "territory", "restrict", "competitor", "exclusive"],
+    "insurance": ["insurance", "coverage", "insurer", "certificate", "premium", "insured", "minimum", "claims"],
+    "audit": ["audit", "records", "inspect", "books", "access", "reasonable", "compliance", "auditor"],
+}
+FILLER = ["the", "supplier", "customer", "shall", "must", "agreement", "under", "this", "any", "party", "each",
+          "in", "accordance", "with", "within", "days", "months", "prior"]
+SYLLABLES = ["ka", "vo", "ru", "mi", "ten", "dor", "la", "zi", "pe", "qua", "nor", "bex", "sul", "tri", "go", "fen"]
+
+
+@dataclass
+class LabeledQuery:
+    text: str
+    rule_id: int
+
+
+@dataclass
+class StrategyResult:
+    size: int
+    provider: str
+    strategy: str
+    recall: float
+    mrr: float
+    p50_ms: float
+    p99_ms: float
+    embed_p50_ms: float
+    embed_p99_ms: float
+
+
+def identifier(rng: random.Random, number: int) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(3)) + format(number, "x")
+
+
+def synthetic_rule(rng: random.Random, number: int) -> tuple[PolicyRule, str]:
+    """A rule and a query for it: its identifier and a few of its topic terms."""
+    terms = TOPICS[rng.choice(list(TOPICS))]
+    rule_terms = rng.sample(terms, 5)
+    token = identifier(rng, number)
+    words = rule_terms + rng.sample(FILLER, 6)
+    rng.shuffle(words)
+    rule = PolicyRule(rule_type=rng.choice(list(RuleType)), severity=rng.choice(list(Severity)),
+                      description=f"Clause {token}: {' '.join(words)}.", keywords=[token] + rule_terms[:2])
+    return rule, " ".join(rng.sample(rule_terms, 3) + [token])
+
+
+def embedding_row(provider: EmbeddingProvider, content_type: str, content_id: int, text: str, vector: list[float],
+                  policy: Policy) -> dict:
+    now = datetime.now(timezone.utc)
+    return {"content_type": content_type, "content_id": content_id, "embedding": vector,
+            "embedding_short": truncate_embedding(vector, settings.EMBEDDING_SHORT_DIMENSIONS),
+            "company_id": policy.company_id, "policy_type": policy.policy_type, "is_active": True,
+            "text_hash": embedding_text_hash(text), "model": provider.key, "dimensions": len(vector),
+            "created_at": now, "updated_at": now}
+
+
+async def embedding_rows(provider: EmbeddingProvider, contents: list[tuple[str, int, str, Policy]]) -> list[dict]:
+    rows = []
+    for start in range(0, len(contents), settings.EMBEDDING_BATCH_SIZE):
+        batch = contents[start:start + settings.EMBEDDING_BATCH_SIZE]
+        vectors = await asyncio.to_thread(provider.embed_batch, [text for _, _, text, _ in batch])
+        rows += [embedding_row(provider, content_type, content_id, text, vector, policy)
+                 for (content_type, content_id, text, policy), vector in zip(batch, vectors)]
+    return rows
+
+
+async def seed_corpus(db: AsyncSession, provider: EmbeddingProvider, size: int, queries: int,
+                      seed: int) -> tuple[int, list[LabeledQuery]]:
+    rng = random.Random(seed)
+    company = Company(name=CORPUS_COMPANY)
+    db.add(company)
+    await db.flush()
+
+    query_numbers = set(rng.sample(range(size), min(queries, size)))
+    labeled = []
+    policy = None
+    for start in range(0, size, SEED_BATCH_ROWS):
+        rules, contents = [], []
+        for number in range(start, min(start + SEED_BATCH_ROWS, size)):
+            if number % RULES_PER_POLICY == 0:
+                topic = rng.choice(list(TOPICS))
+                policy = Policy(name=f"{topic.title()} policy {identifier(rng, number)}",
+                                description=f"Requirements on {topic} for {' '.join(rng.sample(TOPICS[topic], 3))}",
+                                policy_type=rng.choice(list(PolicyType)), company_id=company.id, is_active=True)
+                db.add(policy)
+                await db.flush()
+                contents.append(("policy", policy.id, policy_embedding_text(policy), policy))
+
+            rule, query = synthetic_rule(rng, number)
+            rule.policy_id = policy.id
+            rules.append((number, rule, query, policy))
+        db.add_all([rule for _, rule, _, _ in rules])
+        await db.flush()
+
+        for number, rule, query, rule_policy in rules:
+            contents.append(("rule", rule.id, rule_embedding_text(rule), rule_policy))
+            if number in query_numbers:
+                labeled.append(LabeledQuery(text=query, rule_id=rule.id))
+        await db.execute(Embedding.__table__.insert(), await embedding_rows(provider, contents))
+        await db.commit()
+        print(f"  seeded {min(start + SEED_BATCH_ROWS, size)}/{size} rules")
+
+    await db.execute(text("ANALYZE embeddings"))
+    await db.commit()
+    return company.id, labeled
+
+
+async def delete_corpora(db: AsyncSession) -> int:
+    """Delete every benchmark corpus, including ones left behind by interrupted or `--keep` runs."""
+    company_ids = select(Company.id).filter(Company.name == CORPUS_COMPANY)
+    policy_ids = select(Policy.id).filter(Policy.company_id.in_(company_ids))
+    await db.execute(delete(Embedding).where(Embedding.company_id.in_(company_ids)))
+    await db.execute(delete(PolicyRule).where(PolicyRule.policy_id.in_(policy_ids)))
+    await db.execute(delete(Policy).where(Policy.company_id.in_(company_ids)))
+    result = await db.execute(delete(Company).where(Company.name == CORPUS_COMPANY))
+    await db.commit()
+    return result.rowcount
+
+
+async def exact_matches(db: AsyncSession, vector: list[float], top_k: int, company_id: int) -> list[EmbeddingMatch]:
+    distance = func.cosine_distance(Embedding.embedding, cast(vector, Vector)).label("distance")
+    result = await db.execute(
+        select(Embedding.id, Embedding.content_type, Embedding.content_id, distance)
+        .filter(visible_to(company_id))
+        .order_by(distance)
+        .limit(top_k)
+    )
+    return [EmbeddingMatch(*row) for row in result.all()]
+
+
+def reciprocal_rank(matches: list[EmbeddingMatch], rule_id: int) -> float:
+    for rank, match in enumerate(matches, start=1):
+        if (match.content_type, match.content_id) == ("rule", rule_id):
+            return 1.0 / rank
+    return 0.0
+
+
+def percentile_ms(seconds: list[float], q: int) -> float:
+    if len(seconds) < 2:
+        return seconds[0] * 1000 if seconds else 0.0
+    return quantiles(seconds, n=100)[q - 1] * 1000
+
+
+async def run_strategy(db: AsyncSession, strategy: str, labeled: list[LabeledQuery], vectors: list[list[float]],
+                       top_k: int, company_id: int, store: MappedVectorIndex | None) -> tuple[list[float], list[float]]:
+    ranks, seconds = [], []
+    for query, vector in zip(labeled, vectors):
+        started = time.perf_counter()
+        if strategy == "exact":
+            matches = await exact_matches(db, vector, top_k, company_id)
+        elif strategy in ("short", "halfvec"):
+            matches = await nearest_embeddings(db, vector, top_k, company_id=company_id, first_pass=strategy)
+        elif strategy == "hybrid":
+            matches = await hybrid_matches(db, query.text, vector, top_k, company_id=company_id)
+        else:
+            matches = store.search(vector, top_k, company_id) or []
+        seconds.append(time.perf_counter() - started)
+        await db.rollback()
+        ranks.append(reciprocal_rank(matches, query.rule_id))
+    return ranks, seconds
+
+
+async def embed_queries(provider: EmbeddingProvider,
+                        labeled: list[LabeledQuery]) -> tuple[list[list[float]], list[float]]:
+    vectors, seconds = [], []
+    for query in labeled:
+        started = time.perf_counter()
+        vectors.append(await asyncio.to_thread(provider.embed, query.text))
+        seconds.append(time.perf_counter() - started)
+    return vectors, seconds
+
+
+async def benchmark_size(provider: EmbeddingProvider, size: int, queries: int, top_k: int, strategies: list[str],
+                         seed: int, keep: bool) -> list[StrategyResult]:
+    results = []
+    try:
+        print(f"Seeding {size} rules embedded with {provider.key}")
+        async with async_session_maker() as db:
+            company_id, labeled = await seed_corpus(db, provider, size, queries, seed)
+        vectors, embed_seconds = await embed_queries(provider, labeled)
+
+        with tempfile.TemporaryDirectory() as path:
+            store = None
+            if "numpy" in strategies:
+                store = MappedVectorIndex(path, EMBEDDING_DIMENSIONS)
+                await rebuild_index(store)
+
+            async with async_session_maker() as db:
+                for strategy in strategies:
+                    ranks, seconds = await run_strategy(db, strategy, labeled, vectors, top_k, company_id, store)
+                    results.append(StrategyResult(
+                        size=size, provider=provider.key, strategy=strategy,
+                        recall=sum(rank > 0 for rank in ranks) / len(ranks),
+                        mrr=sum(ranks) / len(ranks),
+                        p50_ms=percentile_ms(seconds, 50), p99_ms=percentile_ms(seconds, 99),
+                        embed_p50_ms=percentile_ms(embed_seconds, 50), embed_p99_ms=percentile_ms(embed_seconds, 99),
+                    ))
+    finally:
+        # Also a partly seeded corpus, which would compete with the next one
+        if not keep:
+            async with async_session_maker() as db:
+                await delete_corpora(db)
+    return results
+
+
+def print_table(results: list[StrategyResult], top_k: int):
+    headers = ["rules", "embeddings", "strategy", f"recall@{top_k}", "MRR", "p50 ms", "p99 ms",
+               "embed p50 ms", "embed p99 ms"]
+    rows = [[str(result.size), result.provider, result.strategy, f"{result.recall:.3f}", f"{result.mrr:.3f}",
+             f"{result.p50_ms:.1f}", f"{result.p99_ms:.1f}", f"{result.embed_p50_ms:.1f}",
+             f"{result.embed_p99_ms:.1f}"] for result in results]
+    widths = [max(len(row[i]) for row in rows + [headers]) for i in range(len(headers))]
+    print(" | ".join(header.ljust(width) for header, width in zip(headers, widths)))
+    print("-|-".join("-" * width for width in widths))
+    for row in rows:
+        print(" | ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+
+async def other_policies() -> int:
+    async with async_session_maker() as db:
+        result = await db.execute(
+            select(func.count()).select_from(Policy)
+            .outerjoin(Company, Company.id == Policy.company_id)
+            .filter(func.coalesce(Company.name, "") != CORPUS_COMPANY)
+        )
+        return result.scalar_one()
+
+
+async def benchmark(providers: list[str], sizes: list[int], queries: int, top_k: int, strategies: list[str],
+                    seed: int, keep: bool, allow_existing_data: bool):
+    existing = await other_policies()
+    if existing and not allow_existing_data:
+        raise SystemExit(f"The database has {existing} other policies, which would skew the labels. "
+                         f"Run against an empty database (e.g. TESTING=true) or pass --allow-existing-data.")
+
+    async with async_session_maker() as db:
+        if await delete_corpora(db):
+            print("Deleted a benchmark corpus left by a previous run")
+
+    results = []
+    runs = [(size, provider) for size in sizes for provider in providers]
+    for i, (size, provider) in enumerate(runs):
+        # Only the last corpus can be kept, earlier ones would compete with the next
+        results += await benchmark_size(build_embedding_provider(provider), size, queries, top_k, strategies,
+                                        seed, keep and i == len(runs) - 1)
+    print_table(results, top_k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark search strategies on a seeded synthetic corpus")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="rules per corpus")
+    parser.add_argument("--providers", nargs="+", choices=list(EMBEDDING_PROVIDERS), default=["stub"],
+                        help="embedding providers to compare, each with its default model")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=STRATEGIES)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="keep the last corpus instead of deleting it")
+    parser.add_argument("--allow-existing-data", action="store_true")
+    args = parser.parse_args()
+
+    asyncio.run(benchmark(args.providers, args.sizes, args.queries, args.top_k, args.strategies, args.seed,
+                          args.keep, args.allow_existing_data))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Measure recall and latency of the two-stage semantic search against an exact scan.
+
+    python -m app.commands.benchmark_search
+    python -m app.commands.benchmark_search --queries 200 --first-pass short halfvec --candidates 20 50 100
+    python -m app.commands.benchmark_search --dimensions 128 256 768   # recall of other truncation sizes
+    python -m app.commands.benchmark_search --numpy   # also the in-process index, built in a temporary directory
+    python -m app.commands.benchmark_search --hybrid 50   # hybrid against vector-only on 50 rule lookups
+    python -m app.commands.benchmark_search --hydration   # one-statement search against separate lookups
+
+Stored embeddings are used as queries, so no embedding API calls are made, except for `--hybrid`:
+it looks rules up by their keywords (or the start of their description), which are embedded with
+the configured provider, and reports how often the rule itself is in the top k. `--dimensions` re-ranks
+an exact scan over truncated vectors computed on the fly, which shows the recall a short column of
+that size would give before adding one; its latency is not representative.
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from statistics import quantiles
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import func, cast, select, and_, or_
+
+from app.core.ai.embedding_search import nearest_embeddings, candidate_branches, hybrid_matches, semantic_search
+from app.core.ai.embeddings import truncate_embedding, embed_text_cached
+from app.core.ai.providers import EMBEDDING_DIMENSIONS
+from app.core.ai.vector_index import MappedVectorIndex, rebuild_index
+from app.core.config import settings
+from app.api.v1.schemas.policy import PolicyWithRulesForSemanticSearch
+from app.api.v1.schemas.rule import RuleWithSimilarity
+from app.db.models import Embedding, PolicyRule, Policy
+from app.db.session import async_session_maker
+from app.db.soft_delete import filtered_select
+
+
+def latency_summary(seconds: list[float]) -> str:
+    if len(seconds) < 2:
+        return f"p50 {seconds[0] * 1000:.1f}ms" if seconds else "no samples"
+    percentiles = quantiles(seconds, n=100)
+    return f"p50 {percentiles[49] * 1000:.1f}ms, p95 {percentiles[94] * 1000:.1f}ms"
+
+
+def visible_to(company_id):
+    return or_(*[and_(*branch) for branch in candidate_branches(company_id, None)])
+
+
+async def exact_nearest(db, vector: list[float], top_k: int, company_id) -> list[int]:
+    distance = func.cosine_distance(Embedding.embedding, cast(vector, Vector))
+    result = await db.execute(select(Embedding.id).filter(visible_to(company_id)).order_by(distance).limit(top_k))
+    return list(result.scalars().all())
+
+
+async def truncated_nearest(db, vector: list[float], top_k: int, dimensions: int, candidates: int,
+                            company_id) -> list[int]:
+    short_vector = cast(truncate_embedding(vector, dimensions), Vector)
+    short_distance = func.cosine_distance(
+        func.l2_normalize(func.subvector(Embedding.embedding, 1, dimensions)), short_vector
+    )
+    candidate_ids = (
+        select(Embedding.id)
+        .filter(visible_to(company_id))
+        .order_by(short_distance)
+        .limit(candidates)
+        .scalar_subquery()
+    )
+    distance = func.cosine_distance(Embedding.embedding, cast(vector, Vector))
+    result = await db.execute(
+        select(Embedding.id).filter(Embedding.id.in_(candidate_ids)).order_by(distance).limit(top_k)
+    )
+    return list(result.scalars().all())
+
+
+def rule_lookup_text(rule: PolicyRule) -> str:
+    return " ".join(rule.keywords) if rule.keywords else " ".join((rule.description or "").split()[:12])
+
+
+async def benchmark_hybrid(lookups: int, top_k: int, company_id):
+    async with async_session_maker() as db:
+        result = await db.execute(
+            select(PolicyRule)
+            .join(Embedding, (Embedding.content_type == "rule") & (Embedding.content_id == PolicyRule.id))
+            .filter(visible_to(company_id))
+            .order_by(func.random())
+            .limit(lookups)
+        )
+        rules = result.scalars().all()
+        queries = [(rule.id, rule_lookup_text(rule)) for rule in rules]
+        vectors = [await embed_text_cached(text) for _, text in queries]
+
+        for mode in ("vector", "hybrid"):
+            hits, seconds = 0, []
+            for (rule_id, text), vector in zip(queries, vectors):
+                started = time.perf_counter()
+                if mode == "vector":
+                    matches = await nearest_embeddings(db, vector, top_k, company_id=company_id)
+                else:
+                    matches = await hybrid_matches(db, text, vector, top_k, company_id=company_id)
+                seconds.append(time.perf_counter() - started)
+                await db.rollback()
+                hits += ("rule", rule_id) in {(match.content_type, match.content_id) for match in matches}
+
+            print(f"{mode} rule lookup: hit rate@{top_k} {hits / max(len(queries), 1):.3f}, "
+                  f"{latency_summary(seconds)} over {len(queries)} lookups")
+
+
+async def search_with_lookups(db, vector: list[float], top_k: int, company_id) -> list:
+    """The search before hydration moved into SQL: top k, then rules and policies by id, joined in Python."""
+    matches = await nearest_embeddings(db, vector, top_k, company_id=company_id)
+    similarities = {(match.content_type, match.content_id): 1.0 - match.distance for match in matches}
+    rule_ids = [content_id for content_type, content_id in similarities if content_type == "rule"]
+    rules = (await db.execute(filtered_select(PolicyRule).filter(PolicyRule.id.in_(rule_ids)))).scalars().all()
+    policy_ids = {rule.policy_id for rule in rules} | \
+                 {content_id for content_type, content_id in similarities if content_type == "policy"}
+    policies = {policy.id: policy for policy in
+                (await db.execute(filtered_select(Policy).filter(Policy.id.in_(policy_ids)))).scalars().all()}
+
+    results = {}
+    for policy_id, policy in policies.items():
+        similarity = similarities.get(("policy", policy_id), 0.0)
+        results[policy_id] = PolicyWithRulesForSemanticSearch.model_validate(
+            {**policy.__dict__, "rules": [], "similarity": similarity}
+        )
+    for rule in rules:
+        if rule.policy_id in results:
+            similarity = similarities[("rule", rule.id)]
+            results[rule.policy_id].rules.append(
+                RuleWithSimilarity.model_validate({**rule.__dict__, "similarity": similarity})
+            )
+            results[rule.policy_id].similarity = max(results[rule.policy_id].similarity, similarity)
+    return sorted(results.values(), key=lambda policy: policy.similarity, reverse=True)
+
+
+async def benchmark_hydration(queries: int, top_k: int, company_id):
+    async with async_session_maker() as db:
+        result = await db.execute(select(Embedding).order_by(func.random()).limit(queries))
+        samples = [list(embedding.embedding) for embedding in result.scalars().all()]
+        await db.rollback()
+
+        results = {}
+        for mode, search in (("separate lookups", search_with_lookups), ("single statement", None)):
+            found, seconds = [], []
+            for vector in samples:
+                started = time.perf_counter()
+                if search:
+                    policies = await search(db, vector, top_k, company_id)
+                else:
+                    policies = await semantic_search(db, embedding=vector, top_k=top_k, company_id=company_id,
+                                                     hybrid=False)
+                seconds.append(time.perf_counter() - started)
+                await db.rollback()
+                found.append([policy.id for policy in policies])
+            results[mode] = found
+            print(f"{mode}: {latency_summary(seconds)} per search over {len(samples)} queries")
+
+        same = sum(a == b for a, b in zip(*results.values()))
+        print(f"identical policy lists: {same}/{len(samples)}")
+
+
+def recall(found: list[list[int]], expected: list[list[int]]) -> float:
+    hits = sum(len(set(ids) & set(exact)) for ids, exact in zip(found, expected))
+    return hits / max(sum(len(exact) for exact in expected), 1)
+
+
+async def benchmark(queries: int, top_k: int, first_passes: list[str], candidates_values: list[int],
+                    ef_search: int, dimensions_values: list[int], company_id, numpy_index: bool):
+    async with async_session_maker() as db:
+        result = await db.execute(select(Embedding).order_by(func.random()).limit(queries))
+        samples = [list(embedding.embedding) for embedding in result.scalars().all()]
+        if not samples:
+            print("No embeddings to benchmark")
+            return
+
+        exact_ids, seconds = [], []
+        for vector in samples:
+            started = time.perf_counter()
+            exact_ids.append(await exact_nearest(db, vector, top_k, company_id))
+            seconds.append(time.perf_counter() - started)
+        await db.rollback()
+        print(f"exact scan: {latency_summary(seconds)} over {len(samples)} queries")
+
+        for first_pass in first_passes:
+            for candidates in candidates_values:
+                found, seconds = [], []
+                for vector in samples:
+                    started = time.perf_counter()
+                    matches = await nearest_embeddings(db, vector, top_k, company_id=company_id,
+                                                       candidates=candidates, ef_search=ef_search,
+                                                       first_pass=first_pass)
+                    seconds.append(time.perf_counter() - started)
+                    await db.rollback()
+                    found.append([match.embedding_id for match in matches])
+
+                print(f"{first_pass} candidates={candidates} ef_search={max(ef_search, candidates)}: "
+                      f"recall@{top_k} {recall(found, exact_ids):.3f}, {latency_summary(seconds)}")
+
+        for dimensions in dimensions_values:
+            for candidates in candidates_values:
+                found = [await truncated_nearest(db, vector, top_k, dimensions, candidates, company_id)
+                         for vector in samples]
+                print(f"exact {dimensions}-dim first pass candidates={candidates}: "
+                      f"recall@{top_k} {recall(found, exact_ids):.3f}")
+        await db.rollback()
+
+    if numpy_index:
+        with tempfile.TemporaryDirectory() as path:
+            store = MappedVectorIndex(path, EMBEDDING_DIMENSIONS)
+            started = time.perf_counter()
+            rows = await rebuild_index(store)
+            print(f"numpy index: built {rows} rows in {time.perf_counter() - started:.1f}s")
+
+            found, seconds = [], []
+            for vector in samples:
+                started = time.perf_counter()
+                matches = store.search(vector, top_k, company_id)
+                seconds.append(time.perf_counter() - started)
+                found.append([match.embedding_id for match in matches])
+            print(f"numpy float16 scan: recall@{top_k} {recall(found, exact_ids):.3f}, {latency_summary(seconds)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark semantic search recall and latency")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--first-pass", nargs="+", choices=["short", "halfvec"], default=["short", "halfvec"])
+    parser.add_argument("--candidates", type=int, nargs="+", default=[settings.SEMANTIC_SEARCH_CANDIDATES])
+    parser.add_argument("--ef-search", type=int, default=settings.SEMANTIC_SEARCH_EF_SEARCH)
+    parser.add_argument("--dimensions", type=int, nargs="*", default=[])
+    parser.add_argument("--company-id", type=int, default=None,
+                        help="search as this company, shared policies only when omitted")
+    parser.add_argument("--numpy", action="store_true", help="also benchmark the in-process numpy index")
+    parser.add_argument("--hybrid", type=int, default=0, metavar="LOOKUPS",
+                        help="compare hybrid and vector-only search on this many rule lookups instead")
+    parser.add_argument("--hydration", action="store_true",
+                        help="compare the one-statement search with separate rule and policy lookups instead")
+    args = parser.parse_args()
+
+    if args.hydration:
+        asyncio.run(benchmark_hydration(args.queries, args.top_k, args.company_id))
+        return
+    if args.hybrid:
+        asyncio.run(benchmark_hybrid(args.hybrid, args.top_k, args.company_id))
+        return
+    asyncio.run(benchmark(args.queries, args.top_k, args.first_pass, args.candidates, args.ef_search,
+                          args.dimensions, args.company_id, args.numpy))
+
+
+if __name__ == "__main__":
+    main()
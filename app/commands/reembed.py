@@ -0,0 +1,35 @@
+"""
+Re-embed policies and rules whose embedding is missing or stale.
+
+    python -m app.commands.reembed
+    python -m app.commands.reembed --older-than 2026-10-19T00:00:00+00:00   # after changing the model
+
+The run is resumable: start it again with the same arguments after an interruption.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+
+from app.api.v1.schemas.embedding import ReembedStatus
+from app.api.v1.services.embedding_service import reembed_all
+
+
+def parse_timestamp(value: str) -> datetime:
+    timestamp = datetime.fromisoformat(value)
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed policies and rules in bulk")
+    parser.add_argument("--older-than", type=parse_timestamp, default=None,
+                        help="also re-embed rows embedded before this ISO timestamp")
+    parser.add_argument("--page-size", type=int, default=500)
+    args = parser.parse_args()
+
+    report = asyncio.run(reembed_all(args.older_than, args.page_size))
+    print(report.model_dump_json(indent=2))
+    raise SystemExit(0 if report.status == ReembedStatus.completed else 1)
+
+
+if __name__ == "__main__":
+    main()
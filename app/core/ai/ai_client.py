@@ -1,6 +1,17 @@
-from openai import OpenAI
-from google import genai
+from functools import cache
+
 from app.core.config import settings
 
-openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
-gemini_client = genai.Client(api_key=settings.GEMINI_API_KEY)
+
+# Clients are created on first use, so the app starts without the keys of providers it doesn't use
+
+@cache
+def get_openai_client():
+    from openai import OpenAI
+    return OpenAI(api_key=settings.OPENAI_API_KEY)
+
+
+@cache
+def get_gemini_client():
+    from google import genai
+    return genai.Client(api_key=settings.GEMINI_API_KEY)
@@ -0,0 +1,90 @@
+import re
+from difflib import SequenceMatcher
+from typing import Callable, Iterable, Literal, TypeVar
+
+from app.api.v1.schemas.analysis import AnalysisResult
+
+T = TypeVar("T")
+
+NEAR_DUPLICATE_RATIO = 0.85
+
+
+def normalize(text: str | None) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", (text or "").lower()).strip()
+
+
+def normalize_clause_name(name: str | None) -> str:
+    return re.sub(r"\b(clause|provision|section)s?\b", "", normalize(name)).strip()
+
+
+def deduplicate(items: Iterable[T], group: Callable[[T], str], detail: Callable[[T], str] = lambda _: "") -> list[T]:
+    """
+    Keep the first of every set of items that share a group key and have near-identical details.
+
+    Details are compared fuzzily because the same finding is rarely worded identically by two model calls.
+    """
+    kept: list[T] = []
+    seen: dict[str, list[str]] = {}
+    for item in items:
+        key, item_detail = group(item), normalize(detail(item))
+        details = seen.setdefault(key, [])
+        if any(item_detail == other or SequenceMatcher(None, item_detail, other).ratio() >= NEAR_DUPLICATE_RATIO
+               for other in details):
+            continue
+        details.append(item_detail)
+        kept.append(item)
+    return kept
+
+
+def merge_analysis_results(results: list[AnalysisResult],
+                           missing_clauses: Literal["intersection", "union"] = "union") -> AnalysisResult:
+    """
+    Merge partial analyses of the same document into one result.
+
+    Use `missing_clauses="intersection"` when each result only saw part of the document: a clause
+    is then only missing if no part contained it. Use "union" when every result saw the whole
+    document against a different subset of rules.
+    """
+    if not results:
+        raise ValueError("Nothing to merge")
+    if len(results) == 1:
+        return results[0]
+
+    clauses_per_result = [
+        {normalize_clause_name(clause.clause_name): clause for clause in result.missing_clauses}
+        for result in results
+    ]
+    if missing_clauses == "intersection":
+        common_names = set.intersection(*(set(clauses) for clauses in clauses_per_result))
+        merged_clauses = [clause for name, clause in clauses_per_result[0].items() if name in common_names]
+    else:
+        merged_clauses = deduplicate(
+            (clause for clauses in clauses_per_result for clause in clauses.values()),
+            group=lambda clause: normalize_clause_name(clause.clause_name),
+        )
+
+    return AnalysisResult(
+        document_id=results[0].document_id,
+        checklist_id=results[0].checklist_id,
+        title=next((result.title for result in results if result.title), ""),
+        company_name=next((result.company_name for result in results if result.company_name), ""),
+        conflicts=deduplicate(
+            (conflict for result in results for conflict in result.conflicts),
+            group=lambda conflict: normalize(conflict.policy_name),
+            detail=lambda conflict: conflict.conflict_detail,
+        ),
+        risks=deduplicate(
+            (risk for result in results for risk in result.risks),
+            group=lambda risk: normalize(risk.risk_type),
+            detail=lambda risk: risk.detail,
+        ),
+        missing_clauses=merged_clauses,
+        suggestions=deduplicate(
+            (suggestion for result in results for suggestion in result.suggestions),
+            group=lambda suggestion: normalize(suggestion.title),
+        ),
+        payment_terms=deduplicate(
+            (term for result in results for term in result.payment_terms),
+            group=lambda term: f"{normalize(term.title)}|{normalize(term.due_date)}|{term.amount_due}",
+        ),
+    )
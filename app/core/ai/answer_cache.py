@@ -0,0 +1,72 @@
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from loguru import logger
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import func, cast, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.schemas.policy import PolicyType
+from app.core.config import settings
+from app.db.models import CachedAnswer, Document, Policy
+
+
+async def find_cached_answer(db: AsyncSession, document_id: int, question_embedding: list[float]) -> Optional[CachedAnswer]:
+    fresh_since = datetime.now(timezone.utc) - timedelta(seconds=settings.ANSWER_CACHE_TTL_SECONDS)
+    result = await db.execute(
+        select(CachedAnswer,
+               func.cosine_distance(CachedAnswer.question_embedding, cast(question_embedding, Vector)).label("distance"))
+        .filter(CachedAnswer.document_id == document_id, CachedAnswer.created_at >= fresh_since)
+        .order_by("distance")
+        .limit(1)
+    )
+    match = result.first()
+    if not match:
+        return None
+
+    cached_answer, distance = match
+    if 1.0 - float(distance) < settings.ANSWER_CACHE_SIMILARITY_THRESHOLD:
+        return None
+
+    cached_answer.hits += 1
+    cached_answer.last_hit_at = datetime.now(timezone.utc)
+    await db.commit()
+    logger.info(f"Serving cached answer {cached_answer.id} for document {document_id} "
+                f"(similarity {1.0 - float(distance):.3f})")
+    return cached_answer
+
+
+async def store_answer(db: AsyncSession, document_id: int, question: str, question_embedding: list[float],
+                       answer: str) -> CachedAnswer:
+    cached_answer = CachedAnswer(document_id=document_id, question=question, question_embedding=question_embedding,
+                                 answer=answer)
+    db.add(cached_answer)
+    await db.commit()
+    return cached_answer
+
+
+async def invalidate_document_answers(db: AsyncSession, document_id: int):
+    await db.execute(delete(CachedAnswer).where(CachedAnswer.document_id == document_id))
+
+
+async def invalidate_policy_answers(db: AsyncSession, policy_id: int):
+    """
+    Drop the answers that may have been based on the rules of a policy: company policies
+    affect the company's documents, industry and standard policies affect every document.
+
+    Answers don't record which rules they were given, and couldn't be scoped by them anyway: an
+    edited rule may now match questions whose answers it wasn't part of. Shared policies are edited
+    by admins, rarely, so clearing the whole cache for them is cheaper than serving stale answers.
+    """
+    result = await db.execute(select(Policy.policy_type, Policy.company_id).filter(Policy.id == policy_id))
+    policy = result.first()
+    if not policy:
+        return
+
+    # Every cached answer for industry and standard policies, see above
+    stmt = delete(CachedAnswer)
+    if policy.policy_type == PolicyType.company and policy.company_id:
+        stmt = stmt.where(CachedAnswer.document_id.in_(
+            select(Document.id).filter(Document.company_id == policy.company_id)
+        ))
+    await db.execute(stmt)
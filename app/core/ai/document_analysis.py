@@ -1,60 +1,190 @@
+import asyncio
 import base64
+from dataclasses import dataclass
 from typing import Optional
 
-from google.genai.types import Tool, GoogleSearch, GenerateContentConfig
 from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.analysers.document_sections import chunk_by_sections
 from app.api.v1.schemas.analysis import AnalysisResult
+from app.api.v1.schemas.model_stats import ModelOperation
 from app.core.config import settings
-from app.utils.formatters import format_policies_and_rules_into_text, print_model
-from .ai_client import gemini_client
+from app.db.models import Document
+from app.utils.formatters import format_policies_and_rules_into_text, format_messages_history, print_model
+from .analysis_merge import merge_analysis_results
+from .answer_cache import find_cached_answer, store_answer
+from .document_retrieval import find_passages, format_passages
 from .embedding_search import semantic_search
+from .embeddings import embed_text_cached
+from .model_router import model_router
+from .providers import get_llm_provider
+from .token_budget import fit_rules_to_budget, fit_history_to_budget, log_prompt_sections
+from .tokens import estimate_tokens, TokenUsage
 
 
 def upload_file(file_path: str):
-    return gemini_client.files.upload(file=file_path)
+    return get_llm_provider().upload_file(file_path)
 
 
 def check_files():
-    return gemini_client.files.list()
+    return get_llm_provider().list_files()
 
 
-async def chat_with_document(text: str, gemini_file_name: str, db: AsyncSession, history: Optional[str] = None):
-    google_search_tool = Tool(
-        google_search=GoogleSearch()
+QUERY_REWRITE_PROMPT = ("Rewrite the user's last question into a standalone search query for a legal rules database. "
+                        "Resolve references to the previous conversation. Reply with the query only.")
+
+
+def rewrite_query(text: str, history_text: str):
+    return model_router.generate(
+        ModelOperation.query_rewrite,
+        contents=[f"Previous conversation:\n{history_text}", "\n\n", f"Question: {text}"],
+        system_instruction=QUERY_REWRITE_PROMPT
     )
-    document = gemini_client.files.get(name=gemini_file_name)
-    relevant_rules = format_policies_and_rules_into_text(await semantic_search(text=text, db=db))
+
+
+@dataclass
+class ChatAnswer:
+    text: str
+    is_cached: bool = False
+
+
+async def chat_with_document(text: str, document: Document, db: AsyncSession, history: Optional[list] = None,
+                             usage: Optional[TokenUsage] = None) -> ChatAnswer:
+    usage = usage if usage is not None else TokenUsage()
+    history_text = format_messages_history(fit_history_to_budget(history, settings.CHAT_HISTORY_TOKEN_BUDGET)) \
+        if history else None
+
+    # Follow-up questions ("and what about the notice period?") retrieve poorly on their own
+    search_text = text
+    if settings.CHAT_QUERY_REWRITE and history_text:
+        rewritten = await asyncio.to_thread(rewrite_query, text, history_text)
+        usage.add(rewritten)
+        search_text = (rewritten.text or "").strip() or text
+        logger.debug(f"Rewrote chat question for search: {search_text}")
+
+    # A follow-up that wasn't rewritten depends on the conversation, so its answer can't be shared
+    cacheable = settings.ANSWER_CACHE_ENABLED and (not history_text or settings.CHAT_QUERY_REWRITE)
+    question_embedding = await embed_text_cached(search_text)
+    if cacheable:
+        cached_answer = await find_cached_answer(db, document.id, question_embedding)
+        if cached_answer:
+            return ChatAnswer(text=cached_answer.answer, is_cached=True)
+
+    passages = []
+    if settings.CHAT_RETRIEVAL and document.text_content \
+            and estimate_tokens(document.text_content) >= settings.CHAT_PASSAGES_MIN_DOCUMENT_TOKENS:
+        passages = await find_passages(db, document.id, question_embedding, settings.CHAT_PASSAGES)
+    if passages:
+        document_content = format_passages(document, passages)
+    else:
+        # Short or not yet indexed documents are sent whole
+        document_content = get_llm_provider().get_file(document.gemini_name)
+
+    search_results = await semantic_search(db=db, text=search_text, embedding=question_embedding,
+                                           company_id=document.company_id)
+    relevant_policies = fit_rules_to_budget(search_results, settings.CHAT_RULES_TOKEN_BUDGET)
+    relevant_rules = format_policies_and_rules_into_text(relevant_policies)
     system_instruction = f"You are LegalCheck - an expert AI for legal teams. Answer the user's question clearly and concisely. Don't cite the document where it's not needed. Here are some rules which may be relevant to the question:\n {relevant_rules}"
-    if history:
-        system_instruction += f"\n\nPrevious conversation:\n{history}"
-
-    response = gemini_client.models.generate_content(
-        model=settings.GEMINI_MODEL,
-        contents=[document, "\n\n", text],
-        config=GenerateContentConfig(
-            tools=[google_search_tool],
-            response_modalities=["TEXT"],
-            system_instruction=[system_instruction]
-        )
+    if history_text:
+        system_instruction += f"\n\nPrevious conversation:\n{history_text}"
+    log_prompt_sections("Chat", rules=relevant_rules, history=history_text, question=text,
+                        passages=document_content if passages else None)
+
+    response = await asyncio.to_thread(
+        model_router.generate,
+        ModelOperation.chat,
+        contents=[document_content, "\n\n", text],
+        system_instruction=system_instruction,
+        web_search=True
     )
+    usage.add(response)
 
-    return response.text
+    if cacheable and response.text:
+        await store_answer(db, document.id, search_text, question_embedding, response.text)
 
+    return ChatAnswer(text=response.text)
 
-def initial_analysis(file_name, policies_and_rules):
-    file = gemini_client.files.get(name=file_name)
 
-    complete_prompt: str = base64.b64decode(settings.INITIAL_ANALYSIS_PROMPT).decode('utf-8') + policies_and_rules
+def analysis_prompt(policies_and_rules: str) -> str:
+    return base64.b64decode(settings.INITIAL_ANALYSIS_PROMPT).decode('utf-8') + policies_and_rules
+
 
-    response = gemini_client.models.generate_content(
-        model=settings.GEMINI_MODEL,
+def initial_analysis(file_name, policies_and_rules):
+    file = get_llm_provider().get_file(file_name)
+
+    return model_router.generate(
+        ModelOperation.analysis,
         contents=[file, "\n\n", "Analyze the document."],
-        config={
-            "system_instruction": complete_prompt,
-            'response_mime_type': 'application/json',
-            'response_schema': AnalysisResult,
-        }
+        system_instruction=analysis_prompt(policies_and_rules),
+        response_schema=AnalysisResult
     )
-    return response.parsed
+
+
+def shard_analysis(file_name, rules_shard: str):
+    file = get_llm_provider().get_file(file_name)
+
+    # The prompt and the document come first and are identical for every shard, so Gemini
+    # serves that prefix from its implicit cache - only the rules after it differ per call
+    return model_router.generate(
+        ModelOperation.analysis,
+        contents=[file, "\n\n", f"Rules to check the document against:\n{rules_shard}", "\n\n",
+                  "Analyze the document."],
+        system_instruction=analysis_prompt(""),
+        response_schema=AnalysisResult
+    )
+
+
+def excerpt_analysis(excerpt: str, excerpt_description: str, policies_and_rules: str):
+    return model_router.generate(
+        ModelOperation.analysis,
+        contents=[excerpt_description, "\n\n", excerpt, "\n\n", "Analyze the document."],
+        system_instruction=analysis_prompt(policies_and_rules),
+        response_schema=AnalysisResult
+    )
+
+
+async def run_analysis(file_name: str, text_content: Optional[str], rule_shards: list[str],
+                       usage: Optional[TokenUsage] = None) -> AnalysisResult:
+    """
+    Analyze a document against a ruleset rendered by `render_rule_shards`.
+
+    Small documents with a single shard take one call. Otherwise the document (split into section
+    chunks above ANALYSIS_CHUNKING_THRESHOLD_TOKENS) is analyzed against every shard in parallel
+    and the partial results are merged. Tokens of all calls are added to `usage`.
+    """
+    usage = usage if usage is not None else TokenUsage()
+    chunked = text_content and estimate_tokens(text_content) > settings.ANALYSIS_CHUNKING_THRESHOLD_TOKENS
+    log_prompt_sections("Analysis", prompt=analysis_prompt(""),
+                        rules="".join(rule_shards), document=text_content)
+
+    slots = asyncio.Semaphore(settings.ANALYSIS_MAX_PARALLEL_CALLS)
+
+    async def call(fn, *args):
+        async with slots:
+            response = await asyncio.to_thread(fn, *args)
+        usage.add(response)
+        return response.parsed
+
+    if not chunked and len(rule_shards) == 1:
+        return await call(initial_analysis, file_name, rule_shards[0])
+
+    if not chunked:
+        logger.info(f"Analyzing document against {len(rule_shards)} rule shards")
+        results = await asyncio.gather(*[call(shard_analysis, file_name, shard) for shard in rule_shards])
+        return merge_analysis_results(results, missing_clauses="union")
+
+    chunks = chunk_by_sections(text_content, settings.ANALYSIS_CHUNK_TOKENS)
+    logger.info(f"Analyzing document in {len(chunks)} chunks against {len(rule_shards)} rule shards")
+
+    async def analyze_chunk(chunk):
+        description = (f"This is part {chunk.index + 1} of {len(chunks)} of a longer document "
+                       f"(characters {chunk.start_offset}-{chunk.end_offset}). Analyze only this part.")
+        shard_results = await asyncio.gather(*[call(excerpt_analysis, chunk.text, description, shard)
+                                               for shard in rule_shards])
+        return merge_analysis_results(shard_results, missing_clauses="union")
+
+    chunk_results = await asyncio.gather(*[analyze_chunk(chunk) for chunk in chunks])
+
+    # Each chunk only saw part of the document, so a clause is missing only if every chunk reports it
+    return merge_analysis_results(chunk_results, missing_clauses="intersection")
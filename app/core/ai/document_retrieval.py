@@ -0,0 +1,63 @@
+import asyncio
+
+from loguru import logger
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.analysers.document_sections import chunk_with_overlap
+from app.core.config import settings
+from app.db.models import Document, DocumentChunk
+from .providers import get_embedding_provider
+
+
+async def index_document_chunks(db: AsyncSession, document: Document) -> int:
+    """
+    Replace the chunks of `document` with overlapping chunks of its `text_content`, embedded in
+    EMBEDDING_BATCH_SIZE requests. Committed by the caller.
+    """
+    await db.execute(delete(DocumentChunk).where(DocumentChunk.document_id == document.id))
+    if not document.text_content:
+        return 0
+
+    provider = get_embedding_provider()
+    chunks = chunk_with_overlap(document.text_content, settings.DOCUMENT_CHUNK_TOKENS,
+                                settings.DOCUMENT_CHUNK_OVERLAP_TOKENS)
+    for start in range(0, len(chunks), settings.EMBEDDING_BATCH_SIZE):
+        batch = chunks[start:start + settings.EMBEDDING_BATCH_SIZE]
+        vectors = await asyncio.to_thread(provider.embed_batch, [chunk.text for chunk in batch])
+        db.add_all([
+            DocumentChunk(document_id=document.id, chunk_index=chunk.index, start_offset=chunk.start_offset,
+                          end_offset=chunk.end_offset, text=chunk.text, embedding=vector, model=provider.key)
+            for chunk, vector in zip(batch, vectors)
+        ])
+
+    logger.info(f"Indexed document {document.id} as {len(chunks)} chunks")
+    return len(chunks)
+
+
+def passages_query(document_id: int, embedding: list[float], top_k: int, model: str):
+    # Exact distances over one document's chunks, found through the document_id index: a document
+    # has at most a few hundred chunks, and an HNSW index over every document's chunks would
+    # return its ef_search nearest chunks before the document filter, often none of this document's
+    return (
+        select(DocumentChunk)
+        .filter(DocumentChunk.document_id == document_id, DocumentChunk.model == model)
+        .order_by(DocumentChunk.embedding.cosine_distance(embedding))
+        .limit(top_k)
+    )
+
+
+async def find_passages(db: AsyncSession, document_id: int, embedding: list[float], top_k: int) -> list[DocumentChunk]:
+    """
+    The `top_k` chunks of a document closest to `embedding`, in document order. Empty when the
+    document has no chunks by the serving embedding model (not indexed yet, or indexed before a cutover).
+    """
+    result = await db.execute(passages_query(document_id, embedding, top_k, get_embedding_provider().key))
+    return sorted(result.scalars().all(), key=lambda chunk: chunk.start_offset)
+
+
+def format_passages(document: Document, passages: list[DocumentChunk]) -> str:
+    sections = [f"[Characters {passage.start_offset}-{passage.end_offset}]\n{passage.text.strip()}"
+                for passage in passages]
+    return (f"Passages of the document {document.filename} most relevant to the question, "
+            f"in document order:\n\n" + "\n\n...\n\n".join(sections))
@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+
+from app.api.v1.schemas.model_stats import EmbeddingCacheStats
+from app.core.config import settings
+from app.core.single_flight import SingleFlight
+from app.db.models import EmbeddingCacheEntry
+from app.db.session import async_session_maker
+from .providers import get_embedding_provider, EmbeddingProvider
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip().lower()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode()).hexdigest()
+
+
+def to_list(vector) -> list[float]:
+    # pgvector returns numpy arrays
+    return vector.tolist() if hasattr(vector, "tolist") else list(vector)
+
+
+@dataclass
+class CacheCounters:
+    memory_hits: int = 0
+    db_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    db_writes: int = 0
+
+
+class EmbeddingCache:
+    """
+    Two-level cache of text embeddings keyed by the normalized text hash and the embedding model.
+
+    The first level is an in-process LRU (EMBEDDING_CACHE_MAX_ENTRIES), the second the shared
+    `embedding_cache` table (EMBEDDING_CACHE_MAX_ROWS). Both expire entries after
+    EMBEDDING_CACHE_TTL_SECONDS. Concurrent misses for the same text share one provider call.
+    """
+
+    def __init__(self):
+        self.memory: OrderedDict[tuple[str, str], tuple[float, list[float]]] = OrderedDict()
+        self.stats = CacheCounters()
+        self.flight = SingleFlight()
+
+    async def embed(self, text: str, provider: Optional[EmbeddingProvider] = None) -> list[float]:
+        provider = provider or get_embedding_provider()
+        key = (text_hash(text), provider.key)
+
+        cached = self.memory.get(key)
+        if cached and cached[0] > time.monotonic():
+            self.memory.move_to_end(key)
+            self.stats.memory_hits += 1
+            return cached[1]
+
+        vector = await self.flight.do(key, lambda: self.load_or_embed(key, text, provider))
+        self.remember(key, vector)
+        return vector
+
+    def remember(self, key: tuple[str, str], vector: list[float]):
+        self.memory[key] = (time.monotonic() + settings.EMBEDDING_CACHE_TTL_SECONDS, vector)
+        self.memory.move_to_end(key)
+        while len(self.memory) > settings.EMBEDDING_CACHE_MAX_ENTRIES:
+            self.memory.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def load_or_embed(self, key: tuple[str, str], text: str, provider: EmbeddingProvider) -> list[float]:
+        text_digest, model = key
+        fresh_since = datetime.now(timezone.utc) - timedelta(seconds=settings.EMBEDDING_CACHE_TTL_SECONDS)
+
+        async with async_session_maker() as db:
+            result = await db.execute(
+                select(EmbeddingCacheEntry.embedding)
+                .filter(EmbeddingCacheEntry.text_hash == text_digest, EmbeddingCacheEntry.model == model,
+                        EmbeddingCacheEntry.created_at >= fresh_since)
+            )
+            stored = result.scalar_one_or_none()
+            if stored is not None:
+                self.stats.db_hits += 1
+                return to_list(stored)
+
+            self.stats.misses += 1
+            vector = to_list(await asyncio.to_thread(provider.embed, text))
+
+            await db.execute(
+                insert(EmbeddingCacheEntry)
+                .values(text_hash=text_digest, model=model, embedding=vector, created_at=datetime.now(timezone.utc))
+                .on_conflict_do_update(constraint="uq_embedding_cache_text_hash_model",
+                                       set_={"embedding": vector, "created_at": datetime.now(timezone.utc)})
+            )
+            await db.commit()
+
+        self.stats.db_writes += 1
+        if self.stats.db_writes % settings.EMBEDDING_CACHE_PRUNE_EVERY == 0:
+            await prune_embedding_cache()
+        return vector
+
+    def summary(self) -> EmbeddingCacheStats:
+        lookups = self.stats.memory_hits + self.stats.db_hits + self.stats.misses
+        return EmbeddingCacheStats(
+            memory_hits=self.stats.memory_hits,
+            db_hits=self.stats.db_hits,
+            misses=self.stats.misses,
+            evictions=self.stats.evictions,
+            memory_entries=len(self.memory),
+            hit_rate=round((lookups - self.stats.misses) / lookups, 3) if lookups else 0.0,
+        )
+
+
+async def prune_embedding_cache():
+    """Delete expired rows and the oldest rows above EMBEDDING_CACHE_MAX_ROWS."""
+    expired_before = datetime.now(timezone.utc) - timedelta(seconds=settings.EMBEDDING_CACHE_TTL_SECONDS)
+    async with async_session_maker() as db:
+        expired = await db.execute(delete(EmbeddingCacheEntry).where(EmbeddingCacheEntry.created_at < expired_before))
+        newest = select(EmbeddingCacheEntry.id).order_by(EmbeddingCacheEntry.created_at.desc()) \
+            .limit(settings.EMBEDDING_CACHE_MAX_ROWS)
+        overflow = await db.execute(delete(EmbeddingCacheEntry).where(EmbeddingCacheEntry.id.not_in(newest)))
+        await db.commit()
+    logger.info(f"Pruned embedding cache: {expired.rowcount} expired, {overflow.rowcount} over the size limit")
+
+
+embedding_cache = EmbeddingCache()
@@ -1,149 +1,391 @@
-from typing import Dict, Set
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
 
 from loguru import logger
-from pgvector.sqlalchemy import Vector
-from sqlalchemy import func, cast
+from pgvector.sqlalchemy import Vector, HALFVEC
+from sqlalchemy import func, cast, literal, union_all, values, column, case, String, Integer, Float, JSON, and_, or_
+from sqlalchemy.dialects.postgresql import REGCONFIG, aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from app.api.v1.schemas.policy import PolicyWithRulesForSemanticSearch
-from app.api.v1.schemas.rule import RuleWithSimilarity
-from app.core.ai.embeddings import get_embedding_gemini
-from app.db.models import Embedding, PolicyRule, Policy
-from app.db.soft_delete import filtered_select
+from app.api.v1.schemas.policy import PolicyWithRulesForSemanticSearch, PolicyType
+from app.core.ai.embeddings import embed_text_cached, truncate_embedding
+from app.core.ai.providers import EMBEDDING_DIMENSIONS, get_embedding_provider, get_shadow_embedding_provider
+from app.core.ai.vector_index import EmbeddingMatch, SHARED_POLICY_TYPES, vector_index
+from app.core.config import settings
+from app.db.models import Embedding, ShadowEmbedding, PolicyRule, Policy
+from app.db.session import async_session_maker
 
 
-async def semantic_search(db: AsyncSession, text: str, top_k: int = 10) -> list:
-    embedding_vector = get_embedding_gemini(text)
+def halfvec(value):
+    return cast(value, HALFVEC(EMBEDDING_DIMENSIONS))
 
-    stmt = (
-        filtered_select(
-            Embedding,
-            func.cosine_distance(Embedding.embedding, cast(embedding_vector, Vector)).label("distance")
+
+def default_first_pass() -> str:
+    # Truncated vectors of a hashing provider are mostly zeros, so its candidates come from the halfvec index
+    return settings.SEMANTIC_SEARCH_FIRST_PASS if get_embedding_provider().matryoshka else "halfvec"
+
+
+def first_pass_distance(first_pass: str, embedding_vector: list[float]):
+    """Distance expression matching one of the vector indexes on `embeddings`."""
+    if first_pass == "short":
+        short_vector = truncate_embedding(embedding_vector, settings.EMBEDDING_SHORT_DIMENSIONS)
+        return Embedding.embedding_short.cosine_distance(cast(short_vector, Vector))
+    if first_pass == "halfvec":
+        return halfvec(Embedding.embedding).cosine_distance(halfvec(embedding_vector))
+    raise ValueError(f"Unknown first pass: {first_pass}")
+
+
+def constant(value):
+    # Rendered inline rather than bound, so the planner can match the partial indexes' predicates
+    return literal(getattr(value, "value", value), String, literal_execute=True)
+
+
+def candidate_branches(company_id: Optional[int], policy_types: Optional[list[PolicyType]]) -> list:
+    """
+    Filters of the candidate queries for active policies and rules visible to `company_id`.
+
+    Industry and standard policies are shared by every company, company policies only by their own
+    company. Each group matches a partial index, so they are searched separately and combined.
+    """
+    policy_types = policy_types or list(PolicyType)
+    visible = [Embedding.is_active == True]
+    branches = []
+
+    shared_types = [policy_type for policy_type in SHARED_POLICY_TYPES if policy_type in policy_types]
+    if shared_types:
+        branch = visible + [Embedding.policy_type.in_([constant(policy_type) for policy_type in SHARED_POLICY_TYPES])]
+        if len(shared_types) < len(SHARED_POLICY_TYPES):
+            branch.append(Embedding.policy_type.in_([constant(policy_type) for policy_type in shared_types]))
+        branches.append(branch)
+
+    if company_id is not None and PolicyType.company in policy_types:
+        branches.append(visible + [Embedding.policy_type == constant(PolicyType.company),
+                                   Embedding.company_id == company_id])
+    return branches
+
+
+async def tune_vector_scan(db: AsyncSession, ef_search: int):
+    # Transaction-local settings; the HNSW scan returns at most ef_search rows, and iterative scans
+    # keep it going when rows are filtered out after the index
+    await db.execute(select(
+        func.set_config("hnsw.ef_search", str(int(ef_search)), True),
+        func.set_config("hnsw.iterative_scan", "relaxed_order", True),
+    ))
+
+
+def reranked_query(embedding_vector: list[float], limit: int, branches: list, candidates: int,
+                   first_pass: Optional[str] = None):
+    first_pass_order = first_pass_distance(first_pass or default_first_pass(), embedding_vector)
+    candidate_ids = union_all(*[
+        select(Embedding.id).filter(*branch).order_by(first_pass_order).limit(candidates)
+        for branch in branches
+    ]).subquery()
+
+    distance = func.cosine_distance(Embedding.embedding, cast(embedding_vector, Vector)).label("distance")
+    return (
+        select(Embedding.id, Embedding.content_type, Embedding.content_id, distance)
+        .filter(Embedding.id.in_(select(candidate_ids.c.id)))
+        .order_by(distance)
+        .limit(limit)
+    )
+
+
+async def nearest_embeddings(db: AsyncSession, embedding_vector: list[float], top_k: int,
+                             company_id: Optional[int] = None, policy_types: Optional[list[PolicyType]] = None,
+                             candidates: Optional[int] = None, ef_search: Optional[int] = None,
+                             first_pass: Optional[str] = None) -> list[EmbeddingMatch]:
+    """
+    Return the `top_k` closest embeddings among the active policies and rules visible to
+    `company_id`, optionally narrowed to `policy_types`.
+
+    The first pass takes `candidates` rows per visibility group from an HNSW index, either on the
+    truncated `embedding_short` column or on `embedding::halfvec`. Both lose a little precision, so
+    the candidates are re-ranked by the exact distance on the full 3072-dim vectors.
+    """
+    branches = candidate_branches(company_id, policy_types)
+    if not branches:
+        return []
+
+    candidates = max(candidates or settings.SEMANTIC_SEARCH_CANDIDATES, top_k)
+    await tune_vector_scan(db, max(ef_search or settings.SEMANTIC_SEARCH_EF_SEARCH, candidates))
+
+    result = await db.execute(reranked_query(embedding_vector, top_k, branches, candidates, first_pass))
+    return [EmbeddingMatch(*row) for row in result.all()]
+
+
+def visible_policies(company_id: Optional[int], policy_types: Optional[list[PolicyType]]):
+    """The same visibility as `candidate_branches`, on the policies table."""
+    policy_types = policy_types or list(PolicyType)
+    groups = []
+    shared_types = [policy_type for policy_type in SHARED_POLICY_TYPES if policy_type in policy_types]
+    if shared_types:
+        groups.append(Policy.policy_type.in_(shared_types))
+    if company_id is not None and PolicyType.company in policy_types:
+        groups.append(and_(Policy.policy_type == PolicyType.company, Policy.company_id == company_id))
+    return and_(Policy.is_deleted == False, Policy.is_active == True, or_(*groups)) if groups else None
+
+
+def lexical_query(text: str, limit: int, visibility):
+    """Policies and rules matching `text` in full-text search, best `ts_rank_cd` first."""
+    query = func.websearch_to_tsquery(cast("english", REGCONFIG), text)
+    hits = union_all(
+        select(
+            literal("policy").label("content_type"),
+            Policy.id.label("content_id"),
+            func.ts_rank_cd(Policy.search_vector, query).label("rank"),
+        ).filter(visibility, Policy.search_vector.op("@@")(query)),
+        select(
+            literal("rule").label("content_type"),
+            PolicyRule.id.label("content_id"),
+            func.ts_rank_cd(PolicyRule.search_vector, query).label("rank"),
+        ).join(Policy, PolicyRule.policy_id == Policy.id)
+        .filter(PolicyRule.is_deleted == False, visibility, PolicyRule.search_vector.op("@@")(query)),
+    ).subquery()
+    return (
+        select(hits.c.content_type, hits.c.content_id,
+               func.row_number().over(order_by=hits.c.rank.desc()).label("position"))
+        .order_by(hits.c.rank.desc())
+        .limit(limit)
+    )
+
+
+def hybrid_query(text: str, embedding_vector: list[float], top_k: int, branches: list, visibility):
+    vector = reranked_query(embedding_vector, settings.HYBRID_SEARCH_CANDIDATES, branches,
+                            max(settings.SEMANTIC_SEARCH_CANDIDATES, settings.HYBRID_SEARCH_CANDIDATES)).subquery()
+    vector_hits = select(
+        vector.c.id, vector.c.content_type, vector.c.content_id,
+        func.row_number().over(order_by=vector.c.distance).label("position"),
+    ).cte("vector_hits")
+    lexical_hits = lexical_query(text, settings.HYBRID_SEARCH_CANDIDATES, visibility).cte("lexical_hits")
+
+    rrf_k = settings.HYBRID_SEARCH_RRF_K
+    vector_weight, lexical_weight = settings.HYBRID_SEARCH_VECTOR_WEIGHT, settings.HYBRID_SEARCH_LEXICAL_WEIGHT
+    best_score = (vector_weight + lexical_weight) / (rrf_k + 1)
+    score = (
+        func.coalesce(literal(vector_weight) / (rrf_k + vector_hits.c.position), 0.0) +
+        func.coalesce(literal(lexical_weight) / (rrf_k + lexical_hits.c.position), 0.0)
+    )
+    distance = (1.0 - score / best_score).label("distance")
+    return (
+        select(
+            vector_hits.c.id,
+            func.coalesce(vector_hits.c.content_type, lexical_hits.c.content_type).label("content_type"),
+            func.coalesce(vector_hits.c.content_id, lexical_hits.c.content_id).label("content_id"),
+            distance,
+        )
+        .select_from(vector_hits.join(
+            lexical_hits,
+            and_(vector_hits.c.content_type == lexical_hits.c.content_type,
+                 vector_hits.c.content_id == lexical_hits.c.content_id),
+            full=True,
+        ))
+        .order_by(distance)
+        .limit(top_k)
+    )
+
+
+async def hybrid_matches(db: AsyncSession, text: str, embedding_vector: list[float], top_k: int,
+                         company_id: Optional[int] = None,
+                         policy_types: Optional[list[PolicyType]] = None) -> list[EmbeddingMatch]:
+    """
+    Vector and full-text retrieval merged by weighted reciprocal rank fusion, in one query.
+
+    Each side contributes HYBRID_SEARCH_CANDIDATES results, an item scores
+    weight / (HYBRID_SEARCH_RRF_K + rank) on every side that found it. The returned distance is
+    1 - score / best possible score, so callers can keep sorting by similarity. Lexical-only hits
+    (e.g. a rule that isn't embedded yet) have no embedding id.
+    """
+    branches = candidate_branches(company_id, policy_types)
+    visibility = visible_policies(company_id, policy_types)
+    if not branches or visibility is None:
+        return []
+
+    await tune_vector_scan(db, max(settings.SEMANTIC_SEARCH_EF_SEARCH, settings.HYBRID_SEARCH_CANDIDATES))
+    result = await db.execute(hybrid_query(text, embedding_vector, top_k, branches, visibility))
+    return [EmbeddingMatch(*row) for row in result.all()]
+
+
+def matches_values(matches: list[EmbeddingMatch]):
+    """Matches found outside the database, as a VALUES list to join against."""
+    return select(values(
+        column("id", Integer), column("content_type", String), column("content_id", Integer),
+        column("distance", Float),
+        name="found",
+    ).data([tuple(match) for match in matches]))
+
+
+def hydrated_query(matches):
+    """
+    Policies with their matching rules for the (id, content_type, content_id, distance) rows of
+    `matches`, one row per policy with the rules aggregated as JSON, most similar first.
+
+    A policy's similarity is the best of its own and its rules'. Soft-deleted rules and policies
+    are dropped here, in case their embeddings haven't been deleted yet.
+    """
+    found = matches.cte("matches")
+    similarity = (1.0 - found.c.distance).label("similarity")
+    hits = (
+        select(
+            Policy.id.label("policy_id"),
+            similarity,
+            PolicyRule.id.label("rule_id"),
+            func.json_build_object(
+                "id", PolicyRule.id,
+                "policy_id", PolicyRule.policy_id,
+                "rule_type", PolicyRule.rule_type,
+                "description", PolicyRule.description,
+                "severity", PolicyRule.severity,
+                "keywords", PolicyRule.keywords,
+                "created_at", PolicyRule.created_at,
+                "updated_at", PolicyRule.updated_at,
+                "similarity", similarity,
+            ).label("rule"),
         )
-        .order_by("distance")
+        .select_from(found)
+        .outerjoin(PolicyRule, and_(found.c.content_type == "rule", PolicyRule.id == found.c.content_id,
+                                    PolicyRule.is_deleted == False))
+        .join(Policy, and_(
+            Policy.id == case((found.c.content_type == "rule", PolicyRule.policy_id), else_=found.c.content_id),
+            Policy.is_deleted == False,
+        ))
+        .filter(or_(found.c.content_type == "policy", PolicyRule.id.is_not(None)))
+        .cte("hits")
+    )
+
+    policy_similarity = func.max(hits.c.similarity).label("similarity")
+    rules = func.coalesce(
+        func.json_agg(aggregate_order_by(hits.c.rule, hits.c.similarity.desc()))
+        .filter(hits.c.rule_id.is_not(None)),
+        cast("[]", JSON),
+    ).label("rules")
+    return (
+        select(Policy.id, Policy.name, Policy.description, Policy.policy_type, Policy.source_url,
+               Policy.is_active, Policy.company_id, Policy.created_at, Policy.updated_at,
+               policy_similarity, rules)
+        .join(hits, hits.c.policy_id == Policy.id)
+        .group_by(Policy.id)
+        .order_by(policy_similarity.desc())
+    )
+
+
+async def nearest_shadow_embeddings(db: AsyncSession, embedding_vector: list[float], top_k: int,
+                                    company_id: Optional[int] = None,
+                                    policy_types: Optional[list[PolicyType]] = None) -> list[EmbeddingMatch]:
+    """`nearest_embeddings` over the shadow model's vectors, an exact scan as they have no index yet."""
+    branches = candidate_branches(company_id, policy_types)
+    if not branches:
+        return []
+
+    distance = ShadowEmbedding.embedding.cosine_distance(cast(embedding_vector, Vector)).label("distance")
+    result = await db.execute(
+        select(Embedding.id, Embedding.content_type, Embedding.content_id, distance)
+        .join(ShadowEmbedding, and_(ShadowEmbedding.content_type == Embedding.content_type,
+                                    ShadowEmbedding.content_id == Embedding.content_id))
+        .filter(or_(*[and_(*branch) for branch in branches]))
+        .order_by(distance)
         .limit(top_k)
     )
+    return [EmbeddingMatch(*row) for row in result.all()]
+
+
+@dataclass
+class ShadowRead:
+    overlap: float
+    serving_seconds: float
+    shadow_seconds: float
+
+
+class ShadowReads:
+    """
+    Samples of semantic searches repeated in the background against the shadow embedding model.
+
+    Each sample runs the serving and the shadow top-k queries back to back and records how much of
+    the serving top-k the shadow model also returned, and how long each query took.
+    """
 
-    result = await db.execute(stmt)
-    matches = result.all()
+    def __init__(self):
+        self.model: Optional[str] = None
+        self.top_k = 0
+        self.samples: deque[ShadowRead] = deque(maxlen=settings.EMBEDDING_SHADOW_READ_SAMPLES)
+        self.tasks: set[asyncio.Task] = set()
 
-    if not matches:
+    def maybe_compare(self, text: str, embedding_vector: list[float], top_k: int, company_id: Optional[int],
+                      policy_types: Optional[list[PolicyType]]):
+        if not get_shadow_embedding_provider() or random.random() >= settings.EMBEDDING_SHADOW_READ_RATE:
+            return
+        task = asyncio.create_task(self.compare(text, embedding_vector, top_k, company_id, policy_types))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def compare(self, text: str, embedding_vector: list[float], top_k: int, company_id: Optional[int],
+                      policy_types: Optional[list[PolicyType]]):
+        provider = get_shadow_embedding_provider()
+        if not provider:
+            return
+        try:
+            shadow_vector = await embed_text_cached(text, provider)
+            async with async_session_maker() as db:
+                started = time.perf_counter()
+                serving = await nearest_embeddings(db, embedding_vector, top_k, company_id, policy_types)
+                serving_seconds = time.perf_counter() - started
+
+                started = time.perf_counter()
+                shadow = await nearest_shadow_embeddings(db, shadow_vector, top_k, company_id, policy_types)
+                shadow_seconds = time.perf_counter() - started
+        except Exception as e:
+            logger.warning(f"Shadow read failed: {str(e)}")
+            return
+
+        served = {(match.content_type, match.content_id) for match in serving}
+        found = {(match.content_type, match.content_id) for match in shadow}
+        if provider.key != self.model:
+            self.model = provider.key
+            self.samples.clear()
+        self.top_k = top_k
+        self.samples.append(ShadowRead(overlap=len(served & found) / len(served) if served else 1.0,
+                                       serving_seconds=serving_seconds, shadow_seconds=shadow_seconds))
+
+
+shadow_reads = ShadowReads()
+
+
+async def semantic_search(db: AsyncSession, text: Optional[str] = None, top_k: int = 10,
+                          embedding: Optional[list[float]] = None, company_id: Optional[int] = None,
+                          policy_types: Optional[list[PolicyType]] = None,
+                          hybrid: Optional[bool] = None) -> list[PolicyWithRulesForSemanticSearch]:
+    """
+    Policies and rules closest to `text` (or its `embedding`), retrieved and hydrated in one
+    statement: the top-k query of the configured backend is a CTE of `hydrated_query`.
+    """
+    embedding_vector = embedding if embedding is not None else await embed_text_cached(text)
+    hybrid = settings.SEMANTIC_SEARCH_HYBRID if hybrid is None else hybrid
+    branches = candidate_branches(company_id, policy_types)
+    if not branches:
         return []
+    if text:
+        shadow_reads.maybe_compare(text, embedding_vector, top_k, company_id, policy_types)
+
+    matches = None
+    if hybrid and text:
+        await tune_vector_scan(db, max(settings.SEMANTIC_SEARCH_EF_SEARCH, settings.HYBRID_SEARCH_CANDIDATES))
+        matches = hybrid_query(text, embedding_vector, top_k, branches, visible_policies(company_id, policy_types))
+    elif settings.SEMANTIC_SEARCH_BACKEND == "numpy":
+        found = await asyncio.to_thread(vector_index.search, embedding_vector, top_k, company_id, policy_types)
+        if found is None:
+            logger.warning("Vector index isn't built yet, searching with pgvector")
+        elif not found:
+            return []
+        else:
+            matches = matches_values(found)
+    if matches is None:
+        candidates = max(settings.SEMANTIC_SEARCH_CANDIDATES, top_k)
+        await tune_vector_scan(db, max(settings.SEMANTIC_SEARCH_EF_SEARCH, candidates))
+        matches = reranked_query(embedding_vector, top_k, branches, candidates)
 
-    # 2. Collect IDs and store similarities
-    rule_ids_to_fetch: Set[int] = set()
-    policy_ids_direct_hit: Set[int] = set()
-    # Store similarity keyed by (content_type, content_id)
-    similarities: Dict[tuple[str, int], float] = {}
-
-    for embedding, distance in matches:
-        similarity = 1.0 - float(distance)  # Ensure float conversion
-        key = (embedding.content_type, embedding.content_id)
-        # Store the highest similarity found for a specific item
-        similarities[key] = max(similarity, similarities.get(key, 0.0))
-
-        if embedding.content_type == "rule":
-            rule_ids_to_fetch.add(embedding.content_id)
-        elif embedding.content_type == "policy":
-            policy_ids_direct_hit.add(embedding.content_id)
-
-    # 3. Fetch all relevant rules in one query
-    rules_map: Dict[int, PolicyRule] = {}
-    policy_ids_from_rules: Set[int] = set()
-    if rule_ids_to_fetch:
-        rules_stmt = filtered_select(PolicyRule).filter(PolicyRule.id.in_(rule_ids_to_fetch))
-        rules_result = await db.execute(rules_stmt)
-        fetched_rules = rules_result.scalars().all()
-        for rule_db in fetched_rules:
-            rules_map[rule_db.id] = rule_db
-            policy_ids_from_rules.add(rule_db.policy_id)
-
-    # 4. Combine policy IDs
-    all_policy_ids_to_fetch = policy_ids_direct_hit.union(policy_ids_from_rules)
-
-    # 5. Fetch all relevant policies in one query
-    policies_map: Dict[int, Policy] = {}
-    if all_policy_ids_to_fetch:
-        policies_stmt = filtered_select(Policy).filter(Policy.id.in_(all_policy_ids_to_fetch))
-        policies_result = await db.execute(policies_stmt)
-        fetched_policies = policies_result.scalars().all()
-        for policy_db in fetched_policies:
-            policies_map[policy_db.id] = policy_db
-
-    # 6. Process matches using pre-fetched data
-    final_policies: Dict[int, PolicyWithRulesForSemanticSearch] = {}
-
-    for (content_type, content_id), similarity in similarities.items():
-
-        if content_type == "rule":
-            rule_db = rules_map.get(content_id)
-            if not rule_db:
-                logger.warning(
-                    f"Rule ID {content_id} found in embeddings but not fetched from DB (likely soft-deleted or inconsistency).")
-                continue
-
-            policy_db = policies_map.get(rule_db.policy_id)
-            if not policy_db:
-                logger.warning(
-                    f"Policy ID {rule_db.policy_id} for Rule ID {content_id} not fetched from DB (likely soft-deleted or inconsistency).")
-                continue
-
-            policy_entry = final_policies.get(policy_db.id)
-            if not policy_entry:
-                policy_entry = PolicyWithRulesForSemanticSearch(
-                    id=policy_db.id,
-                    name=policy_db.name,
-                    description=policy_db.description,
-                    policy_type=policy_db.policy_type,
-                    source_url=policy_db.source_url,
-                    is_active=policy_db.is_active,
-                    company_id=policy_db.company_id,
-                    similarity=similarity,
-                    rules=[],
-                    created_at=policy_db.created_at,
-                )
-                final_policies[policy_db.id] = policy_entry
-
-            rule_with_similarity = RuleWithSimilarity(
-                id=rule_db.id,
-                policy_id=rule_db.policy_id,
-                rule_type=rule_db.rule_type,
-                description=rule_db.description,
-                severity=rule_db.severity,
-                keywords=rule_db.keywords,
-                created_at=rule_db.created_at,
-                updated_at=rule_db.updated_at,
-                similarity=similarity,
-            )
-            policy_entry.rules.append(rule_with_similarity)
-
-            policy_entry.similarity = max(policy_entry.similarity, similarity)
-
-        elif content_type == "policy":
-            policy_db = policies_map.get(content_id)
-            if not policy_db:
-                logger.warning(
-                    f"Policy ID {content_id} found in embeddings but not fetched from DB (likely soft-deleted or inconsistency).")
-                continue
-
-            # Get or create the policy entry
-            policy_entry = final_policies.get(policy_db.id)
-            if not policy_entry:
-                policy_entry = PolicyWithRulesForSemanticSearch(
-                    id=policy_db.id,
-                    name=policy_db.name,
-                    description=policy_db.description,
-                    policy_type=policy_db.policy_type,
-                    source_url=policy_db.source_url,
-                    is_active=policy_db.is_active,
-                    company_id=policy_db.company_id,
-                    similarity=similarity,
-                    rules=[],
-                    created_at=policy_db.created_at,
-                )
-                final_policies[policy_db.id] = policy_entry
-
-            policy_entry.similarity = max(policy_entry.similarity, similarity)
-
-    return sorted(final_policies.values(), key=lambda p: p.similarity, reverse=True)
+    result = await db.execute(hydrated_query(matches))
+    return [PolicyWithRulesForSemanticSearch.model_validate(row._mapping) for row in result.all()]
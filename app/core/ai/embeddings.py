@@ -1,22 +1,20 @@
-from google.genai import types
-from google.genai.types import ContentEmbedding
+import math
+from typing import Optional
 
-from .ai_client import openai_client
-from .ai_client import gemini_client
+from .embedding_cache import embedding_cache
+from .providers import get_embedding_provider, EmbeddingProvider
 
 
-def get_embedding_openai(text):
-    response = openai_client.embeddings.create(input=text, model="text-embedding-ada-002")
-    print(response.usage)
-    return response.data[0].embedding
+def embed_text(text: str) -> list[float]:
+    return get_embedding_provider().embed(text)
 
 
-def get_embedding_gemini(text):
-    response = gemini_client.models.embed_content(
-        model="gemini-embedding-exp-03-07",
-        contents=text,
-        config=types.EmbedContentConfig(task_type="SEMANTIC_SIMILARITY")
-    )
-    vector = response.embeddings[0].values
+async def embed_text_cached(text: str, provider: Optional[EmbeddingProvider] = None) -> list[float]:
+    return await embedding_cache.embed(text, provider)
 
-    return vector
+
+def truncate_embedding(vector: list[float], dimensions: int) -> list[float]:
+    """Keep the first `dimensions` values of a Matryoshka embedding, re-normalized to unit length."""
+    prefix = [float(value) for value in vector[:dimensions]]
+    norm = math.sqrt(sum(value * value for value in prefix))
+    return [value / norm for value in prefix] if norm else prefix
@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+from loguru import logger
+
+from app.api.v1.schemas.model_stats import ModelOperation, ModelStats, ModelRouteStats
+from app.core.config import settings
+from .providers import get_llm_provider, GenerationResult
+
+
+@dataclass
+class ModelRoute:
+    operation: ModelOperation
+    primary: str
+    fallback: Optional[str]
+    max_p95_seconds: float
+
+
+class LatencyStats:
+    """Latencies and outcomes of the calls to one model over the last MODEL_STATS_WINDOW_SECONDS."""
+
+    def __init__(self):
+        self.samples: deque[tuple[float, float, bool]] = deque()
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool):
+        with self.lock:
+            self.samples.append((time.monotonic(), seconds, ok))
+
+    def snapshot(self) -> list[tuple[float, bool]]:
+        # Old samples expire, so a model that was routed around gets traffic (and a new verdict) again
+        cutoff = time.monotonic() - settings.MODEL_STATS_WINDOW_SECONDS
+        with self.lock:
+            while self.samples and self.samples[0][0] < cutoff:
+                self.samples.popleft()
+            return [(seconds, ok) for _, seconds, ok in self.samples]
+
+    def summary(self, model: str) -> ModelStats:
+        samples = self.snapshot()
+        latencies = sorted(seconds for seconds, ok in samples if ok)
+        return ModelStats(
+            model=model,
+            samples=len(samples),
+            p50_seconds=percentile(latencies, 0.5),
+            p95_seconds=percentile(latencies, 0.95),
+            error_rate=round(sum(not ok for _, ok in samples) / len(samples), 3) if samples else 0.0,
+        )
+
+
+def percentile(sorted_values: list[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))], 3)
+
+
+class ModelRouter:
+    """
+    Picks the model for each operation and records per-model latency and errors.
+
+    The primary model of an operation is used while it's healthy. Once it has enough samples and
+    its p95 latency or error rate crosses the threshold, calls go to the fallback model until the
+    samples expire. A call that fails on the primary is retried once on the fallback.
+    """
+
+    def __init__(self):
+        self.stats: dict[str, LatencyStats] = {}
+
+    def route(self, operation: ModelOperation) -> ModelRoute:
+        default_model = get_llm_provider().default_model
+        primary, fallback, max_p95_seconds = {
+            ModelOperation.analysis: (settings.ANALYSIS_MODEL, settings.ANALYSIS_FALLBACK_MODEL,
+                                      settings.ANALYSIS_MODEL_MAX_P95_SECONDS),
+            ModelOperation.chat: (settings.CHAT_MODEL, settings.CHAT_FALLBACK_MODEL,
+                                  settings.CHAT_MODEL_MAX_P95_SECONDS),
+            ModelOperation.query_rewrite: (settings.QUERY_REWRITE_MODEL, settings.QUERY_REWRITE_FALLBACK_MODEL,
+                                           settings.QUERY_REWRITE_MODEL_MAX_P95_SECONDS),
+        }[operation]
+        return ModelRoute(operation, primary or default_model, fallback, max_p95_seconds)
+
+    def model_stats(self, model: str) -> LatencyStats:
+        return self.stats.setdefault(model, LatencyStats())
+
+    def is_healthy(self, model: str, max_p95_seconds: float) -> bool:
+        stats = self.model_stats(model).summary(model)
+        if stats.samples < settings.MODEL_STATS_MIN_SAMPLES:
+            return True
+        return stats.error_rate <= settings.MODEL_MAX_ERROR_RATE and \
+            (stats.p95_seconds is None or stats.p95_seconds <= max_p95_seconds)
+
+    def choose(self, route: ModelRoute) -> str:
+        if route.fallback and not self.is_healthy(route.primary, route.max_p95_seconds):
+            return route.fallback
+        return route.primary
+
+    def call(self, model: str, **kwargs) -> GenerationResult:
+        started = time.perf_counter()
+        try:
+            result = get_llm_provider().generate(model=model, **kwargs)
+        except Exception:
+            self.model_stats(model).record(time.perf_counter() - started, ok=False)
+            raise
+        self.model_stats(model).record(time.perf_counter() - started, ok=True)
+        return result
+
+    def generate(self, operation: ModelOperation, **kwargs) -> GenerationResult:
+        """Blocking, like `LLMProvider.generate` - async callers run it with `asyncio.to_thread`."""
+        route = self.route(operation)
+        model = self.choose(route)
+        if model != route.primary:
+            logger.warning(f"Routing {operation.value} to fallback model {model}, {route.primary} is degraded")
+
+        try:
+            return self.call(model, **kwargs)
+        except Exception as e:
+            if not route.fallback or model == route.fallback:
+                raise
+            logger.warning(f"{operation.value} call to {model} failed ({e}), retrying with {route.fallback}")
+            return self.call(route.fallback, **kwargs)
+
+    def routes_summary(self) -> list[ModelRouteStats]:
+        summary = []
+        for operation in ModelOperation:
+            route = self.route(operation)
+            summary.append(ModelRouteStats(operation=operation, primary=route.primary, fallback=route.fallback,
+                                           max_p95_seconds=route.max_p95_seconds, active=self.choose(route)))
+        return summary
+
+    def models_summary(self) -> list[ModelStats]:
+        return [stats.summary(model) for model, stats in list(self.stats.items())]
+
+
+model_router = ModelRouter()
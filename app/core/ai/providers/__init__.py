@@ -0,0 +1,60 @@
+from functools import cache
+from typing import Optional
+
+from app.core.config import settings
+from .base import LLMProvider, EmbeddingProvider, GenerationResult, ProviderError, UploadedFile, EMBEDDING_DIMENSIONS
+from .gemini_provider import GeminiProvider, GeminiEmbeddingProvider
+from .openai_provider import OpenAIProvider, OpenAIEmbeddingProvider
+from .stub_provider import StubProvider, StubEmbeddingProvider
+from .local_provider import LocalEmbeddingProvider
+
+LLM_PROVIDERS: dict[str, type[LLMProvider]] = {
+    "gemini": GeminiProvider,
+    "openai": OpenAIProvider,
+    "stub": StubProvider,
+}
+
+EMBEDDING_PROVIDERS: dict[str, type[EmbeddingProvider]] = {
+    "gemini": GeminiEmbeddingProvider,
+    "openai": OpenAIEmbeddingProvider,
+    "local": LocalEmbeddingProvider,
+    "stub": StubEmbeddingProvider,
+}
+
+
+@cache
+def get_llm_provider() -> LLMProvider:
+    if settings.LLM_PROVIDER not in LLM_PROVIDERS:
+        raise ValueError(f"Unknown LLM provider {settings.LLM_PROVIDER}")
+    return LLM_PROVIDERS[settings.LLM_PROVIDER]()
+
+
+@cache
+def build_embedding_provider(provider: str, model: Optional[str] = None) -> EmbeddingProvider:
+    if provider not in EMBEDDING_PROVIDERS:
+        raise ValueError(f"Unknown embedding provider {provider}")
+    return EMBEDDING_PROVIDERS[provider](model)
+
+
+class EmbeddingModels:
+    """
+    The (provider, model) that embeds content and queries, and the shadow one being built next to it.
+
+    Starts from the settings; once the `embedding_models` table has been loaded, it follows the table,
+    so a cutover made by any process is picked up by every process.
+    """
+
+    def __init__(self):
+        self.serving: tuple[str, Optional[str]] = (settings.EMBEDDING_PROVIDER, settings.EMBEDDING_MODEL)
+        self.shadow: Optional[tuple[str, Optional[str]]] = None
+
+
+embedding_models = EmbeddingModels()
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    return build_embedding_provider(*embedding_models.serving)
+
+
+def get_shadow_embedding_provider() -> Optional[EmbeddingProvider]:
+    return build_embedding_provider(*embedding_models.shadow) if embedding_models.shadow else None
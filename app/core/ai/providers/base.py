@@ -0,0 +1,81 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+# Dimensions of the `embeddings.embedding` column - every embedding provider has to produce them
+EMBEDDING_DIMENSIONS = 3072
+
+
+class ProviderError(Exception):
+    def __init__(self, code: Any, message: str):
+        super().__init__(f"{code} - {message}")
+        self.code = code
+        self.message = message
+
+
+@dataclass
+class UploadedFile:
+    name: str
+
+
+@dataclass
+class GenerationResult:
+    text: Optional[str]
+    parsed: Optional[BaseModel] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+class LLMProvider(ABC):
+    """
+    Generation and file storage backend.
+
+    `contents` is a list of prompt parts: plain strings and file handles returned by `get_file`.
+    All methods are blocking, async callers run them with `asyncio.to_thread`.
+    """
+    name: str
+    default_model: str
+
+    @abstractmethod
+    def upload_file(self, file_path: str) -> UploadedFile:
+        """Upload a file, the returned name is stored on the document."""
+
+    @abstractmethod
+    def get_file(self, name: str) -> Any:
+        """Return a file handle usable in `contents`, raise ProviderError if it's gone."""
+
+    @abstractmethod
+    def list_files(self) -> list:
+        ...
+
+    @abstractmethod
+    def generate(self, contents: list, system_instruction: Optional[str] = None,
+                 response_schema: Optional[type[BaseModel]] = None, web_search: bool = False,
+                 model: Optional[str] = None) -> GenerationResult:
+        ...
+
+
+class EmbeddingProvider(ABC):
+    name: str
+    model: str
+    # Whether a prefix of a vector is a coarser embedding of the same text, which the `short` first pass relies on
+    matryoshka: bool = True
+
+    def __init__(self, model: Optional[str] = None):
+        if model:
+            self.model = model
+
+    @property
+    def key(self) -> str:
+        """Identifies the vector space, embeddings of different keys can't be compared."""
+        return f"{self.name}:{self.model}"
+
+    @abstractmethod
+    def embed(self, text: str) -> list[float]:
+        ...
+
+    def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        """Embed several texts, providers with a multi-input API do it in one request."""
+        return [self.embed(text) for text in texts]
@@ -0,0 +1,79 @@
+from typing import Optional
+
+from google.genai import types
+from google.genai.errors import APIError
+from pydantic import BaseModel
+
+from app.core.ai.ai_client import get_gemini_client
+from app.core.config import settings
+from .base import LLMProvider, EmbeddingProvider, GenerationResult, ProviderError, UploadedFile
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    @property
+    def default_model(self) -> str:
+        return settings.GEMINI_MODEL
+
+    def upload_file(self, file_path: str) -> UploadedFile:
+        return UploadedFile(name=get_gemini_client().files.upload(file=file_path).name)
+
+    def get_file(self, name: str):
+        try:
+            return get_gemini_client().files.get(name=name)
+        except APIError as e:
+            raise ProviderError(e.code, e.message) from e
+
+    def list_files(self) -> list:
+        return list(get_gemini_client().files.list())
+
+    def generate(self, contents: list, system_instruction: Optional[str] = None,
+                 response_schema: Optional[type[BaseModel]] = None, web_search: bool = False,
+                 model: Optional[str] = None) -> GenerationResult:
+        config = types.GenerateContentConfig(
+            system_instruction=system_instruction,
+            response_modalities=["TEXT"],
+        )
+        if response_schema:
+            config.response_mime_type = "application/json"
+            config.response_schema = response_schema
+        if web_search:
+            config.tools = [types.Tool(google_search=types.GoogleSearch())]
+
+        response = get_gemini_client().models.generate_content(
+            model=model or self.default_model,
+            contents=contents,
+            config=config
+        )
+
+        metadata = response.usage_metadata
+        return GenerationResult(
+            text=response.text,
+            parsed=response.parsed if response_schema else None,
+            input_tokens=(metadata.prompt_token_count or 0) if metadata else 0,
+            # Thinking tokens are billed (and generated) as output
+            output_tokens=((metadata.candidates_token_count or 0) + (metadata.thoughts_token_count or 0))
+            if metadata else 0,
+        )
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    name = "gemini"
+    model = "gemini-embedding-exp-03-07"
+
+    def embed(self, text: str) -> list[float]:
+        response = get_gemini_client().models.embed_content(
+            model=self.model,
+            contents=text,
+            config=types.EmbedContentConfig(task_type="SEMANTIC_SIMILARITY")
+        )
+        return response.embeddings[0].values
+
+    def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        response = get_gemini_client().models.embed_content(
+            model=self.model,
+            contents=texts,
+            config=types.EmbedContentConfig(task_type="SEMANTIC_SIMILARITY")
+        )
+        return [embedding.values for embedding in response.embeddings]
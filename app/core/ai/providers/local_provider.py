@@ -0,0 +1,74 @@
+import hashlib
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+from .base import EmbeddingProvider, EMBEDDING_DIMENSIONS
+
+WORD_PATTERN = re.compile(r"\w+")
+STOP_WORDS = frozenset(
+    "a an and any are as at be been by for from has have if in into is it its no not of on or such that the "
+    "their then there these they this to was were will with".split()
+)
+
+# Relative weight of each kind of feature
+WORD_WEIGHT = 1.0
+BIGRAM_WEIGHT = 0.7
+TRIGRAM_WEIGHT = 0.3
+
+
+@lru_cache(maxsize=2 ** 18)
+def feature_coordinate(feature: str) -> tuple[int, float]:
+    """The coordinate a feature is hashed to, and its sign so that collisions cancel out on average."""
+    value = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+    return value % EMBEDDING_DIMENSIONS, 1.0 if value & (1 << 63) else -1.0
+
+
+def text_features(text: str) -> dict[str, float]:
+    """Weighted features of `text`, with sublinear term frequency: 1 + log(count)."""
+    words = [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOP_WORDS]
+    counts, weights = Counter(), {}
+    for word in words:
+        counts[f"w:{word}"] += 1
+        weights[f"w:{word}"] = WORD_WEIGHT
+        padded = f"#{word}#"
+        for i in range(len(padded) - 2):
+            counts[f"c:{padded[i:i + 3]}"] += 1
+            weights[f"c:{padded[i:i + 3]}"] = TRIGRAM_WEIGHT
+    for first, second in zip(words, words[1:]):
+        counts[f"b:{first} {second}"] += 1
+        weights[f"b:{first} {second}"] = BIGRAM_WEIGHT
+    return {feature: weights[feature] * (1.0 + math.log(count)) for feature, count in counts.items()}
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    Feature hashing on the CPU: words, word pairs and character trigrams with sublinear term
+    frequencies, each hashed to a signed coordinate. No network calls and no model files, so it
+    suits first-pass retrieval and deployments that can't call out - but it matches wording
+    (including word forms, through the trigrams), not meaning.
+    """
+    name = "local"
+    model = "hashed-ngrams-v1"
+    # A feature lands anywhere in the vector, the first coordinates hold only a few of them
+    matryoshka = False
+
+    def embed(self, text: str) -> list[float]:
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        vectors = np.zeros((len(texts), EMBEDDING_DIMENSIONS), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = text_features(text)
+            coordinates = [feature_coordinate(feature) for feature in features]
+            np.add.at(vectors[row], [index for index, _ in coordinates],
+                      [sign * weight for (_, sign), weight in zip(coordinates, features.values())])
+
+        norms = np.linalg.norm(vectors, axis=1)
+        # Texts without features still need a unit vector, cosine distance is undefined for zeros
+        vectors[norms == 0, 0] = 1.0
+        norms[norms == 0] = 1.0
+        return (vectors / norms[:, None]).tolist()
@@ -0,0 +1,76 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.core.ai.ai_client import get_openai_client
+from app.core.config import settings
+from .base import LLMProvider, EmbeddingProvider, GenerationResult, ProviderError, UploadedFile, \
+    EMBEDDING_DIMENSIONS
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    @property
+    def default_model(self) -> str:
+        return settings.OPENAI_MODEL
+
+    def upload_file(self, file_path: str) -> UploadedFile:
+        with open(file_path, "rb") as file:
+            uploaded = get_openai_client().files.create(file=file, purpose="user_data")
+        # Documents store the provider file name, for OpenAI that's the file id
+        return UploadedFile(name=uploaded.id)
+
+    def get_file(self, name: str):
+        from openai import APIStatusError
+
+        try:
+            return get_openai_client().files.retrieve(name)
+        except APIStatusError as e:
+            raise ProviderError(e.status_code, e.message) from e
+
+    def list_files(self) -> list:
+        return list(get_openai_client().files.list())
+
+    def generate(self, contents: list, system_instruction: Optional[str] = None,
+                 response_schema: Optional[type[BaseModel]] = None, web_search: bool = False,
+                 model: Optional[str] = None) -> GenerationResult:
+        content = [{"type": "input_text", "text": part} if isinstance(part, str)
+                   else {"type": "input_file", "file_id": part.id}
+                   for part in contents]
+        request = dict(
+            model=model or self.default_model,
+            instructions=system_instruction,
+            input=[{"role": "user", "content": content}],
+            tools=[{"type": "web_search_preview"}] if web_search else [],
+        )
+
+        client = get_openai_client()
+        if response_schema:
+            response = client.responses.parse(**request, text_format=response_schema)
+            parsed = response.output_parsed
+        else:
+            response = client.responses.create(**request)
+            parsed = None
+
+        return GenerationResult(
+            text=response.output_text,
+            parsed=parsed,
+            input_tokens=response.usage.input_tokens if response.usage else 0,
+            output_tokens=response.usage.output_tokens if response.usage else 0,
+        )
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    name = "openai"
+    model = "text-embedding-3-large"
+
+    def embed(self, text: str) -> list[float]:
+        response = get_openai_client().embeddings.create(input=text, model=self.model,
+                                                         dimensions=EMBEDDING_DIMENSIONS)
+        return response.data[0].embedding
+
+    def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        response = get_openai_client().embeddings.create(input=texts, model=self.model,
+                                                         dimensions=EMBEDDING_DIMENSIONS)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
@@ -0,0 +1,143 @@
+import hashlib
+import math
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.api.v1.schemas.analysis import AnalysisResult, Conflict, Risk, MissingClause, Suggestion
+from app.core.ai.tokens import estimate_tokens
+from app.core.config import settings
+from .base import LLMProvider, EmbeddingProvider, GenerationResult, ProviderError, UploadedFile, EMBEDDING_DIMENSIONS
+
+RULE_PATTERN = re.compile(r"Policy Name: (?P<policy>.*)"
+                          r"|  - Rule Type: (?:RuleType\.)?(?P<type>\w+)\n  - Severity: .*\n  - Description: (?P<rule>.*)")
+
+
+@dataclass
+class StubFile:
+    name: str
+    text: str
+
+
+def digest(*parts: str) -> int:
+    return int.from_bytes(hashlib.sha256("\x00".join(parts).encode()).digest()[:8], "big")
+
+
+def simulate_latency(output_tokens: int):
+    delay = settings.STUB_LATENCY_SECONDS
+    if settings.STUB_TOKENS_PER_SECOND:
+        delay += output_tokens / settings.STUB_TOKENS_PER_SECOND
+    if delay:
+        time.sleep(delay)
+
+
+def stub_analysis(document_text: str, prompt: str) -> AnalysisResult:
+    """Flag a stable, pseudo-random third of the rules in the prompt for the given document."""
+    document_key = hashlib.sha256(document_text.encode()).hexdigest()
+    conflicts, risks, missing_clauses = [], [], []
+    policy_name = ""
+
+    for match in RULE_PATTERN.finditer(prompt):
+        if match["policy"] is not None:
+            policy_name = match["policy"]
+            continue
+        rule = match["rule"]
+        if digest(document_key, rule) % 3:
+            continue
+        if match["type"] == "conflict":
+            conflicts.append(Conflict(policy_name=policy_name, conflict_detail=f"The document contradicts: {rule}"))
+        elif match["type"] == "risk":
+            risks.append(Risk(risk_type=policy_name, detail=f"The document is exposed to: {rule}"))
+        else:
+            missing_clauses.append(MissingClause(clause_name=rule[:60], suggestion=f"Add a clause covering: {rule}"))
+
+    title = next((line.strip() for line in document_text.splitlines() if line.strip()), "Untitled document")
+    return AnalysisResult(
+        document_id=0,
+        title=title[:80],
+        company_name="Stub Company",
+        conflicts=conflicts,
+        risks=risks,
+        missing_clauses=missing_clauses,
+        suggestions=[Suggestion(title=f"Add {clause.clause_name}", details=clause.suggestion)
+                     for clause in missing_clauses],
+        payment_terms=[],
+    )
+
+
+class StubProvider(LLMProvider):
+    """
+    Deterministic offline provider for load tests and benchmarks.
+
+    Files are kept in memory, answers are derived from hashes of the prompt, and every call
+    sleeps STUB_LATENCY_SECONDS plus the output tokens at STUB_TOKENS_PER_SECOND.
+    """
+    name = "stub"
+    default_model = "stub"
+
+    def __init__(self):
+        self.files: dict[str, StubFile] = {}
+
+    def upload_file(self, file_path: str) -> UploadedFile:
+        with open(file_path, encoding="utf-8", errors="ignore") as file:
+            text = file.read()
+        name = f"files/stub-{hashlib.sha256(text.encode()).hexdigest()[:16]}"
+        self.files[name] = StubFile(name=name, text=text)
+        return UploadedFile(name=name)
+
+    def get_file(self, name: str) -> StubFile:
+        if name not in self.files:
+            raise ProviderError(404, f"File {name} not found")
+        return self.files[name]
+
+    def list_files(self) -> list:
+        return list(self.files.values())
+
+    def generate(self, contents: list, system_instruction: Optional[str] = None,
+                 response_schema: Optional[type[BaseModel]] = None, web_search: bool = False,
+                 model: Optional[str] = None) -> GenerationResult:
+        document_text = "\n".join(part.text for part in contents if isinstance(part, StubFile))
+        prompt_text = "\n".join(part for part in contents if isinstance(part, str))
+
+        if response_schema is AnalysisResult:
+            parsed = stub_analysis(document_text or prompt_text, f"{system_instruction or ''}\n{prompt_text}")
+            text = parsed.model_dump_json()
+        elif response_schema is None:
+            parsed = None
+            question = contents[-1] if contents and isinstance(contents[-1], str) else prompt_text
+            text = f"Stub answer ({digest(document_text, question) % 1000:03d}) to: {question.strip()[:200]}"
+        else:
+            raise ValueError(f"Stub provider can't generate {response_schema.__name__}")
+
+        output_tokens = estimate_tokens(text)
+        simulate_latency(output_tokens)
+        return GenerationResult(
+            text=text,
+            parsed=parsed,
+            input_tokens=estimate_tokens(system_instruction) + estimate_tokens(prompt_text)
+                         + estimate_tokens(document_text),
+            output_tokens=output_tokens,
+        )
+
+
+class StubEmbeddingProvider(EmbeddingProvider):
+    """Hashed bag of words - texts sharing words get similar vectors, which keeps vector search meaningful."""
+    name = "stub"
+    model = "hashed-bag-of-words"
+    matryoshka = False
+
+    def embed(self, text: str) -> list[float]:
+        vector = [0.0] * EMBEDDING_DIMENSIONS
+        for word in re.findall(r"\w+", text.lower()):
+            word_digest = digest(word)
+            vector[word_digest % EMBEDDING_DIMENSIONS] += 1.0 if word_digest & (1 << 63) else -1.0
+
+        norm = math.sqrt(sum(value * value for value in vector))
+        if not norm:
+            vector[0], norm = 1.0, 1.0
+
+        simulate_latency(0)
+        return [value / norm for value in vector]
@@ -0,0 +1,45 @@
+from app.api.v1.schemas.policy import PolicyWithRules
+from app.core.config import settings
+from app.utils.formatters import format_policies_and_rules_into_text
+from .tokens import estimate_tokens
+
+
+def policy_tokens(policy: PolicyWithRules) -> int:
+    return estimate_tokens(format_policies_and_rules_into_text([policy]))
+
+
+def split_policy(policy: PolicyWithRules, max_tokens: int) -> list[PolicyWithRules]:
+    # A single policy can be larger than a shard - split its rules, repeating the policy header in every part
+    header_tokens = policy_tokens(policy.model_copy(update={"rules": []}))
+    parts, rules, tokens = [], [], header_tokens
+    for rule in policy.rules:
+        rule_tokens = policy_tokens(policy.model_copy(update={"rules": [rule]})) - header_tokens
+        if rules and tokens + rule_tokens > max_tokens:
+            parts.append(policy.model_copy(update={"rules": rules}))
+            rules, tokens = [], header_tokens
+        rules.append(rule)
+        tokens += rule_tokens
+    parts.append(policy.model_copy(update={"rules": rules}))
+    return parts
+
+
+def shard_policies_and_rules(policies_and_rules: list[PolicyWithRules], max_tokens: int) -> list[list[PolicyWithRules]]:
+    shards, shard, shard_tokens = [], [], 0
+    for policy in policies_and_rules:
+        parts = split_policy(policy, max_tokens) if policy_tokens(policy) > max_tokens else [policy]
+        for part in parts:
+            tokens = policy_tokens(part)
+            if shard and shard_tokens + tokens > max_tokens:
+                shards.append(shard)
+                shard, shard_tokens = [], 0
+            shard.append(part)
+            shard_tokens += tokens
+    if shard:
+        shards.append(shard)
+    return shards
+
+
+def render_rule_shards(policies_and_rules: list[PolicyWithRules]) -> list[str]:
+    """Render the ruleset as one prompt text per shard, each at most ANALYSIS_RULESET_SHARD_TOKENS long."""
+    shards = shard_policies_and_rules(policies_and_rules, settings.ANALYSIS_RULESET_SHARD_TOKENS)
+    return [format_policies_and_rules_into_text(shard) for shard in shards] or [""]
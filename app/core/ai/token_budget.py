@@ -0,0 +1,40 @@
+from loguru import logger
+
+from app.api.v1.schemas.policy import PolicyWithRulesForSemanticSearch
+from app.utils.formatters import format_policies_and_rules_into_text, format_messages_history
+from .tokens import estimate_tokens
+
+
+def fit_rules_to_budget(policies: list[PolicyWithRulesForSemanticSearch],
+                        max_tokens: int) -> list[PolicyWithRulesForSemanticSearch]:
+    """Drop the lowest-similarity rules (and then policies left without rules) until the rules text fits."""
+    policies = [policy.model_copy(update={"rules": sorted(policy.rules or [], key=lambda r: r.similarity, reverse=True)})
+                for policy in policies]
+
+    while policies and estimate_tokens(format_policies_and_rules_into_text(policies)) > max_tokens:
+        lowest = min(range(len(policies)),
+                     key=lambda i: policies[i].rules[-1].similarity if policies[i].rules else policies[i].similarity)
+        if policies[lowest].rules:
+            policies[lowest].rules.pop()
+        else:
+            policies.pop(lowest)
+
+    return policies
+
+
+def fit_history_to_budget(messages: list, max_tokens: int) -> list:
+    """Keep the most recent messages that fit into the budget, oldest first."""
+    kept, tokens = [], 0
+    for message in sorted(messages, key=lambda m: m.created_at, reverse=True):
+        tokens += estimate_tokens(format_messages_history([message]))
+        if tokens > max_tokens:
+            break
+        kept.append(message)
+    return kept[::-1]
+
+
+def log_prompt_sections(operation: str, **sections: str | None) -> int:
+    counts = {name: estimate_tokens(text) for name, text in sections.items()}
+    total = sum(counts.values())
+    logger.debug(f"{operation} prompt: ~{total} tokens ({', '.join(f'{k}={v}' for k, v in counts.items())})")
+    return total
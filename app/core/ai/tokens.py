@@ -0,0 +1,24 @@
+from dataclasses import dataclass
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str | None) -> int:
+    # Gemini tokenizes English legal text at roughly four characters per token, which is
+    # accurate enough to decide how to split work without a count_tokens round trip
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+@dataclass
+class TokenUsage:
+    """Accumulates the tokens reported by the provider for one or more calls."""
+    input_tokens: int = 0
+    output_tokens: int = 0
+    calls: int = 0
+
+    def add(self, result):
+        self.input_tokens += result.input_tokens
+        self.output_tokens += result.output_tokens
+        self.calls += 1
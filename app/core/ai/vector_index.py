@@ -0,0 +1,341 @@
+import asyncio
+import os
+import threading
+from typing import NamedTuple, Optional
+
+import asyncpg
+import numpy as np
+from loguru import logger
+from sqlalchemy import select
+
+from app.api.v1.schemas.policy import PolicyType
+from app.core.ai.providers import EMBEDDING_DIMENSIONS
+from app.core.config import settings
+from app.db.models import Embedding
+from app.db.session import async_session_maker
+
+CHANGES_CHANNEL = "embeddings_changed"
+CONTENT_TYPES = ["policy", "rule"]
+POLICY_TYPES = list(PolicyType)
+SHARED_POLICY_TYPES = [PolicyType.industry, PolicyType.standard]
+NO_COMPANY = -1
+
+ROW_DTYPE = np.dtype([
+    ("embedding_id", "<i8"),
+    ("content_type", "i1"),
+    ("content_id", "<i8"),
+    ("company_id", "<i8"),
+    ("policy_type", "i1"),
+    ("live", "?"),
+])
+
+
+class EmbeddingMatch(NamedTuple):
+    embedding_id: int
+    content_type: str
+    content_id: int
+    distance: float
+
+
+class Mapping(NamedTuple):
+    generation: int
+    vectors: np.ndarray
+    rows: np.ndarray
+
+
+def normalize(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class MappedVectorIndex:
+    """
+    Embeddings as a float16 matrix in memory-mapped files, searched with batched dot products.
+
+    The directory holds `state.i8` ([generation, row count]) and, per generation, a vectors file
+    and a rows file with each row's embedding id and search scope. Every process maps the files
+    shared, so one writer's changes are visible to all readers without copying. Rows are only
+    appended or overwritten in place; a rebuild (or growing past the capacity) writes a new
+    generation, which readers pick up on their next search.
+
+    Searches run concurrently in threads, so a generation's vectors and rows are published together
+    as one `Mapping` and each search keeps the one it started with.
+    """
+
+    def __init__(self, path: str, dimensions: int):
+        self.path = path
+        self.dimensions = dimensions
+        self.state: Optional[np.memmap] = None
+        self.mapping: Optional[Mapping] = None
+        self.lock = threading.Lock()
+        self.slots: dict[int, int] = {}
+        self.count = 0
+        self.rebuilding = False
+
+    def file(self, name: str, generation: Optional[int] = None) -> str:
+        return os.path.join(self.path, name if generation is None else f"{name}-{generation}")
+
+    @property
+    def generation(self) -> int:
+        return self.mapping.generation if self.mapping else -1
+
+    def map_generation(self, generation: int, mode: str) -> Mapping:
+        vectors = np.memmap(self.file("vectors", generation), dtype=np.float16, mode=mode)
+        rows = np.memmap(self.file("rows", generation), dtype=ROW_DTYPE, mode=mode)
+        with self.lock:
+            self.mapping = Mapping(generation, vectors.reshape(-1, self.dimensions), rows)
+            return self.mapping
+
+    def refresh(self) -> Optional[Mapping]:
+        """Map the latest generation for reading, returns None while no index has been built."""
+        with self.lock:
+            if self.state is None:
+                if not os.path.exists(self.file("state.i8")):
+                    return None
+                self.state = np.memmap(self.file("state.i8"), dtype=np.int64, mode="r")
+            generation, mapping = int(self.state[0]), self.mapping
+
+        if mapping is None or mapping.generation != generation:
+            mapping = self.map_generation(generation, "r")
+        return mapping
+
+    def search(self, query, top_k: int, company_id: Optional[int] = None,
+               policy_types: Optional[list[PolicyType]] = None) -> Optional[list[EmbeddingMatch]]:
+        mapping = self.refresh()
+        if mapping is None:
+            return None
+        vectors = mapping.vectors
+
+        # A generation switch can land between reading the two fields, never read past our mapping
+        rows = mapping.rows[:min(int(self.state[1]), len(mapping.rows))]
+        policy_types = policy_types or POLICY_TYPES
+        shared_codes = [POLICY_TYPES.index(policy_type) for policy_type in SHARED_POLICY_TYPES
+                        if policy_type in policy_types]
+        visible = np.isin(rows["policy_type"], shared_codes)
+        if company_id is not None and PolicyType.company in policy_types:
+            visible |= (rows["policy_type"] == POLICY_TYPES.index(PolicyType.company)) & \
+                       (rows["company_id"] == company_id)
+        candidates = np.flatnonzero(visible & rows["live"])
+        if not len(candidates):
+            return []
+
+        query = normalize(query)
+        best_slots = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, len(candidates), settings.VECTOR_INDEX_BATCH_ROWS):
+            slots = candidates[start:start + settings.VECTOR_INDEX_BATCH_ROWS]
+            scores = vectors[slots].astype(np.float32) @ query
+            best_slots = np.concatenate([best_slots, slots])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > top_k:
+                keep = np.argpartition(-best_scores, top_k)[:top_k]
+                best_slots, best_scores = best_slots[keep], best_scores[keep]
+
+        order = np.argsort(-best_scores)
+        return [
+            EmbeddingMatch(
+                embedding_id=int(rows[slot]["embedding_id"]),
+                content_type=CONTENT_TYPES[rows[slot]["content_type"]],
+                content_id=int(rows[slot]["content_id"]),
+                distance=float(1.0 - score),
+            )
+            for slot, score in zip(best_slots[order], best_scores[order])
+        ]
+
+    # Writer side, only one process at a time may use these
+
+    def latest_generation(self) -> int:
+        if self.state is None and os.path.exists(self.file("state.i8")):
+            self.state = np.memmap(self.file("state.i8"), dtype=np.int64, mode="r")
+        return max(self.generation, int(self.state[0]) if self.state is not None else -1)
+
+    def create_generation(self, capacity: int) -> int:
+        os.makedirs(self.path, exist_ok=True)
+        generation = self.latest_generation() + 1
+        np.memmap(self.file("vectors", generation), dtype=np.float16, mode="w+",
+                  shape=(capacity, self.dimensions)).flush()
+        np.memmap(self.file("rows", generation), dtype=ROW_DTYPE, mode="w+", shape=(capacity,)).flush()
+        return generation
+
+    def begin_rebuild(self):
+        self.slots = {}
+        self.count = 0
+        self.rebuilding = True
+        self.map_generation(self.create_generation(settings.VECTOR_INDEX_INITIAL_CAPACITY), "r+")
+
+    def finish_rebuild(self):
+        self.rebuilding = False
+        self.publish()
+
+    def publish(self):
+        generation, vectors, rows = self.mapping
+        vectors.flush()
+        rows.flush()
+        if self.state is None or self.state.mode != "r+":
+            if not os.path.exists(self.file("state.i8")):
+                np.memmap(self.file("state.i8"), dtype=np.int64, mode="w+", shape=(2,)).flush()
+            self.state = np.memmap(self.file("state.i8"), dtype=np.int64, mode="r+")
+        self.state[0] = generation
+        self.state[1] = self.count
+
+        # Readers that still map an older generation keep their mapping after the unlink
+        current = {self.file(name, generation) for name in ("vectors", "rows")}
+        for name in os.listdir(self.path):
+            path = self.file(name)
+            if name.startswith(("vectors-", "rows-")) and path not in current:
+                os.remove(path)
+
+    def grow(self):
+        _, vectors, rows = self.mapping
+        grown = self.map_generation(self.create_generation(len(rows) * 2), "r+")
+        grown.vectors[:self.count] = vectors[:self.count]
+        grown.rows[:self.count] = rows[:self.count]
+        if not self.rebuilding:
+            self.publish()
+
+    def write(self, embeddings):
+        """
+        Insert or overwrite rows, each with the `Embedding` id, content, scope and vector fields.
+        Rows that are inactive stay in place with `live` unset.
+        """
+        for embedding in embeddings:
+            slot = self.slots.get(embedding.id)
+            if slot is None:
+                if self.count == len(self.mapping.rows):
+                    self.grow()
+                slot = self.count
+                self.slots[embedding.id] = slot
+                self.count += 1
+
+            _, vectors, rows = self.mapping
+            vectors[slot] = normalize(embedding.embedding).astype(np.float16)
+            rows[slot] = (
+                embedding.id,
+                CONTENT_TYPES.index(embedding.content_type),
+                embedding.content_id,
+                NO_COMPANY if embedding.company_id is None else embedding.company_id,
+                POLICY_TYPES.index(PolicyType(embedding.policy_type)) if embedding.policy_type else -1,
+                bool(embedding.is_active),
+            )
+
+        # The count goes last, so readers never see a slot before its data
+        if not self.rebuilding:
+            self.state[1] = self.count
+
+    def remove(self, embedding_ids):
+        for embedding_id in embedding_ids:
+            slot = self.slots.get(embedding_id)
+            if slot is not None:
+                self.mapping.rows[slot]["live"] = False
+
+    @property
+    def dead_rows(self) -> int:
+        return self.count - int(np.count_nonzero(self.mapping.rows[:self.count]["live"]))
+
+
+EMBEDDING_COLUMNS = (
+    Embedding.id, Embedding.content_type, Embedding.content_id, Embedding.company_id,
+    Embedding.policy_type, Embedding.is_active, Embedding.embedding,
+)
+
+
+async def rebuild_index(store: MappedVectorIndex) -> int:
+    """Write every searchable embedding in the database into a new generation of `store`."""
+    store.begin_rebuild()
+    async with async_session_maker() as db:
+        result = await db.stream(
+            select(*EMBEDDING_COLUMNS)
+            .filter(Embedding.is_active == True)
+            .order_by(Embedding.id)
+            .execution_options(yield_per=settings.VECTOR_INDEX_BATCH_ROWS)
+        )
+        async for partition in result.partitions():
+            await asyncio.to_thread(store.write, partition)
+    store.finish_rebuild()
+    return store.count
+
+
+async def apply_changes(store: MappedVectorIndex, embedding_ids: set[int]):
+    async with async_session_maker() as db:
+        result = await db.execute(select(*EMBEDDING_COLUMNS).filter(Embedding.id.in_(embedding_ids)))
+        embeddings = result.all()
+    await asyncio.to_thread(store.write, embeddings)
+    store.remove(embedding_ids - {embedding.id for embedding in embeddings})
+
+
+class VectorIndex:
+    """
+    In-process alternative to pgvector for `semantic_search` (SEMANTIC_SEARCH_BACKEND=numpy).
+
+    Every process searches the shared memory-mapped index. One of them, elected with a Postgres
+    advisory lock, maintains it: it rebuilds the index on election, then applies the embedding ids
+    that the `embeddings` trigger sends on CHANGES_CHANNEL. If that process dies, its lock is
+    released with its connection and another process takes over.
+    """
+
+    def __init__(self, path: str, dimensions: int):
+        self.reader = MappedVectorIndex(path, dimensions)
+        self.writer = MappedVectorIndex(path, dimensions)
+        self.changes: set[int] = set()
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self.task = asyncio.create_task(self.maintain())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    def search(self, query, top_k: int, company_id: Optional[int] = None,
+               policy_types: Optional[list[PolicyType]] = None) -> Optional[list[EmbeddingMatch]]:
+        """Returns None while the index hasn't been built, callers fall back to pgvector."""
+        return self.reader.search(query, top_k, company_id, policy_types)
+
+    def on_change(self, connection, pid, channel, payload):
+        self.changes.add(int(payload))
+        self.changed.set()
+
+    async def maintain(self):
+        dsn = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
+        while True:
+            try:
+                connection = await asyncpg.connect(dsn)
+                try:
+                    if await connection.fetchval("SELECT pg_try_advisory_lock(hashtext('vector_index'))"):
+                        await self.sync(connection)
+                finally:
+                    await connection.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Vector index maintenance failed: {e}")
+            await asyncio.sleep(settings.VECTOR_INDEX_SYNC_INTERVAL_SECONDS)
+
+    async def sync(self, connection):
+        # Listen before the rebuild, so changes committed while it runs are applied afterwards
+        await connection.add_listener(CHANGES_CHANNEL, self.on_change)
+        self.changes.clear()
+        logger.info(f"Built vector index with {await rebuild_index(self.writer)} embeddings")
+
+        while True:
+            try:
+                await asyncio.wait_for(self.changed.wait(), timeout=settings.VECTOR_INDEX_SYNC_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                # Fails if the connection (and with it the lock and our notifications) was lost
+                await connection.fetchval("SELECT 1")
+                continue
+
+            self.changed.clear()
+            embedding_ids, self.changes = self.changes, set()
+            await apply_changes(self.writer, embedding_ids)
+
+            if self.writer.dead_rows > self.writer.count // 2:
+                self.changes.clear()
+                logger.info(f"Compacted vector index to {await rebuild_index(self.writer)} embeddings")
+
+
+vector_index = VectorIndex(settings.VECTOR_INDEX_PATH, EMBEDDING_DIMENSIONS)
@@ -21,9 +21,73 @@ class Settings(BaseSettings, env_file=os.getenv("ENV_FILE", ".env"), case_sensit
     SECRET_KEY: str
     APP_ENV: str
 
-    OPENAI_API_KEY: str
-    GEMINI_API_KEY: str
+    OPENAI_API_KEY: Optional[str] = None
+    GEMINI_API_KEY: Optional[str] = None
     GEMINI_MODEL: str = "gemini-2.5-flash-preview-04-17"
+    OPENAI_MODEL: str = "gpt-4.1-mini"
+    LLM_PROVIDER: str = "gemini"
+    # gemini, openai, local (CPU feature hashing, no network) or stub
+    EMBEDDING_PROVIDER: str = "gemini"
+    # None means the provider's default model; after a cutover the `embedding_models` table decides
+    EMBEDDING_MODEL: Optional[str] = None
+    STUB_LATENCY_SECONDS: float = 0.0
+    STUB_TOKENS_PER_SECOND: float = 0.0
+
+    # Models per operation, None means the provider's default model
+    ANALYSIS_MODEL: Optional[str] = None
+    ANALYSIS_FALLBACK_MODEL: Optional[str] = None
+    ANALYSIS_MODEL_MAX_P95_SECONDS: float = 180.0
+    CHAT_MODEL: Optional[str] = None
+    CHAT_FALLBACK_MODEL: Optional[str] = None
+    CHAT_MODEL_MAX_P95_SECONDS: float = 30.0
+    CHAT_QUERY_REWRITE: bool = False
+    QUERY_REWRITE_MODEL: Optional[str] = None
+    QUERY_REWRITE_FALLBACK_MODEL: Optional[str] = None
+    QUERY_REWRITE_MODEL_MAX_P95_SECONDS: float = 5.0
+    MODEL_MAX_ERROR_RATE: float = 0.25
+    MODEL_STATS_WINDOW_SECONDS: int = 300
+    MODEL_STATS_MIN_SAMPLES: int = 5
+
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    ANSWER_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 2048
+    EMBEDDING_CACHE_MAX_ROWS: int = 100000
+    EMBEDDING_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+    EMBEDDING_CACHE_PRUNE_EVERY: int = 500
+    EMBEDDING_BATCH_SIZE: int = 100
+    EMBEDDING_WORKERS: int = 1
+    EMBEDDING_DEBOUNCE_SECONDS: float = 2.0
+    EMBEDDING_OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    EMBEDDING_OUTBOX_LEASE_SECONDS: int = 300
+    EMBEDDING_OUTBOX_MAX_ATTEMPTS: int = 5
+    EMBEDDING_MODEL_REFRESH_SECONDS: float = 10.0
+    EMBEDDING_COMPACTION_INTERVAL_SECONDS: float = 24 * 3600
+    # Semantic searches timed before and after a compaction
+    EMBEDDING_COMPACTION_PROBE_QUERIES: int = 20
+    # Share of semantic searches repeated against the shadow model to compare the two
+    EMBEDDING_SHADOW_READ_RATE: float = 0.1
+    EMBEDDING_SHADOW_READ_SAMPLES: int = 1000
+    # Truncated (Matryoshka) embeddings for the first pass, changing the size needs a new migration
+    EMBEDDING_SHORT_DIMENSIONS: int = 256
+    # First pass over "short" embeddings or the "halfvec" index, candidates are re-ranked on the full vectors.
+    # Providers whose vectors can't be truncated (local, stub) always use "halfvec"
+    SEMANTIC_SEARCH_FIRST_PASS: str = "short"
+    SEMANTIC_SEARCH_CANDIDATES: int = 50
+    SEMANTIC_SEARCH_EF_SEARCH: int = 100
+    # "pgvector" or "numpy" for the in-process memory-mapped index
+    SEMANTIC_SEARCH_BACKEND: str = "pgvector"
+    # Hybrid search fuses vector and full-text results by weighted reciprocal rank
+    SEMANTIC_SEARCH_HYBRID: bool = False
+    HYBRID_SEARCH_CANDIDATES: int = 50
+    HYBRID_SEARCH_VECTOR_WEIGHT: float = 1.0
+    HYBRID_SEARCH_LEXICAL_WEIGHT: float = 1.0
+    HYBRID_SEARCH_RRF_K: int = 60
+    RULE_SEARCH_PAGE_SIZE: int = 20
+    RULE_SEARCH_MAX_PAGE_SIZE: int = 100
+    VECTOR_INDEX_BATCH_ROWS: int = 4096
+    VECTOR_INDEX_INITIAL_CAPACITY: int = 1024
+    VECTOR_INDEX_SYNC_INTERVAL_SECONDS: float = 5.0
     SENTRY_DSN_URL: Optional[str] = None
     INITIAL_ANALYSIS_PROMPT: str
 
@@ -40,6 +104,30 @@ class Settings(BaseSettings, env_file=os.getenv("ENV_FILE", ".env"), case_sensit
     UPLOAD_DIR: str = "uploads"
     DOCUMENT_STORAGE_PATH: str = os.path.join(UPLOAD_DIR, "documents")
     POLICY_STORAGE_PATH: str = os.path.join(UPLOAD_DIR, "policies")
+    VECTOR_INDEX_PATH: str = os.path.join(UPLOAD_DIR, "vector_index")
+
+    ANALYSIS_WORKERS: int = 2
+    ANALYSIS_JOB_POLL_INTERVAL_SECONDS: float = 2.0
+    # Running jobs and batches whose worker's lock is free are requeued once claimed this long ago
+    ANALYSIS_JOB_STALE_AFTER_SECONDS: int = 120
+    ANALYSIS_BATCH_WORKERS: int = 1
+    ANALYSIS_BATCH_MAX_DOCUMENTS: int = 500
+    ANALYSIS_BATCH_UPLOAD_CONCURRENCY: int = 8
+    ANALYSIS_BATCH_LLM_CONCURRENCY: int = 4
+    ANALYSIS_BATCH_PERSIST_SIZE: int = 25
+    ANALYSIS_CHUNKING_THRESHOLD_TOKENS: int = 60000
+    ANALYSIS_CHUNK_TOKENS: int = 20000
+    ANALYSIS_RULESET_SHARD_TOKENS: int = 30000
+    ANALYSIS_MAX_PARALLEL_CALLS: int = 4
+    CHAT_RULES_TOKEN_BUDGET: int = 6000
+    CHAT_HISTORY_TOKEN_BUDGET: int = 4000
+    # Chat sends the passages closest to the question instead of the whole file, except for
+    # documents shorter than CHAT_PASSAGES_MIN_DOCUMENT_TOKENS or without chunks
+    CHAT_RETRIEVAL: bool = True
+    CHAT_PASSAGES: int = 6
+    CHAT_PASSAGES_MIN_DOCUMENT_TOKENS: int = 8000
+    DOCUMENT_CHUNK_TOKENS: int = 800
+    DOCUMENT_CHUNK_OVERLAP_TOKENS: int = 100
 
     @property
     def DATABASE_URL(self) -> str:
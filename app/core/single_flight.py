@@ -0,0 +1,33 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from loguru import logger
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share the same key into a single in-flight computation.
+
+    The first caller for a key starts the work, every caller that arrives while it is still
+    running awaits the same task and receives the same result (or exception). The task is
+    shielded, so a cancelled caller (e.g. a dropped HTTP connection) doesn't abort the work
+    for the others.
+    """
+
+    def __init__(self):
+        self.in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            logger.info(f"Joining in-flight computation for {key}")
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
@@ -0,0 +1,53 @@
+import asyncio
+from typing import Awaitable, Callable
+
+from loguru import logger
+
+
+class WorkerPool:
+    """
+    A fixed number of asyncio workers that repeatedly call `run_once` while it reports work done.
+
+    When there is nothing to do, workers sleep until `wake()` is called or `poll_interval` elapses,
+    so work enqueued by another process (which can't wake us) is still picked up.
+    """
+
+    def __init__(self, name: str, concurrency: int, run_once: Callable[[], Awaitable[bool]],
+                 poll_interval: float = 2.0):
+        self.name = name
+        self.concurrency = concurrency
+        self.run_once = run_once
+        self.poll_interval = poll_interval
+        self.wakeup = asyncio.Event()
+        self.tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        self.tasks = [asyncio.create_task(self.work(worker_id)) for worker_id in range(self.concurrency)]
+        logger.info(f"Started {self.concurrency} {self.name} workers")
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        logger.info(f"Stopped {self.name} workers")
+
+    def wake(self):
+        self.wakeup.set()
+
+    async def work(self, worker_id: int):
+        while True:
+            try:
+                did_work = await self.run_once()
+            except Exception as e:
+                logger.error(f"{self.name} worker {worker_id} failed: {str(e)}")
+                did_work = False
+
+            if did_work:
+                continue
+
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
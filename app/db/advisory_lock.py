@@ -0,0 +1,39 @@
+from contextlib import asynccontextmanager
+
+from sqlalchemy import text
+
+from app.db.session import engine
+
+
+@asynccontextmanager
+async def advisory_lock(key: str):
+    """
+    Hold a Postgres session-level advisory lock for `key` for the duration of the block.
+
+    The lock lives on a dedicated connection, so the caller's session is free to commit
+    (and return its own connection to the pool) without releasing the lock. This makes
+    the lock visible to every API worker that talks to the same database.
+    """
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT pg_advisory_lock(hashtext(:key))"), {"key": key})
+        await conn.commit()
+        try:
+            yield
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {"key": key})
+            await conn.commit()
+
+
+@asynccontextmanager
+async def try_advisory_lock(key: str):
+    """Like `advisory_lock`, but doesn't wait - yields False when another session holds the lock."""
+    async with engine.connect() as conn:
+        result = await conn.execute(text("SELECT pg_try_advisory_lock(hashtext(:key))"), {"key": key})
+        locked = result.scalar()
+        await conn.commit()
+        try:
+            yield locked
+        finally:
+            if locked:
+                await conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {"key": key})
+                await conn.commit()
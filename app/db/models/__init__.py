@@ -1,11 +1,18 @@
 from .analysis_result import AnalysisResult
 from .company import Company
 from .document import Document
-from .embedding import Embedding
+from .embedding import Embedding, ShadowEmbedding
 from .linked_document import LinkedDocument
 from .policy import Policy
 from .checklist import Checklist
 from .policy_rule import PolicyRule
 from .user import User, AccessToken
 from .conversation import Conversation
-from .message import Message
\ No newline at end of file
+from .message import Message
+from .analysis_job import AnalysisJob
+from .analysis_batch import AnalysisBatch
+from .cached_answer import CachedAnswer
+from .embedding_cache_entry import EmbeddingCacheEntry
+from .embedding_outbox import EmbeddingOutbox
+from .embedding_model import EmbeddingModel
+from .document_chunk import DocumentChunk
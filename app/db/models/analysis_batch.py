@@ -0,0 +1,26 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import ForeignKey, DateTime, String, Integer
+from sqlalchemy.orm import relationship, Mapped, mapped_column
+
+from app.api.v1.schemas.analysis_job import AnalysisJobStatus
+from app.db.base_class import BaseSoftDelete
+
+
+class AnalysisBatch(BaseSoftDelete):
+    __tablename__ = "analysis_batches"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    checklist_id: Mapped[int] = mapped_column(ForeignKey("checklists.id"))
+    user_id: Mapped[int | None] = mapped_column(ForeignKey("user.id"), nullable=True)
+    status: Mapped[AnalysisJobStatus] = mapped_column(String, default=AnalysisJobStatus.queued, index=True)
+    total: Mapped[int] = mapped_column(Integer, default=0)
+    completed: Mapped[int] = mapped_column(Integer, default=0)
+    failed: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True),
+                                                 default=lambda: datetime.now(timezone.utc)
+                                                 )
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    jobs: Mapped[list["AnalysisJob"]] = relationship("AnalysisJob", back_populates="batch", cascade="delete")
@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import ForeignKey, JSON, DateTime, String, Text
+from sqlalchemy.orm import relationship, Mapped, mapped_column
+
+from app.api.v1.schemas.analysis_job import AnalysisJobStatus
+from app.db.base_class import BaseSoftDelete
+
+
+class AnalysisJob(BaseSoftDelete):
+    __tablename__ = "analysis_jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    document_id: Mapped[int] = mapped_column(ForeignKey("documents.id"))
+    checklist_id: Mapped[int | None] = mapped_column(ForeignKey("checklists.id"), nullable=True)
+    user_id: Mapped[int | None] = mapped_column(ForeignKey("user.id"), nullable=True)
+    batch_id: Mapped[int | None] = mapped_column(ForeignKey("analysis_batches.id"), nullable=True, index=True)
+    analysis_result_id: Mapped[int | None] = mapped_column(ForeignKey("analysis_results.id"), nullable=True)
+    status: Mapped[AnalysisJobStatus] = mapped_column(String, default=AnalysisJobStatus.queued, index=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    stage_timings: Mapped[dict[str, float] | None] = mapped_column(JSON, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True),
+                                                 default=lambda: datetime.now(timezone.utc)
+                                                 )
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    document: Mapped["Document"] = relationship("Document")
+    analysis_result: Mapped["AnalysisResult"] = relationship("AnalysisResult")
+    batch: Mapped["AnalysisBatch"] = relationship("AnalysisBatch", back_populates="jobs")
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import ForeignKey, JSON, DateTime, String
+from sqlalchemy import ForeignKey, JSON, DateTime, String, Integer
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from app.api.v1.schemas.analysis import Conflict, Risk, MissingClause, Suggestion, PaymentTerm
@@ -20,6 +20,8 @@ class AnalysisResult(BaseSoftDelete):
     missing_clauses: Mapped[list[MissingClause] | None] = mapped_column(JSON, nullable=True)
     suggestions: Mapped[list[Suggestion] | None] = mapped_column(JSON, nullable=True)
     payment_terms: Mapped[list[PaymentTerm] | None] = mapped_column(JSON, nullable=True)
+    input_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    output_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True),
                                                           default=lambda: datetime.now(timezone.utc)
                                                           )
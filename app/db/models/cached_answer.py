@@ -0,0 +1,23 @@
+from datetime import datetime, timezone
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import ForeignKey, String, DateTime, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base
+
+
+class CachedAnswer(Base):
+    """Chat answer reusable for similar questions about the same document. Entries are deleted, not soft-deleted."""
+    __tablename__ = "cached_answers"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    document_id: Mapped[int] = mapped_column(ForeignKey("documents.id", ondelete="CASCADE"), index=True)
+    question: Mapped[str] = mapped_column(String, nullable=False)
+    question_embedding: Mapped[Vector] = mapped_column(Vector(3072), nullable=False)
+    answer: Mapped[str] = mapped_column(String, nullable=False)
+    hits: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True),
+                                                 default=lambda: datetime.now(timezone.utc)
+                                                 )
+    last_hit_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
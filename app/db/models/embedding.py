@@ -1,19 +1,31 @@
 from datetime import datetime, timezone
 
 from pgvector.sqlalchemy import Vector
-from sqlalchemy import Integer, String, DateTime, UniqueConstraint
+from sqlalchemy import Integer, String, DateTime, Boolean, UniqueConstraint, text
 from sqlalchemy.orm import Mapped, mapped_column
 
-from app.db.base_class import BaseSoftDelete
+from app.api.v1.schemas.policy import PolicyType
+from app.core.config import settings
+from app.db.base_class import Base
 
 
-class Embedding(BaseSoftDelete):
+class Embedding(Base):
+    """Embedding of a policy or rule. Rows are upserted and deleted with their content, not soft-deleted."""
     __tablename__ = "embeddings"
 
     id: Mapped[int] = mapped_column( primary_key=True, index=True)
     content_type: Mapped[str] = mapped_column(String, nullable=False)
     content_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
     embedding: Mapped[Vector | None] = mapped_column(Vector(3072), nullable=False)
+    embedding_short: Mapped[Vector | None] = mapped_column(Vector(settings.EMBEDDING_SHORT_DIMENSIONS), nullable=True)
+    # sha256 of the exact embedded text and the "provider:model" that embedded it
+    text_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    model: Mapped[str | None] = mapped_column(String, nullable=True)
+    dimensions: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Copied from the owning policy so semantic search can filter inside the vector query
+    company_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    policy_type: Mapped[PolicyType | None] = mapped_column(String, nullable=True)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, server_default=text("TRUE"))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True),
                                                           default=lambda: datetime.now(timezone.utc)
                                                           )
@@ -26,3 +38,26 @@ class Embedding(BaseSoftDelete):
     __table_args__ = (
         UniqueConstraint('content_type', 'content_id', name='uq_content_type_id'),
     )
+
+
+class ShadowEmbedding(Base):
+    """Embedding by the shadow model, built next to `embeddings` and copied into it on cutover."""
+    __tablename__ = "shadow_embeddings"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    content_type: Mapped[str] = mapped_column(String, nullable=False)
+    content_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    embedding: Mapped[Vector] = mapped_column(Vector(3072), nullable=False)
+    text_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    model: Mapped[str | None] = mapped_column(String, nullable=True)
+    dimensions: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True),
+                                                 default=lambda: datetime.now(timezone.utc)
+                                                 )
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True),
+                                                        default=lambda: datetime.now(timezone.utc),
+                                                        onupdate=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        UniqueConstraint('content_type', 'content_id', name='uq_shadow_content_type_id'),
+    )
@@ -0,0 +1,25 @@
+from datetime import datetime, timezone
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import String, DateTime, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base
+
+
+class EmbeddingCacheEntry(Base):
+    """Embedding of a normalized text by one embedding model. Entries are deleted, not soft-deleted."""
+    __tablename__ = "embedding_cache"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    text_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    model: Mapped[str] = mapped_column(String, nullable=False)
+    embedding: Mapped[Vector] = mapped_column(Vector(3072), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True),
+                                                 default=lambda: datetime.now(timezone.utc),
+                                                 index=True
+                                                 )
+
+    __table_args__ = (
+        UniqueConstraint('text_hash', 'model', name='uq_embedding_cache_text_hash_model'),
+    )
@@ -0,0 +1,26 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import String, Integer, DateTime, Index, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.api.v1.schemas.embedding import EmbeddingModelStatus
+from app.db.base_class import Base
+
+
+class EmbeddingModel(Base):
+    """An embedding model that served or shadowed `embeddings`. At most one serves and one shadows."""
+    __tablename__ = "embedding_models"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    provider: Mapped[str] = mapped_column(String, nullable=False)
+    model: Mapped[str] = mapped_column(String, nullable=False)
+    dimensions: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[EmbeddingModelStatus] = mapped_column(String, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True),
+                                                 default=lambda: datetime.now(timezone.utc)
+                                                 )
+    activated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index('uq_embedding_models_status', 'status', unique=True, postgresql_where=text("status <> 'retired'")),
+    )
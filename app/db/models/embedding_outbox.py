@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import String, Integer, DateTime, Text, Boolean, UniqueConstraint, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base
+
+
+class EmbeddingOutbox(Base):
+    """
+    Pending (re-)embedding of a policy or rule. Rows are deleted once the embedding is stored, and
+    kept as dead once they run out of attempts, until the content is edited again.
+    """
+    __tablename__ = "embedding_outbox"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    content_type: Mapped[str] = mapped_column(String, nullable=False)
+    content_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    available_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True,
+                                                   default=lambda: datetime.now(timezone.utc))
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    is_dead: Mapped[bool] = mapped_column(Boolean, default=False, server_default=text("FALSE"))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True),
+                                                 default=lambda: datetime.now(timezone.utc)
+                                                 )
+
+    __table_args__ = (
+        UniqueConstraint('content_type', 'content_id', name='uq_embedding_outbox_content'),
+    )
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import ForeignKey, String, DateTime
+from sqlalchemy import ForeignKey, String, DateTime, Integer, Boolean, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base_class import BaseSoftDelete
@@ -13,6 +13,9 @@ class Message(BaseSoftDelete):
     conversation_id: Mapped[int] = mapped_column(ForeignKey("conversations.id"))
     content: Mapped[str] = mapped_column(String, nullable=False)
     author: Mapped[str] = mapped_column(default='User')
+    input_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    output_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    is_cached: Mapped[bool] = mapped_column(Boolean, default=False, server_default=text("FALSE"))
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc)
@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import Integer, String, Text, ForeignKey, DateTime, Boolean
+from sqlalchemy import Integer, String, Text, ForeignKey, DateTime, Boolean, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from app.api.v1.schemas.policy import PolicyType
@@ -17,6 +18,12 @@ class Policy(BaseSoftDelete):
     source_url: Mapped[str | None] = mapped_column(String, nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     company_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("companies.id"), nullable=True)
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed("setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+                 "setweight(to_tsvector('english', coalesce(description, '')), 'B')", persisted=True),
+        deferred=True
+    )
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True),
                                                           default=lambda: datetime.now(timezone.utc)
                                                           )
@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import Integer, String, Text, ForeignKey, DateTime, JSON
+from sqlalchemy import Integer, String, Text, ForeignKey, DateTime, JSON, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from app.api.v1.schemas.rule import RuleType, Severity
@@ -16,6 +17,12 @@ class PolicyRule(BaseSoftDelete):
     description: Mapped[str] = mapped_column(Text)
     severity: Mapped[Severity] = mapped_column(String)  # high, medium, low
     keywords: Mapped[list[str]] = mapped_column(JSON)
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed("setweight(jsonb_to_tsvector('english', coalesce(keywords::jsonb, '[]'), '[\"string\"]'), 'A') || "
+                 "setweight(to_tsvector('english', coalesce(description, '')), 'B')", persisted=True),
+        deferred=True
+    )
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
 )
     updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
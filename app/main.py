@@ -1,11 +1,15 @@
 import sys
+from contextlib import asynccontextmanager
 
 import sentry_sdk
 from fastapi import FastAPI
 from fastapi.params import Depends
 from loguru import logger
 
+from app.api.v1.routers.admin import router as admin_router
 from app.api.v1.routers.analysis import router as analysis_router
+from app.api.v1.routers.analysis_batch import router as analysis_batch_router
+from app.api.v1.routers.analysis_job import router as analysis_job_router
 from app.api.v1.routers.checklist import router as checklist_router
 from app.api.v1.routers.company import router as company_router
 from app.api.v1.routers.conversation import router as conversation_router
@@ -15,6 +19,13 @@ from app.api.v1.routers.rule import router as rule_router
 from app.api.v1.routers.user import router as register_router
 from app.api.v1.routers.websocket import router as websocket_router
 from app.api.v1.schemas.user import UserBase, UserUpdate
+from app.api.v1.services.analysis_batch_service import analysis_batch_workers, analysis_batch_requeue_watcher
+from app.api.v1.services.analysis_job_service import analysis_workers, analysis_job_requeue_watcher
+from app.api.v1.services.embedding_compaction_service import embedding_compaction_workers
+from app.api.v1.services.embedding_model_service import refresh_embedding_models, embedding_model_watcher
+from app.api.v1.services.embedding_outbox_service import embedding_workers
+from app.core.ai.embedding_cache import prune_embedding_cache
+from app.core.ai.vector_index import vector_index
 from app.core.auth import auth_backend
 from app.core.config import settings
 from app.core.user_manager import fastapi_users, get_current_user
@@ -47,9 +58,35 @@ if settings.APP_ENV == "production":
         },
     )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await prune_embedding_cache()
+    await refresh_embedding_models()
+    await embedding_model_watcher.start()
+    await analysis_workers.start()
+    await analysis_batch_workers.start()
+    await analysis_job_requeue_watcher.start()
+    await analysis_batch_requeue_watcher.start()
+    await embedding_workers.start()
+    await embedding_compaction_workers.start()
+    if settings.SEMANTIC_SEARCH_BACKEND == "numpy":
+        await vector_index.start()
+    yield
+    await vector_index.stop()
+    await embedding_compaction_workers.stop()
+    await embedding_workers.stop()
+    await embedding_model_watcher.stop()
+    await analysis_batch_requeue_watcher.stop()
+    await analysis_job_requeue_watcher.stop()
+    await analysis_batch_workers.stop()
+    await analysis_workers.stop()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 app.include_router(websocket_router)
@@ -58,9 +95,12 @@ app.include_router(company_router)
 app.include_router(policy_router)
 app.include_router(document_router)
 app.include_router(analysis_router)
+app.include_router(analysis_job_router)
+app.include_router(analysis_batch_router)
 app.include_router(rule_router)
 app.include_router(conversation_router)
 app.include_router(register_router)
+app.include_router(admin_router)
 app.include_router(fastapi_users.get_auth_router(auth_backend), prefix=f"{settings.API_V1_STR}/auth", tags=["auth"])
 app.include_router(fastapi_users.get_users_router(user_schema=UserBase, user_update_schema=UserUpdate),
                    prefix=f"{settings.API_V1_STR}/users", tags=["users"],
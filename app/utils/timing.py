@@ -0,0 +1,13 @@
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+
+@contextmanager
+def timed_stage(timings: Optional[dict[str, float]], stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0.0) + time.perf_counter() - start, 3)
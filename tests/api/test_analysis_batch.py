@@ -0,0 +1,172 @@
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.api.v1.schemas.analysis import AnalysisResult
+from app.api.v1.schemas.analysis_job import AnalysisJobStatus
+from app.api.v1.services.analysis_batch_service import persist_analysis_batch_results, claim_next_analysis_batch, \
+    run_next_analysis_batch, requeue_stale_analysis_batches, analysis_batch_lock_key
+from app.core.ai.tokens import TokenUsage
+from app.core.config import settings
+from app.db.advisory_lock import advisory_lock
+from app.db.models import AnalysisBatch, AnalysisJob, Document
+from tests.api.test_document import test_upload_document as upload_document
+from tests.conftest import login
+
+email = "doc_test@test.com"
+password = "securepassword123"
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_ensures_fresh_db(fresh_db_session):
+    pass
+
+
+async def create_checklist(async_client) -> int:
+    response = await async_client.post(f"{settings.API_V1_STR}/checklists/",
+                                       json={"name": "Batch checklist", "ruleset": []})
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}"
+    return response.json()["id"]
+
+
+async def create_batch(async_client, documents: int = 2) -> dict:
+    document_ids = [await upload_document(async_client) for _ in range(documents)]
+    checklist_id = await create_checklist(async_client)
+
+    response = await async_client.post(f"{settings.API_V1_STR}/analysis_batches/",
+                                       json={"document_ids": document_ids, "checklist_id": checklist_id})
+    assert response.status_code == 202, f"Unexpected status code: {response.status_code}"
+    return response.json()
+
+
+async def load_batch(db, batch_id: int) -> tuple[AnalysisBatch, list[AnalysisJob]]:
+    batch = (await db.execute(select(AnalysisBatch).filter(AnalysisBatch.id == batch_id))).scalar_one()
+    result = await db.execute(select(AnalysisJob).filter(AnalysisJob.batch_id == batch_id).order_by(AnalysisJob.id))
+    return batch, result.scalars().all()
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_persist_analysis_batch_results(async_client, db_session):
+    batch_data = await create_batch(async_client)
+    batch = await claim_next_analysis_batch(db_session)
+    assert batch.id == batch_data["id"]
+    _, (succeeded, failed) = await load_batch(db_session, batch.id)
+    analysis_data = AnalysisResult(document_id=succeeded.document_id, title="Contract", company_name="Client",
+                                   conflicts=[], risks=[], missing_clauses=[], suggestions=[], payment_terms=[])
+
+    await persist_analysis_batch_results(db_session, batch, [
+        (succeeded, analysis_data, {"llm": 1.5}, TokenUsage(input_tokens=10, output_tokens=5), None),
+        (failed, None, {"upload": 0.1}, TokenUsage(), Exception("Upload failed")),
+    ])
+
+    await db_session.refresh(batch)
+    assert (batch.completed, batch.failed) == (1, 1)
+    await db_session.refresh(succeeded)
+    assert succeeded.status == AnalysisJobStatus.completed
+    assert succeeded.analysis_result_id is not None
+    assert set(succeeded.stage_timings) == {"llm", "persist"}
+    await db_session.refresh(failed)
+    assert failed.status == AnalysisJobStatus.failed
+    assert failed.error == "Upload failed"
+
+    documents = await db_session.execute(
+        select(Document.id, Document.is_processed).filter(Document.id.in_([succeeded.document_id, failed.document_id]))
+    )
+    assert dict(documents.all()) == {succeeded.document_id: True, failed.document_id: False}
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_batch_that_fails_to_run_is_marked_failed(async_client, db_session):
+    batch_data = await create_batch(async_client)
+    response = await async_client.delete(f"{settings.API_V1_STR}/checklists/{batch_data['checklist_id']}")
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}"
+
+    assert await run_next_analysis_batch()
+
+    batch, jobs = await load_batch(db_session, batch_data["id"])
+    await db_session.refresh(batch)
+    assert batch.status == AnalysisJobStatus.failed
+    assert (batch.completed, batch.failed) == (0, 2)
+    assert batch.finished_at is not None
+    for job in jobs:
+        await db_session.refresh(job)
+        assert job.status == AnalysisJobStatus.failed
+        assert job.error == "Checklist not found"
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_requeue_stale_analysis_batches(db_session):
+    # The batch claimed by test_persist_analysis_batch_results is still running
+    stale_started_at = datetime.now(timezone.utc) - timedelta(seconds=settings.ANALYSIS_JOB_STALE_AFTER_SECONDS + 60)
+    result = await db_session.execute(
+        update(AnalysisBatch)
+        .where(AnalysisBatch.status == AnalysisJobStatus.running)
+        .values(started_at=stale_started_at)
+        .returning(AnalysisBatch.id)
+    )
+    batch_ids = result.scalars().all()
+    await db_session.commit()
+    assert batch_ids
+
+    # A live worker holds the lock of its batch, however long the batch runs
+    async with AsyncExitStack() as stack:
+        for batch_id in batch_ids:
+            await stack.enter_async_context(advisory_lock(analysis_batch_lock_key(batch_id)))
+        await requeue_stale_analysis_batches()
+        result = await db_session.execute(
+            select(AnalysisBatch.status).filter(AnalysisBatch.id.in_(batch_ids))
+            .execution_options(populate_existing=True)
+        )
+        assert result.scalars().all() == [AnalysisJobStatus.running] * len(batch_ids)
+
+    await requeue_stale_analysis_batches()
+
+    result = await db_session.execute(
+        select(AnalysisBatch.status, AnalysisBatch.started_at).filter(AnalysisBatch.id.in_(batch_ids))
+        .execution_options(populate_existing=True)
+    )
+    assert result.all() == [(AnalysisJobStatus.queued, None)] * len(batch_ids)
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_create_analysis_batch(async_client):
+    batch = await create_batch(async_client)
+
+    assert batch["status"] == "queued"
+    assert (batch["total"], batch["completed"], batch["failed"]) == (2, 0, 0)
+
+    response = await async_client.get(f"{settings.API_V1_STR}/analysis_batches/{batch['id']}")
+
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}"
+    assert response.json()["id"] == batch["id"]
+
+    response = await async_client.get(f"{settings.API_V1_STR}/analysis_batches/{batch['id']}/jobs")
+
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}"
+    jobs = response.json()
+    assert len(jobs) == 2
+    assert all(job["batch_id"] == batch["id"] and job["status"] == "queued" for job in jobs)
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_create_analysis_batch_for_nonexistent_document(async_client):
+    await login(async_client, email, password)
+    checklist_id = await create_checklist(async_client)
+
+    response = await async_client.post(f"{settings.API_V1_STR}/analysis_batches/",
+                                       json={"document_ids": [99999], "checklist_id": checklist_id})
+
+    assert response.status_code == 404, f"Expected 404, got: {response.status_code}"
+    assert response.json()["detail"] == "Documents [99999] not found"
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_get_nonexistent_analysis_batch(async_client):
+    await login(async_client, email, password)
+
+    response = await async_client.get(f"{settings.API_V1_STR}/analysis_batches/99999")
+
+    assert response.status_code == 404, f"Expected 404, got: {response.status_code}"
+    assert response.json()["detail"] == "Analysis batch not found"
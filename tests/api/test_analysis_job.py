@@ -0,0 +1,90 @@
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.api.v1.schemas.analysis_job import AnalysisJobStatus
+from app.api.v1.services.analysis_job_service import claim_next_analysis_job, requeue_stale_analysis_jobs, \
+    analysis_job_lock_key
+from app.core.config import settings
+from app.db.advisory_lock import advisory_lock
+from app.db.models import AnalysisJob
+from tests.api.test_document import test_upload_document as upload_document
+from tests.conftest import login
+
+email = "doc_test@test.com"
+password = "securepassword123"
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_ensures_fresh_db(fresh_db_session):
+    pass
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_create_analysis_job(async_client):
+    document_id = await upload_document(async_client)
+
+    response = await async_client.post(f"{settings.API_V1_STR}/analysis_jobs/", json={"document_id": document_id})
+
+    assert response.status_code == 202, f"Unexpected status code: {response.status_code}"
+    job = response.json()
+    assert "id" in job, "Response missing job id"
+    assert job["document_id"] == document_id
+    assert job["status"] == "queued"
+    assert job["analysis_result_id"] is None
+
+    response = await async_client.get(f"{settings.API_V1_STR}/analysis_jobs/{job['id']}")
+
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}"
+    assert response.json()["id"] == job["id"]
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_create_analysis_job_for_nonexistent_document(async_client):
+    await login(async_client, email, password)
+
+    response = await async_client.post(f"{settings.API_V1_STR}/analysis_jobs/", json={"document_id": 99999})
+
+    assert response.status_code == 404, f"Expected 404, got: {response.status_code}"
+    assert response.json()["detail"] == "Document not found"
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_get_nonexistent_analysis_job(async_client):
+    await login(async_client, email, password)
+
+    response = await async_client.get(f"{settings.API_V1_STR}/analysis_jobs/99999")
+
+    assert response.status_code == 404, f"Expected 404, got: {response.status_code}"
+    assert response.json()["detail"] == "Analysis job not found"
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_requeue_stale_analysis_jobs(db_session):
+    # Claims the job created by test_create_analysis_job
+    job = await claim_next_analysis_job(db_session)
+    assert job is not None
+    job_id = job.id
+
+    await requeue_stale_analysis_jobs()
+    await db_session.refresh(job)
+    assert job.status == AnalysisJobStatus.running, "A job claimed just now may not hold its lock yet"
+
+    stale_started_at = datetime.now(timezone.utc) - timedelta(seconds=settings.ANALYSIS_JOB_STALE_AFTER_SECONDS + 60)
+    await db_session.execute(update(AnalysisJob).where(AnalysisJob.id == job_id).values(started_at=stale_started_at))
+    await db_session.commit()
+
+    # A live worker holds the lock of its job, however long the job runs
+    async with advisory_lock(analysis_job_lock_key(job_id)):
+        assert not await requeue_stale_analysis_jobs()
+        await db_session.refresh(job)
+        assert job.status == AnalysisJobStatus.running
+
+    await requeue_stale_analysis_jobs()
+
+    result = await db_session.execute(
+        select(AnalysisJob.status, AnalysisJob.started_at).filter(AnalysisJob.id == job_id)
+        .execution_options(populate_existing=True)
+    )
+    assert result.one() == (AnalysisJobStatus.queued, None)
@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import select
+
+from app.api.v1.schemas.policy import PolicyType
+from app.core.ai.answer_cache import find_cached_answer, store_answer, invalidate_document_answers, \
+    invalidate_policy_answers
+from app.core.ai.providers import EMBEDDING_DIMENSIONS
+from app.db.models import CachedAnswer, Company, Document, Policy
+
+
+def unit_vector(index: int) -> list[float]:
+    vector = [0.0] * EMBEDDING_DIMENSIONS
+    vector[index] = 1.0
+    return vector
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_ensures_fresh_db(fresh_db_session):
+    pass
+
+
+async def create_documents(db) -> tuple[Document, Document]:
+    other_company = Company(name="Other Company")
+    db.add(other_company)
+    await db.flush()
+    documents = (Document(filename="client.txt", content_type="text/plain", file_path="client.txt", company_id=1),
+                 Document(filename="other.txt", content_type="text/plain", file_path="other.txt",
+                          company_id=other_company.id))
+    db.add_all(documents)
+    await db.commit()
+    return documents
+
+
+async def cached_document_ids(db) -> list[int]:
+    result = await db.execute(select(CachedAnswer.document_id).order_by(CachedAnswer.document_id))
+    return list(result.scalars().all())
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_cached_answers_are_found_by_similar_questions(db_session):
+    client_document, other_document = await create_documents(db_session)
+    stored = await store_answer(db_session, client_document.id, "When is payment due?", unit_vector(0),
+                                "Within 30 days")
+
+    cached_answer = await find_cached_answer(db_session, client_document.id, unit_vector(0))
+    assert cached_answer.id == stored.id
+    assert cached_answer.hits == 1 and cached_answer.last_hit_at is not None
+
+    assert await find_cached_answer(db_session, client_document.id, unit_vector(1)) is None
+    assert await find_cached_answer(db_session, other_document.id, unit_vector(0)) is None
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_answers_are_invalidated_for_their_document_and_policies(db_session):
+    result = await db_session.execute(select(Document).order_by(Document.id))
+    client_document, other_document = result.scalars().all()[-2:]
+    await store_answer(db_session, other_document.id, "Who owns the IP?", unit_vector(2), "The supplier")
+
+    await invalidate_document_answers(db_session, other_document.id)
+    await db_session.commit()
+    assert await cached_document_ids(db_session) == [client_document.id]
+
+    await store_answer(db_session, other_document.id, "Who owns the IP?", unit_vector(2), "The supplier")
+    company_policy = Policy(name="Payments", description="Payment terms", policy_type=PolicyType.company,
+                            company_id=other_document.company_id)
+    industry_policy = Policy(name="GDPR", description="Data protection", policy_type=PolicyType.industry)
+    db_session.add_all([company_policy, industry_policy])
+    await db_session.commit()
+
+    # A company policy only affects that company's documents
+    await invalidate_policy_answers(db_session, company_policy.id)
+    await db_session.commit()
+    assert await cached_document_ids(db_session) == [client_document.id]
+
+    await store_answer(db_session, other_document.id, "Who owns the IP?", unit_vector(2), "The supplier")
+    await invalidate_policy_answers(db_session, industry_policy.id)
+    await db_session.commit()
+    assert await cached_document_ids(db_session) == []
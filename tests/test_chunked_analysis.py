@@ -0,0 +1,105 @@
+from app.analysers.document_sections import split_into_sections, chunk_by_sections, chunk_with_overlap
+from app.api.v1.schemas.analysis import AnalysisResult, Conflict, Risk, MissingClause
+from app.core.ai.analysis_merge import merge_analysis_results
+from app.core.ai.tokens import estimate_tokens
+
+AGREEMENT = """SERVICE AGREEMENT
+This agreement is made between Acme Ltd and Client Company.
+
+1. Definitions
+In this agreement the following terms apply.
+
+2. Payment
+The client shall pay within 30 days of invoice.
+
+ARTICLE 3 Termination
+Either party may terminate with 60 days notice.
+
+SCHEDULE 1
+Fee table.
+"""
+
+
+def analysis(conflicts=(), risks=(), missing=(), title="", company_name=""):
+    return AnalysisResult(
+        document_id=1,
+        title=title,
+        company_name=company_name,
+        conflicts=[Conflict(policy_name=name, conflict_detail=detail) for name, detail in conflicts],
+        risks=[Risk(risk_type=risk_type, detail=detail) for risk_type, detail in risks],
+        missing_clauses=[MissingClause(clause_name=name, suggestion="Add it") for name in missing],
+        suggestions=[],
+        payment_terms=[],
+    )
+
+
+def test_split_into_sections_on_headings():
+    sections = [AGREEMENT[start:end] for start, end in split_into_sections(AGREEMENT)]
+
+    assert [section.splitlines()[0] for section in sections] == [
+        "SERVICE AGREEMENT", "1. Definitions", "2. Payment", "ARTICLE 3 Termination", "SCHEDULE 1"
+    ]
+    assert "".join(sections) == AGREEMENT
+
+
+def test_chunks_respect_token_limit_and_cover_the_document():
+    long_text = AGREEMENT * 50
+    chunks = chunk_by_sections(long_text, max_tokens=200)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk.text) <= 200 for chunk in chunks)
+    assert "".join(chunk.text for chunk in chunks) == long_text
+    assert all(long_text[chunk.start_offset:chunk.end_offset] == chunk.text for chunk in chunks)
+
+
+def test_oversized_section_is_split():
+    text = "1. Huge clause\n" + "The supplier shall comply. " * 500
+
+    chunks = chunk_by_sections(text, max_tokens=300)
+
+    assert len(chunks) > 1
+    assert "".join(chunk.text for chunk in chunks) == text
+
+
+def test_overlapping_chunks_repeat_the_end_of_the_previous_chunk():
+    long_text = AGREEMENT * 50
+    chunks = chunk_with_overlap(long_text, max_tokens=200, overlap_tokens=40)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk.text) <= 200 for chunk in chunks)
+    assert all(long_text[chunk.start_offset:chunk.end_offset] == chunk.text for chunk in chunks)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.start_offset < previous.end_offset < chunk.end_offset
+        assert long_text[chunk.start_offset - 1] in "\n "
+
+
+def test_merge_deduplicates_findings_across_chunks():
+    first = analysis(
+        title="Service Agreement",
+        conflicts=[("Payment Policy", "Payment term of 30 days exceeds the allowed 14 days.")],
+        risks=[("Liability", "Unlimited liability for the client.")],
+        missing=["Termination clause", "Confidentiality"],
+    )
+    second = analysis(
+        company_name="Acme Ltd",
+        conflicts=[("payment policy", "Payment term of 30 days exceeds the allowed 14 days")],
+        risks=[("Liability", "Unlimited liability for the client"), ("Privacy", "No data processing terms.")],
+        missing=["Confidentiality"],
+    )
+
+    merged = merge_analysis_results([first, second], missing_clauses="intersection")
+
+    assert merged.title == "Service Agreement"
+    assert merged.company_name == "Acme Ltd"
+    assert len(merged.conflicts) == 1
+    assert [risk.risk_type for risk in merged.risks] == ["Liability", "Privacy"]
+    assert [clause.clause_name for clause in merged.missing_clauses] == ["Confidentiality"]
+
+
+def test_merge_union_keeps_missing_clauses_from_every_result():
+    merged = merge_analysis_results(
+        [analysis(missing=["Termination"]), analysis(missing=["Termination clause", "Governing law"])],
+        missing_clauses="union",
+    )
+
+    assert [clause.clause_name for clause in merged.missing_clauses] == ["Termination", "Governing law"]
@@ -0,0 +1,15 @@
+from sqlalchemy.dialects import postgresql
+
+from app.core.ai.document_retrieval import passages_query
+
+
+def test_passages_are_ranked_exactly_within_the_document():
+    compiled = passages_query(12, [0.5] * 4, 3, "gemini:text-embedding").compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+
+    assert "document_chunks.document_id = %(document_id_1)s" in sql
+    assert "document_chunks.model = %(model_1)s" in sql
+    # An approximate index scan over every document's chunks could miss this document's
+    assert "halfvec" not in sql
+    assert "ORDER BY document_chunks.embedding <=> %(embedding_1)s" in sql
+    assert (compiled.params["document_id_1"], compiled.params["model_1"]) == (12, "gemini:text-embedding")
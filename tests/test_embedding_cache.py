@@ -0,0 +1,36 @@
+import pytest
+
+from app.core.ai import embedding_cache as embedding_cache_module
+from app.core.ai.embedding_cache import EmbeddingCache, text_hash
+from app.core.ai.providers import StubEmbeddingProvider
+from app.core.config import settings
+
+
+def test_text_hash_ignores_case_and_whitespace():
+    assert text_hash("What is the  termination\nnotice period?") == text_hash(" what is the termination notice period? ")
+    assert text_hash("termination notice") != text_hash("payment terms")
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_memory_level_serves_repeats_and_evicts_least_recently_used(monkeypatch):
+    cache = EmbeddingCache()
+    loaded = []
+
+    async def load_or_embed(key, text, provider):
+        loaded.append(text)
+        cache.stats.misses += 1
+        return [float(len(text))]
+
+    monkeypatch.setattr(cache, "load_or_embed", load_or_embed)
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_MAX_ENTRIES", 2)
+    monkeypatch.setattr(embedding_cache_module, "get_embedding_provider", lambda: StubEmbeddingProvider("test"))
+
+    await cache.embed("notice period")
+    await cache.embed("Notice  period")
+    await cache.embed("payment terms")
+    await cache.embed("governing law")
+    await cache.embed("notice period")
+
+    assert loaded == ["notice period", "payment terms", "governing law", "notice period"]
+    stats = cache.summary()
+    assert (stats.memory_hits, stats.misses, stats.evictions, stats.memory_entries) == (1, 4, 2, 2)
@@ -0,0 +1,106 @@
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy import select, update, delete
+
+from app.api.v1.schemas.embedding import EmbeddingModelStatus
+from app.api.v1.schemas.policy import PolicyType
+from app.api.v1.services.embedding_outbox_service import enqueue_embedding, claim_embedding_batch, \
+    run_next_embedding_batch
+from app.core.config import settings
+from app.db.models import EmbeddingOutbox, EmbeddingModel, Policy
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_ensures_fresh_db(fresh_db_session):
+    pass
+
+
+async def outbox_items(db) -> list[EmbeddingOutbox]:
+    result = await db.execute(select(EmbeddingOutbox).order_by(EmbeddingOutbox.id)
+                              .execution_options(populate_existing=True))
+    return result.scalars().all()
+
+
+async def make_due(db):
+    await db.execute(update(EmbeddingOutbox).values(available_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+    await db.commit()
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_enqueue_embedding_debounces_edits(db_session):
+    await enqueue_embedding(db_session, "rule", 1)
+    await db_session.commit()
+    [first] = await outbox_items(db_session)
+    first_available_at = first.available_at
+
+    await enqueue_embedding(db_session, "rule", 1)
+    await enqueue_embedding(db_session, "rule", 2)
+    await db_session.commit()
+
+    items = await outbox_items(db_session)
+    assert [(item.content_type, item.content_id) for item in items] == [("rule", 1), ("rule", 2)]
+    assert items[0].available_at >= first_available_at > datetime.now(timezone.utc)
+    assert items[0].attempts == 0
+
+    await db_session.execute(delete(EmbeddingOutbox))
+    await db_session.commit()
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_claimed_items_are_leased_until_the_lease_expires(db_session):
+    await enqueue_embedding(db_session, "policy", 1)
+    await db_session.commit()
+
+    items, _ = await claim_embedding_batch(db_session)
+    assert items == []
+
+    await make_due(db_session)
+    items, lease_until = await claim_embedding_batch(db_session)
+    assert [(item.content_id, item.attempts, item.available_at) for item in items] == [(1, 1, lease_until)]
+    assert lease_until > datetime.now(timezone.utc) + timedelta(seconds=settings.EMBEDDING_OUTBOX_LEASE_SECONDS - 5)
+
+    items, _ = await claim_embedding_batch(db_session)
+    assert items == []
+
+    # A worker that died mid-batch leaves the lease to expire
+    await make_due(db_session)
+    items, _ = await claim_embedding_batch(db_session)
+    assert [(item.content_id, item.attempts) for item in items] == [(1, 2)]
+
+    await db_session.execute(delete(EmbeddingOutbox))
+    await db_session.commit()
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_failing_items_are_retried_then_kept_as_dead(db_session):
+    policy = Policy(name="Payments", description="Invoices are paid within 30 days",
+                    policy_type=PolicyType.company, company_id=1)
+    # Embedding fails for a serving model nobody can build
+    model = EmbeddingModel(provider="unavailable", model="v1", dimensions=3072, status=EmbeddingModelStatus.serving)
+    db_session.add_all([policy, model])
+    await db_session.commit()
+    await enqueue_embedding(db_session, "policy", policy.id)
+    await db_session.commit()
+
+    try:
+        for attempt in range(1, settings.EMBEDDING_OUTBOX_MAX_ATTEMPTS + 1):
+            await make_due(db_session)
+            assert await run_next_embedding_batch()
+
+            [item] = await outbox_items(db_session)
+            assert item.attempts == attempt
+            assert "Unknown embedding provider unavailable" in item.error
+            assert item.is_dead == (attempt == settings.EMBEDDING_OUTBOX_MAX_ATTEMPTS)
+
+        await make_due(db_session)
+        assert not await run_next_embedding_batch()
+
+        await enqueue_embedding(db_session, "policy", policy.id)
+        await db_session.commit()
+        [item] = await outbox_items(db_session)
+        assert (item.is_dead, item.attempts, item.error) == (False, 0, None)
+    finally:
+        await db_session.execute(delete(EmbeddingOutbox))
+        await db_session.execute(delete(EmbeddingModel).where(EmbeddingModel.id == model.id))
+        await db_session.commit()
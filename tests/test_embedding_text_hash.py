@@ -0,0 +1,14 @@
+from app.api.v1.schemas.rule import RuleType
+from app.api.v1.services.embedding_service import embedding_text_hash, rule_embedding_text
+from app.db.models import PolicyRule
+
+
+def test_hash_changes_with_embedded_text_only():
+    rule = PolicyRule(rule_type=RuleType.requirement, description="Payment within 30 days", keywords=["payment"])
+    original = embedding_text_hash(rule_embedding_text(rule))
+
+    rule.keywords = ["payment", "invoice"]
+    assert embedding_text_hash(rule_embedding_text(rule)) == original
+
+    rule.description = "Payment within 60 days"
+    assert embedding_text_hash(rule_embedding_text(rule)) != original
@@ -0,0 +1,54 @@
+import math
+
+from app.core.ai.embedding_search import default_first_pass
+from app.core.ai.embeddings import truncate_embedding
+from app.core.ai.providers import LocalEmbeddingProvider, EMBEDDING_DIMENSIONS, build_embedding_provider, \
+    embedding_models
+from app.core.config import settings
+
+
+def similarity(provider, a, b):
+    return sum(x * y for x, y in zip(provider.embed(a), provider.embed(b)))
+
+
+def test_local_embeddings_are_unit_vectors_of_the_column_size():
+    provider = LocalEmbeddingProvider()
+
+    for text in ["The supplier shall pay within 30 days", "", "the of and"]:
+        vector = provider.embed(text)
+        assert len(vector) == EMBEDDING_DIMENSIONS
+        assert math.isclose(sum(value * value for value in vector), 1.0, rel_tol=1e-5)
+
+
+def test_local_embeddings_rank_by_shared_wording():
+    provider = LocalEmbeddingProvider()
+    query = "termination notice period"
+
+    assert similarity(provider, query, "the notice period for terminating the agreement") > \
+           similarity(provider, query, "invoices are payable in euros")
+    # Character trigrams relate word forms
+    assert similarity(provider, "terminate", "termination") > similarity(provider, "terminate", "payment")
+
+
+def test_local_embeddings_are_deterministic_and_batchable():
+    provider = build_embedding_provider("local")
+    texts = ["termination notice", "payment terms"]
+
+    assert provider.key == "local:hashed-ngrams-v1"
+    assert provider.embed_batch(texts) == [LocalEmbeddingProvider().embed(text) for text in texts]
+
+
+def test_local_embeddings_skip_the_truncated_first_pass():
+    vector = LocalEmbeddingProvider().embed("The supplier shall pay within 30 days")
+    short = truncate_embedding(vector, settings.EMBEDDING_SHORT_DIMENSIONS)
+    # Hashed features rarely land in the first coordinates, the prefix says little about the text
+    assert sum(value != 0 for value in short) < settings.EMBEDDING_SHORT_DIMENSIONS // 10
+
+    serving = embedding_models.serving
+    try:
+        embedding_models.serving = ("local", None)
+        assert default_first_pass() == "halfvec"
+        embedding_models.serving = ("gemini", None)
+        assert default_first_pass() == settings.SEMANTIC_SEARCH_FIRST_PASS
+    finally:
+        embedding_models.serving = serving
@@ -0,0 +1,66 @@
+import pytest
+
+from app.api.v1.schemas.model_stats import ModelOperation
+from app.core.ai import model_router as model_router_module
+from app.core.ai.model_router import ModelRouter
+from app.core.ai.providers import GenerationResult
+from app.core.config import settings
+
+
+class FlakyProvider:
+    default_model = "primary"
+
+    def __init__(self, failing_models):
+        self.failing_models = failing_models
+        self.calls = []
+
+    def generate(self, model, **kwargs):
+        self.calls.append(model)
+        if model in self.failing_models:
+            raise RuntimeError(f"{model} is down")
+        return GenerationResult(text=model)
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = FlakyProvider(failing_models={"primary"})
+    monkeypatch.setattr(model_router_module, "get_llm_provider", lambda: provider)
+    monkeypatch.setattr(settings, "CHAT_FALLBACK_MODEL", "secondary")
+    monkeypatch.setattr(settings, "MODEL_STATS_MIN_SAMPLES", 3)
+    return provider
+
+
+def test_failed_call_is_retried_on_the_fallback(provider):
+    router = ModelRouter()
+
+    result = router.generate(ModelOperation.chat, contents=["Hi"])
+
+    assert result.text == "secondary"
+    assert provider.calls == ["primary", "secondary"]
+    assert router.model_stats("primary").summary("primary").error_rate == 1.0
+
+
+def test_degraded_primary_is_skipped_until_its_samples_expire(provider, monkeypatch):
+    router = ModelRouter()
+    for _ in range(3):
+        router.generate(ModelOperation.chat, contents=["Hi"])
+    provider.calls.clear()
+
+    router.generate(ModelOperation.chat, contents=["Hi"])
+    assert provider.calls == ["secondary"]
+
+    monkeypatch.setattr(settings, "MODEL_STATS_WINDOW_SECONDS", -1)
+    provider.failing_models = set()
+    router.generate(ModelOperation.chat, contents=["Hi"])
+    assert provider.calls[-1] == "primary"
+
+
+def test_slow_primary_is_routed_around(provider, monkeypatch):
+    provider.failing_models = set()
+    monkeypatch.setattr(settings, "CHAT_MODEL_MAX_P95_SECONDS", 1.0)
+    router = ModelRouter()
+    for _ in range(3):
+        router.model_stats("primary").record(5.0, ok=True)
+
+    assert router.choose(router.route(ModelOperation.chat)) == "secondary"
+    assert router.model_stats("primary").summary("primary").p95_seconds == 5.0
@@ -0,0 +1,17 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.services.rule_service import encode_cursor, decode_cursor
+
+
+def test_cursor_round_trips_rank_exactly():
+    rank = 0.1234567890123
+
+    assert decode_cursor(encode_cursor(rank, 42)) == (rank, 42)
+
+
+def test_malformed_cursor_is_a_bad_request():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("not-a-cursor")
+
+    assert error.value.status_code == 400
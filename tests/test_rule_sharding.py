@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+
+from app.api.v1.schemas.policy import PolicyWithRules
+from app.api.v1.schemas.rule import RuleInDB
+from app.core.ai.rule_sharding import shard_policies_and_rules, policy_tokens
+
+
+def policy(policy_id, rules_count, description="x" * 200):
+    now = datetime.now(timezone.utc)
+    rules = [RuleInDB(id=policy_id * 1000 + i, policy_id=policy_id, rule_type="requirement", severity="high",
+                      description=description, created_at=now) for i in range(rules_count)]
+    return PolicyWithRules(id=policy_id, name=f"Policy {policy_id}", policy_type="company", created_at=now, rules=rules)
+
+
+def test_small_ruleset_is_a_single_shard():
+    policies = [policy(1, 3), policy(2, 3)]
+
+    shards = shard_policies_and_rules(policies, max_tokens=10_000)
+
+    assert shards == [policies]
+
+
+def test_policies_are_packed_into_shards_under_the_budget():
+    policies = [policy(i, 5) for i in range(1, 7)]
+    max_tokens = policy_tokens(policies[0]) * 2 + 10
+
+    shards = shard_policies_and_rules(policies, max_tokens)
+
+    assert [[p.id for p in shard] for shard in shards] == [[1, 2], [3, 4], [5, 6]]
+
+
+def test_oversized_policy_is_split_by_rules():
+    big = policy(1, 40)
+    max_tokens = policy_tokens(big) // 3
+
+    shards = shard_policies_and_rules([big], max_tokens)
+
+    assert len(shards) >= 3
+    assert all(sum(policy_tokens(p) for p in shard) <= max_tokens for shard in shards)
+    assert [rule.id for shard in shards for p in shard for rule in p.rules] == [rule.id for rule in big.rules]
+    assert all(p.name == big.name for shard in shards for p in shard)
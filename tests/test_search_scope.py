@@ -0,0 +1,51 @@
+from sqlalchemy.dialects import postgresql
+
+from app.api.v1.schemas.policy import PolicyType
+from app.core.ai.embedding_search import candidate_branches, visible_policies, hydrated_query, matches_values
+from app.core.ai.vector_index import EmbeddingMatch
+
+
+def render(branch) -> str:
+    return " AND ".join(
+        str(condition.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        for condition in branch
+    )
+
+
+def test_company_policies_are_only_searched_for_their_company():
+    shared, company = candidate_branches(7, None)
+
+    assert "embeddings.policy_type IN ('industry', 'standard')" in render(shared)
+    assert "company_id" not in render(shared)
+    assert "embeddings.policy_type = 'company' AND embeddings.company_id = 7" in render(company)
+    assert all("embeddings.is_active = true" in render(branch) for branch in (shared, company))
+
+    assert len(candidate_branches(None, None)) == 1
+
+
+def test_policy_types_narrow_the_branches():
+    assert candidate_branches(None, [PolicyType.company]) == []
+
+    [standard] = candidate_branches(7, [PolicyType.standard])
+    assert "embeddings.policy_type IN ('standard')" in render(standard)
+
+
+def test_lexical_visibility_matches_vector_branches():
+    assert visible_policies(None, [PolicyType.company]) is None
+
+    visibility = render([visible_policies(7, None)])
+    assert "policies.is_active = true" in visibility
+    assert "policies.policy_type = 'company' AND policies.company_id = 7" in visibility
+
+
+def test_hydrated_query_drops_deleted_content_and_groups_rules_by_policy():
+    matches = matches_values([EmbeddingMatch(1, "rule", 5, 0.1), EmbeddingMatch(2, "policy", 3, 0.2)])
+    sql = " ".join(str(hydrated_query(matches).compile(dialect=postgresql.dialect())).split())
+
+    assert "LEFT OUTER JOIN policy_rules ON" in sql and "policy_rules.is_deleted = false" in sql
+    assert "JOIN policies ON policies.id = CASE WHEN" in sql and "policies.is_deleted = false" in sql
+    # Policy hits need no rule, rule hits whose rule was deleted are dropped
+    assert "WHERE matches.content_type = %(content_type_3)s OR policy_rules.id IS NOT NULL" in sql
+    assert "FILTER (WHERE hits.rule_id IS NOT NULL)" in sql
+    assert "json_agg(hits.rule ORDER BY hits.similarity DESC)" in sql
+    assert sql.endswith("GROUP BY policies.id ORDER BY similarity DESC")
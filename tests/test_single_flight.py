@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from app.core.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return object()
+
+    results = await asyncio.gather(*[flight.do(("doc", 1), compute) for _ in range(5)])
+
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert flight.in_flight == {}
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_different_keys_and_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    await asyncio.gather(flight.do(("doc", 1), compute), flight.do(("doc", 2), compute))
+    await flight.do(("doc", 1), compute)
+
+    assert calls == 3
+
+
+@pytest.mark.asyncio(loop_scope="package")
+async def test_errors_are_propagated_to_every_caller():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("Gemini is down")
+
+    results = await asyncio.gather(*[flight.do("key", fail) for _ in range(3)], return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.in_flight == {}
@@ -0,0 +1,59 @@
+import math
+
+import pytest
+
+from app.api.v1.schemas.analysis import AnalysisResult
+from app.core.ai.providers import StubProvider, StubEmbeddingProvider, ProviderError
+
+RULES = """Policy Type: company
+Policy Name: Payments
+Description: None
+Rules:
+""" + "\n".join(f"  - Rule Type: {rule_type}\n  - Severity: high\n  - Description: Rule number {i}"
+                for i, rule_type in enumerate(["conflict", "risk", "requirement"] * 10))
+
+
+def test_stub_analysis_is_schema_valid_and_deterministic(tmp_path):
+    document = tmp_path / "contract.txt"
+    document.write_text("SERVICE AGREEMENT\nThe client shall pay within 30 days.")
+    provider = StubProvider()
+    file = provider.get_file(provider.upload_file(str(document)).name)
+
+    first = provider.generate([file, "Analyze the document."], system_instruction=RULES, response_schema=AnalysisResult)
+    second = provider.generate([file, "Analyze the document."], system_instruction=RULES, response_schema=AnalysisResult)
+
+    assert isinstance(first.parsed, AnalysisResult)
+    assert first.parsed == second.parsed
+    assert first.parsed.title == "SERVICE AGREEMENT"
+    flagged = len(first.parsed.conflicts) + len(first.parsed.risks) + len(first.parsed.missing_clauses)
+    assert 0 < flagged < 30
+    assert first.input_tokens > 0 and first.output_tokens > 0
+
+
+def test_stub_reports_missing_files():
+    with pytest.raises(ProviderError):
+        StubProvider().get_file("files/unknown")
+
+
+def test_stub_embeddings_reflect_shared_words():
+    provider = StubEmbeddingProvider()
+
+    def similarity(a, b):
+        return sum(x * y for x, y in zip(provider.embed(a), provider.embed(b)))
+
+    assert math.isclose(similarity("termination notice", "termination notice"), 1.0)
+    assert similarity("termination notice period", "notice period for termination") > \
+           similarity("termination notice period", "invoice currency")
+
+
+def test_stub_batch_embeddings_match_single_embeddings():
+    provider = StubEmbeddingProvider()
+    texts = ["termination notice", "payment terms"]
+
+    assert provider.embed_batch(texts) == [provider.embed(text) for text in texts]
+
+
+def test_embedding_model_can_be_overridden_per_provider():
+    assert StubEmbeddingProvider().key == "stub:hashed-bag-of-words"
+    assert StubEmbeddingProvider("bag-of-words-v2").key == "stub:bag-of-words-v2"
+    assert StubEmbeddingProvider("bag-of-words-v2").model != StubEmbeddingProvider.model
@@ -0,0 +1,53 @@
+from datetime import datetime, timezone, timedelta
+from types import SimpleNamespace
+
+from app.api.v1.schemas.policy import PolicyWithRulesForSemanticSearch
+from app.api.v1.schemas.rule import RuleWithSimilarity
+from app.core.ai.providers import GenerationResult
+from app.core.ai.token_budget import fit_rules_to_budget, fit_history_to_budget
+from app.core.ai.tokens import estimate_tokens, TokenUsage
+from app.utils.formatters import format_policies_and_rules_into_text
+
+
+def policy(policy_id, similarities):
+    now = datetime.now(timezone.utc)
+    rules = [RuleWithSimilarity(id=policy_id * 100 + i, policy_id=policy_id, rule_type="risk", severity="low",
+                                description="x" * 400, created_at=now, similarity=similarity)
+             for i, similarity in enumerate(similarities)]
+    return PolicyWithRulesForSemanticSearch(id=policy_id, name=f"Policy {policy_id}", policy_type="company",
+                                            created_at=now, rules=rules, similarity=max(similarities))
+
+
+def test_lowest_similarity_rules_are_dropped_first():
+    policies = [policy(1, [0.9, 0.4]), policy(2, [0.7, 0.2])]
+    max_tokens = estimate_tokens(format_policies_and_rules_into_text(policies)) - 50
+
+    fitted = fit_rules_to_budget(policies, max_tokens)
+
+    assert {rule.similarity for p in fitted for rule in p.rules} == {0.9, 0.4, 0.7}
+    assert estimate_tokens(format_policies_and_rules_into_text(fitted)) <= max_tokens
+    assert len(policies[1].rules) == 2
+
+
+def test_policies_without_rules_are_dropped_when_over_budget():
+    fitted = fit_rules_to_budget([policy(1, [0.9]), policy(2, [0.3])], max_tokens=20)
+
+    assert [(p.id, p.rules) for p in fitted] == [(1, [])]
+
+
+def test_history_keeps_most_recent_messages():
+    start = datetime.now(timezone.utc)
+    messages = [SimpleNamespace(created_at=start + timedelta(minutes=i), author="User", content=f"{i} " + "x" * 200)
+                for i in range(5)]
+
+    fitted = fit_history_to_budget(messages[::-1], max_tokens=200)
+
+    assert [m.content[0] for m in fitted] == ["2", "3", "4"]
+
+
+def test_token_usage_accumulates_results():
+    usage = TokenUsage()
+    for input_tokens, output_tokens in [(100, 25), (50, 5)]:
+        usage.add(GenerationResult(text="", input_tokens=input_tokens, output_tokens=output_tokens))
+
+    assert (usage.input_tokens, usage.output_tokens, usage.calls) == (150, 30, 2)
@@ -0,0 +1,16 @@
+import math
+
+from app.core.ai.embeddings import truncate_embedding
+
+
+def test_truncated_embedding_is_unit_length_prefix():
+    vector = [3.0, 4.0, 100.0, -7.0]
+
+    truncated = truncate_embedding(vector, 2)
+
+    assert truncated == [0.6, 0.8]
+    assert math.isclose(sum(value * value for value in truncated), 1.0)
+
+
+def test_zero_prefix_is_left_as_is():
+    assert truncate_embedding([0.0, 0.0, 1.0], 2) == [0.0, 0.0]
@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.api.v1.schemas.policy import PolicyType
+from app.core.ai.vector_index import MappedVectorIndex
+
+
+def embedding(embedding_id, vector, policy_type=PolicyType.standard, company_id=None, is_active=True):
+    return SimpleNamespace(id=embedding_id, content_type="rule", content_id=embedding_id * 10,
+                           company_id=company_id, policy_type=policy_type.value, is_active=is_active,
+                           embedding=np.array(vector, dtype=np.float32))
+
+
+def build(path, embeddings) -> MappedVectorIndex:
+    writer = MappedVectorIndex(str(path), 2)
+    writer.begin_rebuild()
+    writer.write(embeddings)
+    writer.finish_rebuild()
+    return writer
+
+
+def test_search_ranks_visible_rows_by_cosine_distance(tmp_path):
+    build(tmp_path, [
+        embedding(1, [1.0, 0.0]),
+        embedding(2, [0.6, 0.8]),
+        embedding(3, [1.0, 0.1], policy_type=PolicyType.company, company_id=7),
+        embedding(4, [1.0, 0.0], policy_type=PolicyType.company, company_id=8),
+        embedding(5, [1.0, 0.0], is_active=False),
+    ])
+    reader = MappedVectorIndex(str(tmp_path), 2)
+
+    matches = reader.search([2.0, 0.0], top_k=2, company_id=7)
+
+    assert [(match.embedding_id, match.content_id) for match in matches] == [(1, 10), (3, 30)]
+    assert abs(matches[0].distance) < 1e-3
+    assert [match.embedding_id for match in reader.search([1.0, 0.0], top_k=5)] == [1, 2]
+
+
+def test_readers_see_writes_growth_and_removals(tmp_path):
+    writer = build(tmp_path, [embedding(1, [0.0, 1.0])])
+    reader = MappedVectorIndex(str(tmp_path), 2)
+    assert MappedVectorIndex(str(tmp_path / "missing"), 2).search([1.0, 0.0], top_k=1) is None
+
+    writer.write([embedding(i, [0.0, 1.0]) for i in range(2, 2050)] + [embedding(2050, [1.0, 0.0])])
+    assert reader.search([1.0, 0.0], top_k=1)[0].embedding_id == 2050
+
+    writer.remove({2050})
+    writer.write([embedding(1, [1.0, 0.0])])
+    assert reader.search([1.0, 0.0], top_k=1)[0].embedding_id == 1
+    assert writer.dead_rows == 1
+
+
+def test_searches_keep_their_mapping_across_rebuilds(tmp_path):
+    build(tmp_path, [embedding(1, [1.0, 0.0])])
+    reader = MappedVectorIndex(str(tmp_path), 2)
+    mapping = reader.refresh()
+
+    # Each rebuild changes how many rows there are, so pairing one generation's rows with
+    # another's vectors would return the wrong embeddings or read past the end
+    def search(_):
+        return [match.embedding_id for match in reader.search([1.0, 0.0], top_k=1)]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for size in range(2, 12):
+            searches = executor.map(search, range(20))
+            build(tmp_path, [embedding(i, [0.0, 1.0]) for i in range(1, size)] + [embedding(size, [1.0, 0.0])])
+            assert all(ids[0] in (size - 1, size) for ids in searches)
+
+    assert mapping.generation == 0
+    assert reader.refresh().generation == 10
+    assert search(None) == [11]